@@ -1,11 +1,44 @@
 import streamlit as st
 
+from src.services.model_router import DEFAULT_MODEL
+from src.utils.cancellation import cancellable
+from src.utils.deadline import current_deadline
 from src.utils.logger import Logger
+from src.utils.response_cache import (
+    CompletionWatcher,
+    cache_response,
+    get_cached_response,
+    replay_stream,
+)
+from src.utils.stream_renderer import render_stream
+from src.utils.timing import get_turn_timer
+from src.utils.tracing import traced
 
 logger = Logger("chat_react_agent")
 
 
-def chat_with_react_agent(client, prompt, history_input):
+# System prompt that encourages step-by-step reasoning
+REACT_SYSTEM_PROMPT = """You are an intelligent agent that follows a thoughtful, step-by-step approach to solving problems.
+
+1. First, understand the problem completely
+2. Break down complex problems into smaller parts
+3. Think through each step carefully, considering different approaches
+4. Show your reasoning process with clear explanations
+5. Arrive at a final answer only after analyzing all relevant aspects
+
+When uncertain, acknowledge limitations and explore alternative approaches.
+"""
+
+
+def build_messages(history_input):
+    """Turn the chat history into the model input of a ReAct turn."""
+    return [{"role": "system", "content": REACT_SYSTEM_PROMPT}] + [
+        {"role": m["role"], "content": m["content"]} for m in history_input
+    ]
+
+
+@traced()
+def chat_with_react_agent(client, prompt, history_input, model=DEFAULT_MODEL):
     """
     Chat with a ReAct (Reasoning + Acting) agent that solves problems step-by-step.
 
@@ -13,38 +46,36 @@ def chat_with_react_agent(client, prompt, history_input):
         client: OpenAI client instance
         prompt: User's query
         history_input: List of previous messages
+        model: Model chosen by the router
 
     Returns:
         full_response: The final text response
     """
-    # Create a system prompt that encourages step-by-step reasoning
-    messages = [
-        {
-            "role": "system",
-            "content": """You are an intelligent agent that follows a thoughtful, step-by-step approach to solving problems.
-
-1. First, understand the problem completely
-2. Break down complex problems into smaller parts
-3. Think through each step carefully, considering different approaches
-4. Show your reasoning process with clear explanations
-5. Arrive at a final answer only after analyzing all relevant aspects
-
-When uncertain, acknowledge limitations and explore alternative approaches.
-""",
-        }
-    ] + [{"role": m["role"], "content": m["content"]} for m in history_input]
+    messages = build_messages(history_input)
 
     try:
+        # Replay a cached answer to the same (or a near-identical) question
+        cached = get_cached_response(messages, model=model)
+        if cached is not None:
+            return render_stream(get_turn_timer().track_stream(replay_stream(cached)))
+
         # Create a streaming chat completion
-        stream = client.chat.completions.create(
-            model="qwen2.5-72b-instruct",
-            messages=messages,
-            stream=True,
+        stream = cancellable(
+            client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                **current_deadline().timeout_kwargs(),
+            )
         )
 
-        # Display the streaming response
-        full_response = st.write_stream(stream)
+        # Display the streaming response at a limited frame rate
+        watcher = CompletionWatcher(stream)
+        full_response = render_stream(get_turn_timer().track_stream(watcher))
 
+        # A stopped or truncated answer must not be replayed as a complete one
+        if watcher.completed:
+            cache_response(messages, full_response, model=model)
         return full_response
 
     except Exception as e:
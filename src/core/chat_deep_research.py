@@ -1,32 +1,51 @@
-import json
+import os
 
 import httpx
 import streamlit as st
 
+from src.services.resilience import CircuitOpenError
+from src.services.scheduler import SchedulerOverloaded
+from src.services.sse_client import SSEError, iter_sse_json, stream_sse
+from src.utils.deadline import DeadlineExceeded, current_deadline
 from src.utils.logger import Logger
+from src.utils.stream_renderer import StreamRenderer
+from src.utils.timing import STREAM_TIME, get_turn_timer
+from src.utils.tracing import traced
 
 logger = Logger("chat_deep_research")
 
+# Research can run for minutes; only this much silence (seconds) ends the stream
+DEEP_RESEARCH_IDLE_TIMEOUT = float(os.environ.get("DEEP_RESEARCH_IDLE_TIMEOUT", "120"))
 
-def jina_deepsearch(client, query, conversation_history, api_key=None):
+# Time left in the turn needed for each reasoning effort (seconds); background
+# jobs have no deadline and always research with high effort
+REASONING_EFFORT_BUDGETS = (("high", 600.0), ("medium", 240.0))
+
+
+def reasoning_effort(remaining):
+    """The deepest reasoning effort that fits the time left (None: no deadline)."""
+    for effort, budget in REASONING_EFFORT_BUDGETS:
+        if remaining is None or remaining >= budget:
+            return effort
+    return "low"
+
+
+def deepsearch_events(query, conversation_history, api_key):
     """
-    Call Jina DeepSearch API with Streamlit streaming display.
+    Stream decoded Jina DeepSearch events; used in the page and in background jobs.
 
     Args:
-        client: OpenAI client (not used but kept for consistent interface)
         query (str): The user's query
         conversation_history (list): Previous conversation messages
-        api_key (str, optional): Jina API key. Defaults to None.
+        api_key (str): Jina API key
 
     Returns:
-        str: The final complete response text
+        Iterator[dict]: Decoded stream events up to [DONE]
     """
-    if not api_key:
-        api_key = st.secrets.get("JINA_API_KEY", "")
-        if not api_key:
-            error_msg = "JINA_API_KEY not found in secrets"
-            st.error(error_msg)
-            return f"Error: {error_msg}"
+    deadline = current_deadline()
+    effort = reasoning_effort(deadline.remaining())
+    if effort != "high":
+        deadline.degrade("deep_research", f"reasoning_effort={effort}")
 
     url = "https://deepsearch.jina.ai/v1/chat/completions"
 
@@ -41,96 +60,134 @@ def jina_deepsearch(client, query, conversation_history, api_key=None):
         "model": "jina-deepsearch-v1",
         "messages": messages,
         "stream": True,
-        "reasoning_effort": "high",
+        "reasoning_effort": effort,
         "max_attempts": 1,
         "no_direct_answer": False,
     }
 
     headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
-    message_placeholder = st.empty()
-    thinking_placeholder = st.empty()
-    full_response = ""
-    thinking_content = ""
-    is_thinking = False
+    events = stream_sse(
+        "jina",
+        url,
+        json_body=payload,
+        headers=headers,
+        idle_timeout=DEEP_RESEARCH_IDLE_TIMEOUT,
+        deadline=deadline,
+    )
+    return iter_sse_json(events, "jina")
+
+
+def _delta_content(data):
+    """Return the text delta of a DeepSearch event, if any."""
+    if "choices" in data and len(data["choices"]) > 0:
+        return data["choices"][0].get("delta", {}).get("content")
+    return None
+
+
+def run_deepsearch_job(job, query, conversation_history, api_key):
+    """
+    Background-job version of ``jina_deepsearch``: streams into the job record.
+
+    Args:
+        job: The running Job; progress and text are persisted to the store
+        query (str): The user's query
+        conversation_history (list): Previous conversation messages
+        api_key (str): Jina API key
+
+    Returns:
+        str: The final (or, when cancelled, partial) response text
+    """
+    events = deepsearch_events(query, conversation_history, api_key)
+    try:
+        for data in events:
+            if job.cancelled:
+                break
+            progress = {
+                key: data[source]
+                for key, source in (
+                    ("visited_urls", "visitedURLs"),
+                    ("read_urls", "readURLs"),
+                    ("num_urls", "numURLs"),
+                )
+                if source in data
+            }
+            if progress:
+                job.set_progress(**progress)
+            content = _delta_content(data)
+            if content:
+                job.append_text(content)
+    finally:
+        # Closes the upstream stream when the job is cancelled
+        events.close()
+    return job.text
+
+
+@traced()
+def jina_deepsearch(client, query, conversation_history, api_key=None):
+    """
+    Call Jina DeepSearch API with Streamlit streaming display.
+
+    Args:
+        client: OpenAI client (not used but kept for consistent interface)
+        query (str): The user's query
+        conversation_history (list): Previous conversation messages
+        api_key (str, optional): Jina API key. Defaults to None.
+
+    Returns:
+        str: The final complete response text
+    """
+    if not api_key:
+        api_key = st.secrets.get("JINA_API_KEY", "")
+        if not api_key:
+            error_msg = "JINA_API_KEY not found in secrets"
+            st.error(error_msg)
+            return f"Error: {error_msg}"
+
+    # Rate-limited display of the reasoning and the answer
+    renderer = StreamRenderer(st.empty(), unsafe_allow_html=True)
+    timer = get_turn_timer()
 
     try:
-        with httpx.Client(timeout=60.0) as client:
-            with client.stream("POST", url, json=payload, headers=headers) as response:
-                response.raise_for_status()
-                for chunk in response.iter_lines():
-                    if chunk.startswith("data: "):
-                        chunk = chunk[6:]  # Remove "data: " prefix
-                        if chunk == "[DONE]":
-                            break
-                        try:
-                            data = json.loads(chunk)
-
-                            # Track search metadata
-                            if "visitedURLs" in data:
-                                st.session_state["jina_visited_urls"] = data[
-                                    "visitedURLs"
-                                ]
-                            if "readURLs" in data:
-                                st.session_state["jina_read_urls"] = data["readURLs"]
-                            if "numURLs" in data:
-                                st.session_state["jina_num_urls"] = data.get(
-                                    "numURLs", 0
-                                )
-
-                            # Extract content from the response
-                            if "choices" in data and len(data["choices"]) > 0:
-                                delta = data["choices"][0].get("delta", {})
-                                if "content" in delta:
-                                    content = delta["content"]
-
-                                    # Handle thinking sections
-                                    if "<think>" in content:
-                                        is_thinking = True
-                                        thinking_content = content.split("<think>")[1]
-                                        # Show thinking spinner
-                                        thinking_placeholder.markdown("🤔 Thinking...")
-                                    elif "</think>" in content:
-                                        is_thinking = False
-                                        # Complete thinking content
-                                        thinking_content += content.split("</think>")[0]
-                                        # Display thinking section
-                                        thinking_section = f"""<details class="thinking-details" open>
-                                            <summary>💭 Thinking Process</summary>
-                                            <div class="thinking-content">
-                                                <div class="thinking-text">{thinking_content}</div>
-                                            </div>
-                                        </details>"""
-                                        full_response += thinking_section
-                                        thinking_content = ""
-                                        thinking_placeholder.empty()
-                                    elif is_thinking:
-                                        thinking_content += content
-                                        # Update thinking display
-                                        thinking_placeholder.markdown(
-                                            f"{thinking_content}..."
-                                        )
-                                    else:
-                                        full_response += content
-
-                                    # Update main display
-                                    message_placeholder.markdown(
-                                        full_response + "▌", unsafe_allow_html=True
-                                    )
-
-                        except json.JSONDecodeError:
-                            continue
-
-                # Display final response without cursor
-                message_placeholder.markdown(full_response, unsafe_allow_html=True)
+        with timer.stage(STREAM_TIME):
+            for data in deepsearch_events(query, conversation_history, api_key):
+                # Track search metadata
+                if "visitedURLs" in data:
+                    st.session_state["jina_visited_urls"] = data["visitedURLs"]
+                if "readURLs" in data:
+                    st.session_state["jina_read_urls"] = data["readURLs"]
+                if "numURLs" in data:
+                    st.session_state["jina_num_urls"] = data.get("numURLs", 0)
+
+                # Extract content from the response
+                content = _delta_content(data)
+                if content:
+                    timer.on_token(content)
+
+                    # <think> sections are parsed by the renderer,
+                    # even when a tag is split across chunks
+                    renderer.write(content)
+
+            # Display final response without cursor
+            full_response = renderer.close()
 
         return full_response
 
+    except DeadlineExceeded:
+        error_msg = "Jina DeepSearch ran out of time for this turn"
+        logger.warning(error_msg)
+        st.warning(f"{error_msg}. Try running it in the background.")
+        return f"Error: {error_msg}"
+    except (SchedulerOverloaded, CircuitOpenError) as e:
+        error_msg = str(e)
+        logger.warning(error_msg)
+        st.warning(error_msg)
+        return f"Error: {error_msg}"
     except httpx.HTTPStatusError as e:
         error_msg = f"HTTP error in Jina DeepSearch: {e}"
         logger.error(error_msg)
         st.error(error_msg)
         return f"Error: {error_msg}"
-    except httpx.RequestError as e:
+    except (httpx.RequestError, SSEError) as e:
         error_msg = f"Request error in Jina DeepSearch: {e}"
         logger.error(error_msg)
         st.error(error_msg)
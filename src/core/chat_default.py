@@ -1,11 +1,29 @@
 import streamlit as st
 
+from src.services.model_router import DEFAULT_MODEL
+from src.utils.cancellation import cancellable
+from src.utils.deadline import current_deadline
 from src.utils.logger import Logger
+from src.utils.response_cache import (
+    CompletionWatcher,
+    cache_response,
+    get_cached_response,
+    replay_stream,
+)
+from src.utils.stream_renderer import render_stream
+from src.utils.timing import get_turn_timer
+from src.utils.tracing import traced
 
 logger = Logger("core")
 
 
-def chat_with_default(client, prompt, history_input):
+def build_messages(history_input):
+    """Turn the chat history into the model input of a standard chat turn."""
+    return [{"role": m["role"], "content": m["content"]} for m in history_input]
+
+
+@traced()
+def chat_with_default(client, prompt, history_input, model=DEFAULT_MODEL):
     """
     Standard chat without additional tools or specialized capabilities.
 
@@ -13,23 +31,36 @@ def chat_with_default(client, prompt, history_input):
         client: OpenAI client instance
         prompt: User's query
         history_input: List of previous messages
+        model: Model chosen by the router
 
     Returns:
         full_response: The final text response
     """
+    messages = build_messages(history_input)
+
     try:
+        # Replay a cached answer to the same (or a near-identical) question
+        cached = get_cached_response(messages, model=model)
+        if cached is not None:
+            return render_stream(get_turn_timer().track_stream(replay_stream(cached)))
+
         # Create a streaming chat completion
-        stream = client.chat.completions.create(
-            model="qwen2.5-72b-instruct",
-            messages=[
-                {"role": m["role"], "content": m["content"]} for m in history_input
-            ],
-            stream=True,
+        stream = cancellable(
+            client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                **current_deadline().timeout_kwargs(),
+            )
         )
 
-        # Display the streaming response using Streamlit's built-in streaming
-        full_response = st.write_stream(stream)
+        # Display the streaming response at a limited frame rate
+        watcher = CompletionWatcher(stream)
+        full_response = render_stream(get_turn_timer().track_stream(watcher))
 
+        # A stopped or truncated answer must not be replayed as a complete one
+        if watcher.completed:
+            cache_response(messages, full_response, model=model)
         return full_response
 
     except Exception as e:
@@ -1,22 +1,106 @@
 # Function to call Gemini API with Google Search grounding
-import json
+import os
 
 import httpx
 import streamlit as st
 
+from src.services.resilience import CircuitOpenError
+from src.services.scheduler import SchedulerOverloaded
+from src.services.sse_client import SSEError, iter_sse_json, stream_sse
+from src.utils.deadline import DeadlineExceeded
+from src.utils.history_manager import get_history_input
 from src.utils.logger import Logger
+from src.utils.stream_renderer import StreamRenderer
+from src.utils.think_parser import answer_text
+from src.utils.timing import STREAM_TIME, get_turn_timer
+from src.utils.tracing import traced
 
 logger = Logger("chat_grd_w_gg")
 
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.0-flash")
 
+# Token budget for the conversation history sent with a grounded question
+GROUNDING_HISTORY_TOKENS = int(os.environ.get("GROUNDING_HISTORY_TOKENS", "4000"))
+
+
+def build_gemini_contents(prompt, history_input):
+    """
+    Convert chat messages to Gemini "contents" and a system instruction.
+
+    Args:
+        prompt (str): The user's query
+        history_input (list): Previous conversation messages (may include system prompts)
+
+    Returns:
+        tuple: (contents, system_instruction or None)
+    """
+    history_input = history_input or []
+    system_text = "\n\n".join(
+        m["content"] for m in history_input if m["role"] == "system" and m["content"]
+    )
+
+    contents = []
+    for message in get_history_input(history_input, GROUNDING_HISTORY_TOKENS):
+        role = "model" if message["role"] == "assistant" else "user"
+        text = (
+            answer_text(message["content"]) if role == "model" else message["content"]
+        )
+        if not text:
+            continue
+        # Gemini expects alternating turns; merge consecutive ones of the same role
+        if contents and contents[-1]["role"] == role:
+            contents[-1]["parts"][0]["text"] += "\n\n" + text
+        else:
+            contents.append({"role": role, "parts": [{"text": text}]})
+
+    # Make sure the conversation ends with the current question
+    if not (
+        contents
+        and contents[-1]["role"] == "user"
+        and contents[-1]["parts"][0]["text"].endswith(prompt)
+    ):
+        contents.append({"role": "user", "parts": [{"text": prompt}]})
+
+    system_instruction = {"parts": [{"text": system_text}]} if system_text else None
+    return contents, system_instruction
+
+
+def render_grounding_sources(grounding_metadata):
+    """Show the Google search entry point and the sources of a grounded answer."""
+    sources = [
+        chunk["web"]
+        for chunk in grounding_metadata.get("groundingChunks", [])
+        if chunk.get("web", {}).get("uri")
+    ]
+    if sources:
+        st.caption(
+            "Sources: "
+            + " · ".join(
+                f"[{source.get('title') or source['uri']}]({source['uri']})"
+                for source in sources
+            )
+        )
+
+    rendered_content = grounding_metadata.get("searchEntryPoint", {}).get(
+        "renderedContent", ""
+    )
+    if rendered_content:
+        st.components.v1.html(
+            rendered_content,
+            height=100,
+            scrolling=False,
+        )
+
+
+@traced()
 def google_grounding_search(client, prompt, history_input=None, api_key=None):
     """
-    Call Gemini API with Google Search grounding enabled.
+    Stream a Gemini answer with Google Search grounding enabled.
 
     Args:
         client: OpenAI client (not used but kept for consistent interface)
         prompt (str): The user's query
-        history_input: Previous conversation messages (not used by Gemini grounding API)
+        history_input: Previous conversation messages, sent within a token budget
         api_key (str, optional): Gemini API key. Defaults to None.
 
     Returns:
@@ -29,100 +113,80 @@ def google_grounding_search(client, prompt, history_input=None, api_key=None):
             st.error(error_msg)
             return f"Error: {error_msg}"
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
+    url = (
+        "https://generativelanguage.googleapis.com/v1beta/models/"
+        f"{GEMINI_MODEL}:streamGenerateContent?alt=sse"
+    )
 
-    # Exactly match the payload structure from your working bash command
+    contents, system_instruction = build_gemini_contents(prompt, history_input)
     payload = {
-        "contents": [{"parts": [{"text": prompt}]}],
+        "contents": contents,
         "tools": [{"google_search": {}}],
     }
+    if system_instruction:
+        payload["systemInstruction"] = system_instruction
 
-    headers = {"Content-Type": "application/json"}
+    # The key goes in a header: request URLs end up in error messages and logs
+    headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
 
-    message_placeholder = st.empty()
+    # Rate-limited display of the answer as it streams in
+    renderer = StreamRenderer(st.empty())
+    timer = get_turn_timer()
+    grounding_metadata = {}
 
     try:
-        with st.spinner("Searching and grounding with Google..."):
-            # Add more debugging info
-            logger.info(f"Sending request to Gemini API: {url}")
-            logger.info(f"Payload: {json.dumps(payload)}")
-
-            with httpx.Client(timeout=30.0, verify=True) as client:
-                response = client.post(url, json=payload, headers=headers)
-
-                # Log the response status and headers
-                logger.info(f"Response status: {response.status_code}")
-                logger.info(f"Response headers: {response.headers}")
-
-                # Try to get the response text regardless of status
-                response_text = response.text
-                logger.info(
-                    f"Response text: {response_text[:500]}..."
-                )  # Truncate if too long
-
-                response.raise_for_status()
-                response_json = response.json()
-
-                # Store response for UI components that need it
-                st.session_state["grounding_response"] = response_json
-
-                # Extract the main text response
-                full_response = ""
-                if (
-                    "candidates" in response_json
-                    and len(response_json["candidates"]) > 0
-                ):
-                    candidate = response_json["candidates"][0]
-                    if "content" in candidate and "parts" in candidate["content"]:
-                        for part in candidate["content"]["parts"]:
-                            if "text" in part:
-                                full_response += part["text"]
-
-                # Display main response text
-                message_placeholder.markdown(full_response)
-
-                # Extract and display rendered HTML content if available
-                if (
-                    "candidates" in response_json
-                    and len(response_json["candidates"]) > 0
-                    and "groundingMetadata" in response_json["candidates"][0]
-                    and "searchEntryPoint"
-                    in response_json["candidates"][0]["groundingMetadata"]
-                ):
-                    rendered_content = response_json["candidates"][0][
-                        "groundingMetadata"
-                    ]["searchEntryPoint"].get("renderedContent", "")
-
-                    if rendered_content:
-                        st.components.v1.html(
-                            rendered_content,
-                            height=100,
-                            scrolling=False,
-                        )
-
-                return full_response
-
+        logger.info(f"Streaming grounded answer from Gemini ({len(contents)} turns)")
+        with timer.stage(STREAM_TIME):
+            events = stream_sse("gemini", url, json_body=payload, headers=headers)
+            for data in iter_sse_json(events, "gemini"):
+                candidates = data.get("candidates") or [{}]
+                candidate = candidates[0]
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        timer.on_token(part["text"])
+                        renderer.write(part["text"])
+
+                # Grounding metadata arrives with the last chunks
+                if candidate.get("groundingMetadata"):
+                    grounding_metadata = candidate["groundingMetadata"]
+
+            # Display final response without cursor
+            full_response = renderer.close()
+
+        # Store response for UI components that need it
+        st.session_state["grounding_response"] = {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": full_response}]},
+                    "groundingMetadata": grounding_metadata,
+                }
+            ]
+        }
+
+        render_grounding_sources(grounding_metadata)
+        return full_response
+
+    except DeadlineExceeded:
+        error_msg = "Gemini grounding ran out of time for this turn"
+        logger.warning(error_msg)
+        st.warning(error_msg)
+        return f"Error: {error_msg}"
+    except (SchedulerOverloaded, CircuitOpenError) as e:
+        error_msg = str(e)
+        logger.warning(error_msg)
+        st.warning(error_msg)
+        return f"Error: {error_msg}"
     except httpx.HTTPStatusError as e:
         error_msg = f"HTTP error: {e}"
         logger.error(error_msg)
-        logger.error(
-            f"Response content: {e.response.text if hasattr(e, 'response') else 'No response'}"
-        )
+        logger.error(f"Response content: {e.response.text}")
         st.error(error_msg)
         return f"Error: {error_msg}"
-    except httpx.RequestError as e:
+    except (httpx.RequestError, SSEError) as e:
         error_msg = f"Request error: {e}"
         logger.error(error_msg)
         st.error(error_msg)
         return f"Error: {error_msg}"
-    except json.JSONDecodeError as e:
-        error_msg = f"JSON decode error: {e}"
-        logger.error(error_msg)
-        logger.error(
-            f"Raw response: {response_text if 'response_text' in locals() else 'Unknown'}"
-        )
-        st.error(error_msg)
-        return f"Error: {error_msg}"
     except Exception as e:
         error_msg = f"Unexpected error: {e}"
         logger.error(error_msg, exc_info=True)
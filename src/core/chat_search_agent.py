@@ -1,13 +1,25 @@
 import json
+import time
 from datetime import datetime
 
 import streamlit as st
 
+from src.services.model_router import DEFAULT_MODEL
+from src.utils.cancellation import cancellable
+from src.utils.deadline import DeadlineExceeded, current_deadline
 from src.utils.logger import Logger
 from src.utils.serper_utils import serper_search
+from src.utils.stream_renderer import StreamRenderer
+from src.utils.timing import SEARCH_REQUEST, TOOL_ARGUMENTS, get_turn_timer
+from src.utils.tracing import traced
 
 logger = Logger("chat_search_agent")
 
+# Shortest time worth giving the web search, and time kept for the final answer
+# (seconds); with less left than both the answer is written without searching
+SEARCH_MIN_SECONDS = 5.0
+ANSWER_RESERVE = 15.0
+
 # Define the search tools
 SEARCH_TOOLS = [
     {
@@ -41,7 +53,8 @@ SEARCH_TOOLS = [
 ]
 
 
-def chat_with_search(client, prompt, history_input):
+@traced()
+def chat_with_search(client, prompt, history_input, model=DEFAULT_MODEL):
     """
     Chat agent that uses web search to find information before responding.
 
@@ -49,6 +62,7 @@ def chat_with_search(client, prompt, history_input):
         client: OpenAI client instance
         prompt: User's query
         history_input: List of previous messages
+        model: Model chosen by the router
 
     Returns:
         str: The final response text
@@ -61,39 +75,47 @@ def chat_with_search(client, prompt, history_input):
         }
     ] + [{"role": m["role"], "content": m["content"]} for m in history_input]
 
+    timer = get_turn_timer()
+    deadline = current_deadline()
+
     try:
         # Start the streaming completion with tools
-        completion = client.chat.completions.create(
-            model="qwen2.5-72b-instruct",
-            messages=messages,
-            tools=SEARCH_TOOLS,
-            tool_choice="auto",
-            stream=True,
+        completion = cancellable(
+            client.chat.completions.create(
+                model=model,
+                messages=messages,
+                tools=SEARCH_TOOLS,
+                tool_choice="auto",
+                stream=True,
+                **deadline.timeout_kwargs(),
+            )
         )
 
         # Variables for tracking the stream state
         response_messages = []  # For tool responses
         message_placeholder = st.empty()  # For displaying content
-        full_response = ""  # Final response accumulator
+        renderer = StreamRenderer(message_placeholder)  # Rate-limited display
         tool_call_id = None  # Current tool call ID
         tool_args_json = ""  # Accumulator for tool arguments JSON
         is_tool_call_complete = False  # Flag for completed tool calls
+        search_skipped = False  # Search left out to stay within the deadline
+        tool_args_started = None  # When the first tool call fragment arrived
 
         # Define available search functions
         available_functions = {"serper_search": serper_search}
 
         # Process the stream
-        for chunk in completion:
-            logger.info(chunk)
+        for chunk in timer.track_stream(completion):
+            logger.debug(chunk, sample_key="search_agent_chunk")
             # Check for regular content
             if chunk.choices[0].delta.content is not None:
-                content = chunk.choices[0].delta.content
-                full_response += content
-                message_placeholder.markdown(full_response + "▌")
+                renderer.write(chunk.choices[0].delta.content)
 
             # Check for tool calls
             if chunk.choices[0].delta.tool_calls:
                 tool_call = chunk.choices[0].delta.tool_calls[0]
+                if tool_args_started is None:
+                    tool_args_started = time.perf_counter()
 
                 # If this is the start of a tool call, get the ID and function name
                 if tool_call.id is not None:
@@ -106,8 +128,9 @@ def chat_with_search(client, prompt, history_input):
                 # Accumulate the JSON arguments
                 if tool_call.function and tool_call.function.arguments:
                     tool_args_json += tool_call.function.arguments
-                    logger.info(
-                        f"Received tool call arguments fragment: {tool_call.function.arguments}"
+                    logger.debug(
+                        f"Received tool call arguments fragment: {tool_call.function.arguments}",
+                        sample_key="search_agent_tool_args",
                     )
 
             # Check if the stream is finished or a tool call is complete
@@ -116,8 +139,25 @@ def chat_with_search(client, prompt, history_input):
                     f"Stream finished with reason: {chunk.choices[0].finish_reason}"
                 )
 
+                if tool_args_started is not None:
+                    timer.record(
+                        TOOL_ARGUMENTS, time.perf_counter() - tool_args_started
+                    )
+
+                # Without time for both the search and the answer, keep the answer
+                if (
+                    tool_args_json
+                    and not is_tool_call_complete
+                    and not deadline.allows(SEARCH_MIN_SECONDS + ANSWER_RESERVE)
+                ):
+                    deadline.degrade("search", "skipped")
+                    st.caption(
+                        "⏱️ Answered without a web search to stay within the time limit."
+                    )
+                    search_skipped = True
+
                 # If we have a tool call in progress, execute it
-                if tool_args_json and not is_tool_call_complete:
+                elif tool_args_json and not is_tool_call_complete:
                     with st.spinner("Searching the web...🔍"):
                         try:
                             # Parse the complete JSON arguments
@@ -132,9 +172,12 @@ def chat_with_search(client, prompt, history_input):
                             function_name = (
                                 "serper_search"  # Default to this if we don't have it
                             )
-                            search_result = available_functions[function_name](
-                                **func_args
-                            )
+                            # The search may not eat into the time kept for the answer
+                            with timer.stage(SEARCH_REQUEST):
+                                search_result = available_functions[function_name](
+                                    **func_args,
+                                    deadline=deadline.reserve(ANSWER_RESERVE),
+                                )
                             func_response = json.dumps(search_result)
 
                             # Add the search results to the message history
@@ -164,17 +207,21 @@ def chat_with_search(client, prompt, history_input):
                             logger.error(f"Partial JSON received: {tool_args_json}")
                         except Exception as e:
                             logger.error(f"Search error: {str(e)}", exc_info=True)
-                else:
-                    message_placeholder.markdown(full_response)
+
+        # Draw any text still buffered by the renderer
+        full_response = renderer.close()
 
         # After processing all chunks, use the search results to get a final response
         if is_tool_call_complete and response_messages:
             # Clear previous response
-            full_response = ""
-            message_placeholder.empty()
+            renderer.clear()
 
             # Create a new completion using the search results
-            logger.info(response_messages)
+            logger.debug(
+                f"Answering from {len(response_messages)} search result(s)",
+                extra={"characters": len(response_messages[-1]["content"])},
+                sample_key="search_agent_results",
+            )
             # Add the original messages plus the function response
             final_messages = [
                 {"role": m["role"], "content": m["content"]} for m in history_input
@@ -183,15 +230,33 @@ def chat_with_search(client, prompt, history_input):
                 Dưới đây là phần thông tin:\n  {response_messages[-1]['content']} \n\n\
                 Đây là câu hỏi của người dùng {prompt}"
 
-            # Stream the final response using st.write_stream
-            final_stream = client.chat.completions.create(
-                model="qwen2.5-72b-instruct",
-                messages=final_messages,
-                stream=True,
+            # Stream the final response into the same placeholder
+            final_stream = cancellable(
+                client.chat.completions.create(
+                    model=model,
+                    messages=final_messages,
+                    stream=True,
+                    **deadline.timeout_kwargs(),
+                )
             )
 
-            # Use Streamlit's built-in streaming
-            full_response = st.write_stream(final_stream)
+            full_response = renderer.consume(timer.track_stream(final_stream))
+
+        # Search skipped for time: answer from the conversation alone
+        elif search_skipped:
+            renderer.clear()
+            final_stream = cancellable(
+                client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": m["role"], "content": m["content"]}
+                        for m in history_input
+                    ],
+                    stream=True,
+                    **deadline.timeout_kwargs(),
+                )
+            )
+            full_response = renderer.consume(timer.track_stream(final_stream))
 
         # If we didn't get a complete tool call response
         elif not full_response.strip():
@@ -202,6 +267,11 @@ def chat_with_search(client, prompt, history_input):
 
         return full_response
 
+    except DeadlineExceeded:
+        deadline.degrade("answer", "timed_out")
+        error_message = "Sorry, I ran out of time to answer. Please try again."
+        st.warning(error_message)
+        return error_message
     except Exception as e:
         logger.error(f"Error in search agent: {str(e)}", exc_info=True)
         error_message = f"Sorry, an error occurred: {str(e)}"
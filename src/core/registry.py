@@ -0,0 +1,164 @@
+"""Registry of chat-mode engines, loaded lazily on first use."""
+
+import importlib
+import threading
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+from src.utils.logger import Logger
+
+logger = Logger("engine_registry")
+
+# Capability flags describing what an engine does
+WEB_SEARCH = "web_search"  # Calls a search provider before answering
+SEARCH_RESULTS = "search_results"  # Leaves last_search_* in session state for display
+GROUNDING = "grounding"  # Answers are grounded by the provider itself
+REASONING = "reasoning"  # Emits <think> reasoning sections
+LONG_RUNNING = "long_running"  # May take minutes to complete
+MODEL_CHOICE = "model_choice"  # Accepts a model= argument chosen by the router
+SPECULATIVE = "speculative"  # Module has build_messages(); follow-ups can be prefetched
+
+DEFAULT_ENGINE = "Default"
+
+
+class ChatEngine:
+    """
+    A chat mode: display metadata plus a lazily imported streaming function.
+
+    The function must accept ``(client, prompt, history_input, **kwargs)``, render
+    its output into the current Streamlit container and return the final text.
+
+    Speculative modes expose ``build_messages(history_input)`` in the same module,
+    returning the model input of a turn, so follow-up answers can be prefetched.
+
+    Long modes may also name a ``job_function`` in the same module, called as
+    ``(job, prompt, history_input, api_key)`` on the background job runner.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        icon: str,
+        description: str,
+        module: str,
+        function: str,
+        capabilities: Iterable[str] = (),
+        job_function: Optional[str] = None,
+        api_key_secret: Optional[str] = None,
+    ):
+        self.name = name
+        self.icon = icon
+        self.description = description
+        self.module = module
+        self.function = function
+        self.capabilities: FrozenSet[str] = frozenset(capabilities)
+        self.job_function = job_function
+        self.api_key_secret = api_key_secret
+        self._func: Optional[Callable[..., str]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the engine's module has been imported."""
+        return self._func is not None
+
+    def load(self) -> Callable[..., str]:
+        """Import the engine's module on first use and return its streaming function."""
+        if self._func is None:
+            with self._lock:
+                if self._func is None:
+                    module = importlib.import_module(self.module)
+                    self._func = getattr(module, self.function)
+                    logger.info(f"Loaded chat engine '{self.name}' from {self.module}")
+        return self._func
+
+    def load_job(self) -> Callable[..., str]:
+        """Return the engine's background job function."""
+        module = importlib.import_module(self.module)
+        return getattr(module, self.job_function)
+
+    def load_messages_builder(self) -> Callable[[List[Dict]], List[Dict]]:
+        """Return the engine's function turning history into model input."""
+        module = importlib.import_module(self.module)
+        return getattr(module, "build_messages")
+
+    def stream(self, client, prompt: str, history_input: List[Dict], **kwargs) -> str:
+        """Run the engine; output is streamed into the current container."""
+        return self.load()(client, prompt, history_input, **kwargs)
+
+    def has(self, capability: str) -> bool:
+        """Whether the engine declares a capability."""
+        return capability in self.capabilities
+
+
+_engines: Dict[str, ChatEngine] = {}
+
+
+def register_engine(engine: ChatEngine) -> ChatEngine:
+    """Add an engine to the registry (replacing one with the same name)."""
+    _engines[engine.name] = engine
+    return engine
+
+
+def get_engine(name: Optional[str]) -> ChatEngine:
+    """Return the engine with this name, falling back to the default engine."""
+    return _engines.get(name or DEFAULT_ENGINE, _engines[DEFAULT_ENGINE])
+
+
+def list_engines() -> List[ChatEngine]:
+    """Return all engines in registration order."""
+    return list(_engines.values())
+
+
+# Built-in engines; none of these modules is imported until the mode is used
+register_engine(
+    ChatEngine(
+        DEFAULT_ENGINE,
+        "💬",
+        "**Standard chat** without additional tools",
+        "src.core.chat_default",
+        "chat_with_default",
+        capabilities={MODEL_CHOICE, SPECULATIVE},
+    )
+)
+register_engine(
+    ChatEngine(
+        "Search-Agent",
+        "🔍",
+        "Uses **web search** to find information before responding",
+        "src.core.chat_search_agent",
+        "chat_with_search",
+        capabilities={WEB_SEARCH, SEARCH_RESULTS, MODEL_CHOICE},
+    )
+)
+register_engine(
+    ChatEngine(
+        "Grounding Truth with Google",
+        "🌐",
+        "Uses **Google search API** for real-time information",
+        "src.core.chat_grd_w_gg",
+        "google_grounding_search",
+        capabilities={WEB_SEARCH, GROUNDING},
+    )
+)
+register_engine(
+    ChatEngine(
+        "Deep-Research",
+        "🔍🧠🌐",
+        "Performs in-depth research with **Jina DeepSearch**",
+        "src.core.chat_deep_research",
+        "jina_deepsearch",
+        capabilities={WEB_SEARCH, REASONING, LONG_RUNNING},
+        job_function="run_deepsearch_job",
+        api_key_secret="JINA_API_KEY",
+    )
+)
+register_engine(
+    ChatEngine(
+        "ReAct-Agent",
+        "🧠",
+        "Uses **step-by-step reasoning** approach",
+        "src.core.chat_ReAct_agent",
+        "chat_with_react_agent",
+        capabilities={MODEL_CHOICE, SPECULATIVE},
+    )
+)
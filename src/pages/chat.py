@@ -1,14 +1,31 @@
 import os
 import sys
 
-import openai
 import streamlit as st
 
 sys.path.append(os.getcwd())
 
-from core.chat_deep_research import jina_deepsearch
-from core.chat_grd_w_gg import google_grounding_search
-from core.chat_search_agent import chat_with_search
+from src.core.registry import (
+    DEFAULT_ENGINE,
+    LONG_RUNNING,
+    MODEL_CHOICE,
+    SEARCH_RESULTS,
+    SPECULATIVE,
+    WEB_SEARCH,
+    get_engine,
+)
+from src.services.job_runner import (
+    BACKGROUND_JOBS_ENABLED,
+    JobLimitError,
+    job_runner,
+)
+from src.services.model_router import (
+    AUTO_MODEL,
+    DEFAULT_MODEL,
+    choose_model,
+    get_routed_client,
+)
+from src.services.scheduler import scheduled_as
 from src.ui_components.chat_interface import (
     apply_css_styling,
     clean_thinking_tags,
@@ -16,20 +33,40 @@ from src.ui_components.chat_interface import (
     render_chat_input,
     render_chat_modes,
     show_chat_history,
+    show_followups,
     show_search_results,
-    stream_chat_message,
+    show_timing_panel,
+)
+from src.ui_components.compare_view import (
+    render_compare_modes,
+    run_comparison,
+    show_comparison,
+)
+from src.ui_components.job_view import (
+    show_job_outcome,
+    show_running_job,
+    stream_job,
 )
 from src.ui_components.sidebar import render_sidebar
+from src.utils.cancellation import cancel_session_generation, start_generation
+from src.utils.chat_metadata import forget_chat_metadata, schedule_chat_metadata
 from src.utils.chat_utils import (
     generate_conversation_id,
     prepare_model_input,
     save_current_chat_data,
 )
+from src.utils.deadline import (
+    LONG_TURN_DEADLINE,
+    TURN_DEADLINE,
+    WEB_SEARCH_MIN_BUDGET,
+    start_deadline,
+)
+from src.utils.helper import chat_key
 from src.utils.history_manager import (
     create_new_chat,
     delete_legacy_chat,
     delete_session,
-    extract_chars,
+    generate_session_id,
     initialize_chat_history,
     load_legacy_chat,
     rename_chat,
@@ -37,10 +74,31 @@ from src.utils.history_manager import (
     save_conversation_history,
 )
 from src.utils.logger import Logger
+from src.utils.memory_index import forget_chat
+from src.utils.memory_profiler import forget_session, record_session_memory
+from src.utils.response_cache import replay_stream
+from src.utils.speculation import (
+    SPECULATION_ENABLED,
+    discard_speculation,
+    get_followups,
+    start_speculation,
+    take_speculative_answer,
+)
+from src.utils.stream_renderer import render_stream
 from src.utils.streamlit_utils import (
     apply_js_code,
     initialize_page,
 )
+from src.utils.summarizer import forget_summary, restore_summary
+from src.utils.timing import (
+    PERSISTENCE,
+    PROMPT_ASSEMBLY,
+    get_turn_timer,
+    record_turn_metrics,
+    start_turn_timer,
+)
+from src.utils.token_counter import message_tokens
+from src.utils.tracing import start_trace
 
 logger = Logger("chat")
 
@@ -72,6 +130,7 @@ if "history" + current_chat not in st.session_state:
     if "context" in loaded_data:
         for key, value in loaded_data["context"].items():
             st.session_state[key + current_chat + "value"] = value
+    restore_summary(current_chat, loaded_data.get("summary"))
 
 
 # Function to create a new chat
@@ -79,6 +138,10 @@ def create_chat_fun():
     """Create a new chat"""
     new_chat_name, session_id = create_new_chat()
 
+    # The previous chat's memory report is replaced by the new session's
+    if "session_id" in st.session_state:
+        forget_session(st.session_state["session_id"])
+
     # Update session state
     st.session_state["history_chats"].append(new_chat_name)
     st.session_state["current_chat_index"] = len(st.session_state["history_chats"]) - 1
@@ -95,12 +158,16 @@ def create_chat_fun():
 def delete_chat_fun():
     """Delete the current chat"""
     if len(st.session_state["history_chats"]) > 1:
-        # Delete the chat file
+        # Delete the chat file and what is kept in memory about it
         delete_legacy_chat(current_chat)
+        forget_chat(current_chat)
+        forget_chat_metadata(current_chat)
+        forget_summary(current_chat)
 
         # Also delete in the new history format if session_id exists
         if "session_id" in st.session_state:
             delete_session(st.session_state["session_id"])
+            forget_session(st.session_state["session_id"])
 
         # Remove from the list
         st.session_state["history_chats"].pop(st.session_state["current_chat_index"])
@@ -145,124 +212,403 @@ def reset_chat_name_fun(new_name):
         rename_session(st.session_state["session_id"], new_name)
 
 
+# Function to stop the running generation
+def stop_generation_fun():
+    """Stop the current generation (the rerun interrupts it and keeps its output)"""
+    st.session_state["generation_stopped"] = True
+    cancel_session_generation(st.session_state["session_id"])
+    job_runner.cancel_chat_jobs(chat_key(current_chat))
+
+
+# Function to get the id of the browser session
+def current_user_id():
+    """Return the id of this browser session, which outlives its chats"""
+    # session_id changes with every new chat; limits and fair queuing apply per
+    # browser session, to jobs and interactive turns alike
+    if "user_id" not in st.session_state:
+        st.session_state["user_id"] = generate_session_id()
+    return st.session_state["user_id"]
+
+
+# Function to run a long chat mode as a background job
+def run_as_job(engine, prompt, history_input):
+    """
+    Submit the turn to the background job runner and stream its progress.
+
+    Returns:
+        tuple: (job or None, response text); the job keeps running if the user leaves
+    """
+    api_key = st.secrets.get(engine.api_key_secret, "")
+    if not api_key:
+        # Let the engine report the missing key
+        return None, engine.stream(None, prompt, history_input)
+
+    try:
+        job = job_runner.submit(
+            current_user_id(),
+            chat_key(current_chat),
+            engine.name,
+            prompt,
+            engine.load_job(),
+            prompt,
+            history_input,
+            api_key,
+        )
+    except JobLimitError as e:
+        st.warning(str(e))
+        return None, f"Error: {e}"
+
+    # Save the question now so it is on disk if the tab is closed mid-job
+    save_current_chat_data(current_chat)
+    return job, stream_job(job)
+
+
+# Function to add answers of background jobs to the chat
+def deliver_finished_jobs():
+    """Add the answers of jobs that finished while the page was not attached"""
+    delivered = False
+    history = st.session_state["history" + current_chat]
+    for job in job_runner.jobs_for_chat(chat_key(current_chat)):
+        if not job.finished:
+            continue
+        # The runner saved the answer to the chat file; it is already here if
+        # the chat was loaded after that
+        if any(message.get("job_id") == job.id for message in history):
+            job_runner.mark_delivered(job)
+            continue
+        message = job.to_message()
+        text = message["content"]
+        history.append(message)
+        save_conversation_history(
+            st.session_state["session_id"],
+            generate_conversation_id(job.prompt),
+            job.prompt,
+            clean_thinking_tags(text),
+        )
+        job_runner.mark_delivered(job)
+        show_job_outcome(job)
+        delivered = True
+    if delivered:
+        save_current_chat_data(current_chat)
+
+
+# Function to keep the partial answer of an interrupted generation
+def keep_partial_response(prompt, generation, history, session_id):
+    """
+    Keep what was generated before the run was interrupted.
+
+    While a run is being stopped, every st.* call (including st.session_state access)
+    raises again, so this only touches the history list captured beforehand; the chat
+    file is written by persist_stopped_response on the next run.
+    """
+    partial = generation.partial_text()
+    if not partial.strip():
+        return
+
+    history.append({
+        "role": "assistant",
+        "content": partial,
+        "stopped": True,
+        "unsaved": True,
+        "tokens": message_tokens({"content": partial}),
+    })
+    save_conversation_history(
+        session_id,
+        generate_conversation_id(prompt),
+        prompt,
+        clean_thinking_tags(partial),
+    )
+    logger.info(f"Kept {len(partial)} characters of an interrupted generation")
+
+
+# Function to save a partial answer kept during an interrupted run
+def persist_stopped_response():
+    """Write the chat file if the last run was interrupted after keeping a partial answer"""
+    history = st.session_state["history" + current_chat]
+    if history and history[-1].pop("unsaved", False):
+        save_current_chat_data(current_chat)
+
+
+# Function to check whether follow-ups are suggested and prefetched
+def speculation_on():
+    """Follow-up speculation is enabled on the server and chosen in the sidebar"""
+    return SPECULATION_ENABLED and st.session_state.get("speculative_followups", False)
+
+
+# Function to suggest follow-ups to an answer and prefetch their answers
+def speculate_followups(client, engine, model, history_input, answer):
+    """Show follow-up chips for the answer just given; answers load in the background"""
+    followups = start_speculation(
+        client,
+        current_chat,
+        len(st.session_state["history" + current_chat]),
+        engine.name,
+        model,
+        history_input + [{"role": "assistant", "content": answer}],
+        engine.load_messages_builder(),
+    )
+    show_followups(followups)
+
+
+# Function to keep one answer of a comparison
+def keep_compared_answer(index):
+    """Add the prompt and the chosen answer of the pending comparison to the chat"""
+    comparison = st.session_state.pop("comparison" + current_chat, None)
+    if comparison is None:
+        return
+    prompt = comparison["prompt"]
+    answer = comparison["answers"][index]
+
+    history = st.session_state["history" + current_chat]
+    history.append({
+        "role": "user",
+        "content": prompt,
+        "tokens": message_tokens({"content": prompt}),
+    })
+    assistant_message = {
+        "role": "assistant",
+        "content": answer["content"],
+        "timings": answer["timings"],
+        "tokens": message_tokens({"content": answer["content"]}),
+        "mode": answer["mode"],
+        "compared_modes": [other["mode"] for other in comparison["answers"]],
+    }
+    if "model" in answer:
+        assistant_message["model"] = answer["model"]
+    history.append(assistant_message)
+
+    save_current_chat_data(current_chat)
+    save_conversation_history(
+        st.session_state["session_id"],
+        generate_conversation_id(prompt),
+        prompt,
+        clean_thinking_tags(answer["content"]),
+    )
+    schedule_chat_metadata(
+        get_routed_client(st.secrets), current_user_id(), current_chat, history
+    )
+
+
+# Function to answer a prompt with several chat modes side by side
+def compare_user_input(prompt, modes):
+    """Run the selected modes concurrently; the user then keeps one answer"""
+    with start_trace("compare_turn", chat=current_chat, modes=modes):
+        timer = start_turn_timer()
+        try:
+            st.chat_message("user").markdown(prompt)
+            discard_speculation(current_chat)
+
+            client = get_routed_client(st.secrets)
+            engines = [get_engine(mode) for mode in modes]
+
+            # The prompt only joins the history together with the kept answer
+            history = st.session_state["history" + current_chat]
+            history.append({
+                "role": "user",
+                "content": prompt,
+                "tokens": message_tokens({"content": prompt}),
+            })
+            try:
+                with timer.stage(PROMPT_ASSEMBLY):
+                    history_input, parameters = prepare_model_input(
+                        current_chat, client=client
+                    )
+            finally:
+                history.pop()
+
+            # Modes that accept a model all get the one the router picks
+            model = choose_model(
+                history_input, st.session_state.get("select_model", AUTO_MODEL)
+            )
+            engine_kwargs = {
+                engine.name: {"model": model}
+                for engine in engines
+                if engine.has(MODEL_CHOICE)
+            }
+
+            stop_placeholder = st.empty()
+            stop_placeholder.button(
+                "⏹️ Stop", key="stop_generation", on_click=stop_generation_fun
+            )
+            session_id = st.session_state["session_id"]
+            with start_generation(session_id), scheduled_as(current_user_id()):
+                comparison = run_comparison(
+                    engines,
+                    client,
+                    prompt,
+                    history_input,
+                    engine_kwargs,
+                    keep_compared_answer,
+                )
+            stop_placeholder.empty()
+
+            st.session_state["comparison" + current_chat] = comparison
+
+        except Exception as e:
+            st.error(f"Error in chat processing: {str(e)}")
+
+
 # Main chat interaction function
 def process_user_input(prompt):
     """Process user input and generate AI response"""
-    try:
-        # Display user message immediately in the chat interface
-        st.chat_message("user").markdown(prompt)
-
-        # Add user message to history
-        st.session_state["history" + current_chat].append({
-            "role": "user",
-            "content": prompt,
-        })
-
-        # Rename chat if first message
-        if len(st.session_state["history" + current_chat]) == 1:
-            new_name = extract_chars(prompt, 18)
-            reset_chat_name_fun(new_name)
-
-        # Get the OpenAI client
-        client = openai.OpenAI(
-            api_key=st.secrets.get("QWEN_API_KEY", ""),
-            base_url="https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
-        )
+    # A new message discards a comparison whose answer was not kept
+    st.session_state.pop("comparison" + current_chat, None)
+    if len(compare_modes) > 1:
+        compare_user_input(prompt, compare_modes)
+        return
+
+    # Resolve the chat mode to an engine (imported on first use)
+    engine = get_engine(chat_mode)
+    budget = LONG_TURN_DEADLINE if engine.has(LONG_RUNNING) else TURN_DEADLINE
+
+    # Upstream requests of the turn are queued as this user's
+    with (
+        start_trace("chat_turn", chat=current_chat) as turn,
+        start_deadline(budget) as deadline,
+        scheduled_as(current_user_id()),
+    ):
+        timer = start_turn_timer()
+        try:
+            # Display user message immediately in the chat interface
+            st.chat_message("user").markdown(prompt)
+
+            # A clicked follow-up may already have been answered in the background
+            position = len(st.session_state["history" + current_chat])
+
+            # Add user message to history
+            st.session_state["history" + current_chat].append({
+                "role": "user",
+                "content": prompt,
+                "tokens": message_tokens({"content": prompt}),
+            })
+
+            # Get a client that routes requests across the configured endpoints
+            client = get_routed_client(st.secrets)
+
+            # Get model input (history and parameters)
+            with timer.stage(PROMPT_ASSEMBLY):
+                history_input, parameters = prepare_model_input(
+                    current_chat, client=client
+                )
+
+            # Too little time left for a web search: answer from the model alone
+            if engine.has(WEB_SEARCH) and not deadline.allows(WEB_SEARCH_MIN_BUDGET):
+                deadline.degrade("engine", DEFAULT_ENGINE)
+                engine = get_engine(DEFAULT_ENGINE)
+                st.caption(
+                    "⏱️ Answered without a web search to stay within the time limit."
+                )
+            turn.set_attribute("mode", engine.name)
 
-        # Get chat configuration
-        chat_mode = st.session_state.get("selection", "Default")
-
-        # Get model input (history and parameters)
-        history_input, parameters = prepare_model_input(current_chat)
-
-        # Process based on chat mode
-        full_response = ""
-
-        match chat_mode:
-            case "Search-Agent":
-                # Create the search agent stream
-                messages = [
-                    {
-                        "role": "system",
-                        "content": "You are Tool Expert. Using Tool always True. Your job is automatically find the best search arguments based on the user query. You must use tools to search the web.",
-                    }
-                ] + [
-                    {"role": m["role"], "content": m["content"]} for m in history_input
-                ]
-                with st.chat_message("assistant"):
-                    # Call the search agent function with our streaming chat message
-                    full_response = chat_with_search(client, prompt, history_input)
+            # Let the router pick the model unless one is selected in the sidebar
+            engine_kwargs = {}
+            if engine.has(MODEL_CHOICE):
+                engine_kwargs["model"] = choose_model(
+                    history_input, st.session_state.get("select_model", AUTO_MODEL)
+                )
+                turn.set_attribute("model", engine_kwargs["model"])
+            speculative = take_speculative_answer(
+                current_chat, prompt, position, engine.name
+            )
+            turn.set_attribute("speculative_hit", speculative is not None)
+
+            # Stream the engine's answer inside an assistant message container
+            with st.chat_message("assistant"):
+                # Clicking Stop reruns the script, which interrupts the generation
+                stop_placeholder = st.empty()
+                stop_placeholder.button(
+                    "⏹️ Stop", key="stop_generation", on_click=stop_generation_fun
+                )
+
+                history = st.session_state["history" + current_chat]
+                session_id = st.session_state["session_id"]
+                generation = start_generation(session_id)
+                job = None
+                try:
+                    with generation:
+                        if speculative is not None:
+                            full_response = render_stream(
+                                get_turn_timer().track_stream(
+                                    replay_stream(speculative)
+                                )
+                            )
+                        elif engine.job_function and BACKGROUND_JOBS_ENABLED:
+                            job, full_response = run_as_job(
+                                engine, prompt, history_input
+                            )
+                        else:
+                            full_response = engine.stream(
+                                client, prompt, history_input, **engine_kwargs
+                            )
+                finally:
+                    # A background job keeps running; its answer is delivered later
+                    if generation.interrupted and job is None:
+                        keep_partial_response(prompt, generation, history, session_id)
+                if job is not None:
+                    job_runner.mark_delivered(job)
+                stop_placeholder.empty()
+
+                if engine.has(SEARCH_RESULTS) and "last_search_query" in st.session_state:
+                    st.session_state["operation_times"] = timer.summary()["stages"]
                     show_search_results(
                         st.session_state["last_search_query"],
                         st.session_state["last_search_time"],
                     )
-            case "Grounding Truth with Google":
-                # Call the Google grounding function inside an assistant message container
-                with st.chat_message("assistant"):
-                    full_response = google_grounding_search(
-                        client, prompt, history_input
-                    )
 
-            case "Deep-Research":
-                # Call the Jina DeepSearch function inside an assistant message container
-                with st.chat_message("assistant"):
-                    full_response = jina_deepsearch(client, prompt, history_input)
-
-            case "ReAct-Agent":
-                # Create ReAct-Agent prompt
-                messages = [
-                    {
-                        "role": "system",
-                        "content": "You are an intelligent agent that follows a thoughtful, step-by-step approach to solving problems.",
-                    }
-                ] + [
-                    {"role": m["role"], "content": m["content"]} for m in history_input
-                ]
-
-                # Create a streaming chat completion
-                stream = client.chat.completions.create(
-                    model="qwen2.5-72b-instruct",
-                    messages=messages,
-                    stream=True,
+            # Generate conversation_id
+            conversation_id = generate_conversation_id(prompt)
+
+            # Add assistant response to history
+            assistant_message = {
+                "role": "assistant",
+                "content": full_response,
+                "timings": timer.summary(),
+                "tokens": message_tokens({"content": full_response}),
+            }
+            if "model" in engine_kwargs:
+                assistant_message["model"] = engine_kwargs["model"]
+            if deadline.degradations:
+                assistant_message["degraded"] = deadline.degradations
+            st.session_state["history" + current_chat].append(assistant_message)
+
+            with timer.stage(PERSISTENCE):
+                # Save data in old format
+                save_current_chat_data(current_chat)
+
+                # Also save in new JSON format
+                save_conversation_history(
+                    st.session_state["session_id"],
+                    conversation_id,
+                    prompt,
+                    clean_thinking_tags(full_response),
                 )
-                # Stream the response inside a chat message
-                full_response = stream_chat_message(stream)
-
-            case _:  # Default case
-                # Create a streaming chat completion
-                stream = client.chat.completions.create(
-                    model="qwen2.5-72b-instruct",
-                    messages=[
-                        {"role": m["role"], "content": m["content"]}
-                        for m in history_input
-                    ],
-                    stream=True,
-                )
-                # Stream the response inside a chat message
-                full_response = stream_chat_message(stream)
-
-        # Generate conversation_id
-        conversation_id = generate_conversation_id(prompt)
-
-        # Add assistant response to history
-        st.session_state["history" + current_chat].append({
-            "role": "assistant",
-            "content": full_response,
-        })
 
-        # Save data in old format
-        save_current_chat_data(current_chat)
+            # Final breakdown including persistence; saved with the next write
+            timings = timer.summary()
+            assistant_message["timings"] = timings
+            st.session_state["operation_times"] = timings["stages"]
+            show_timing_panel(timings)
+            record_turn_metrics(engine.name, timings)
+
+            # Title and summarize the chat in the background, batched with others
+            schedule_chat_metadata(
+                client,
+                current_user_id(),
+                current_chat,
+                st.session_state["history" + current_chat],
+            )
 
-        # Also save in new JSON format
-        save_conversation_history(
-            st.session_state["session_id"],
-            conversation_id,
-            prompt,
-            clean_thinking_tags(full_response),
-        )
+            if speculation_on() and engine.has(SPECULATIVE):
+                speculate_followups(
+                    client,
+                    engine,
+                    engine_kwargs.get("model", DEFAULT_MODEL),
+                    history_input,
+                    full_response,
+                )
 
-    except Exception as e:
-        st.error(f"Error in chat processing: {str(e)}")
+        except Exception as e:
+            st.error(f"Error in chat processing: {str(e)}")
 
 
 # Main app layout
@@ -274,10 +620,35 @@ render_chat_container()
 
 # Display chat modes selection
 chat_mode = render_chat_modes()
+compare_modes = render_compare_modes()
 
 # Show chat history
+persist_stopped_response()
+deliver_finished_jobs()
 show_chat_history(st.session_state["history" + current_chat])
 
+# Show a comparison waiting for the user to keep one answer
+if "comparison" + current_chat in st.session_state:
+    show_comparison(st.session_state["comparison" + current_chat], keep_compared_answer)
+
+# Keep showing background jobs of this chat that are still running
+for running_job in job_runner.jobs_for_chat(chat_key(current_chat)):
+    show_running_job(running_job, stop_generation_fun)
+
+if st.session_state.pop("generation_stopped", False):
+    st.toast("⏹️ Generation stopped; the partial answer was kept.")
+
 
 # Display chat input for user
-render_chat_input(process_user_input)
+if render_chat_input(process_user_input) is None:
+    if followup := st.session_state.pop("followup_prompt", None):
+        # Answer a clicked follow-up suggestion
+        process_user_input(followup)
+    elif speculation_on():
+        # Keep offering the follow-ups of the last answer
+        show_followups(
+            get_followups(current_chat, len(st.session_state["history" + current_chat]))
+        )
+
+# Periodically log this session's memory footprint
+record_session_memory(st.session_state)
@@ -1,10 +1,34 @@
+import hmac
 import json
 import os
+import sys
 from datetime import datetime
 
 import pandas as pd
 import streamlit as st
 
+sys.path.append(os.getcwd())
+
+from src.ui_components.admin_panels import (
+    render_client_pool_panel,
+    render_jobs_panel,
+    render_latency_panel,
+    render_memory_panel,
+    render_resilience_panel,
+    render_response_cache_panel,
+    render_router_panel,
+    render_scheduler_panel,
+    render_slow_turns_panel,
+)
+from src.utils.chart_utils import (
+    DEFAULT_MAX_POINTS,
+    DEFAULT_PAGE_SIZE,
+    downsample_series,
+    paginate_dataframe,
+)
+from src.utils.chat_metadata import chat_title
+from src.utils.history_manager import load_conversation_history
+
 # Configure page
 st.set_page_config(
     page_title="Dashboard | Sunvalue Assistant", page_icon="📊", layout="wide"
@@ -50,7 +74,7 @@ if "history_chats" in st.session_state and "path" in st.session_state:
                 with open(file_path, "r", encoding="utf-8") as f:
                     data = json.load(f)
                     # Extract basic data
-                    name = chat_name.split("_")[0]
+                    name = chat_title(chat_name)
                     message_count = len(
                         [
                             msg
@@ -103,10 +127,46 @@ if "history_chats" in st.session_state and "path" in st.session_state:
         # Create a bar chart
         st.bar_chart(top_conversations.set_index("name")["message_count"])
 
-        # Recent activity
+        # Message volume of this session over time, downsampled so the chart
+        # payload stays bounded
+        message_times = []
+        if "session_id" in st.session_state:
+            message_times = [
+                msg["timestamp"]
+                for msg in load_conversation_history(st.session_state["session_id"])
+                if "timestamp" in msg
+            ]
+
+        if message_times:
+            st.markdown("#### Message Volume Over Time")
+            volume = (
+                pd.Series(1, index=pd.to_datetime(message_times, format="ISO8601"))
+                .sort_index()
+                .resample("h")
+                .sum()
+                .rename("messages")
+            )
+            st.bar_chart(downsample_series(volume, DEFAULT_MAX_POINTS, method="minmax"))
+
+        # Recent activity, paginated on the server so only one page is sent
         st.markdown("#### Recent Activity")
+        recent_activity = df_chats.sort_values("last_updated", ascending=False)
+        page_col, size_col = st.columns([3, 1])
+        with size_col:
+            page_size = st.selectbox(
+                "Rows per page",
+                options=[10, DEFAULT_PAGE_SIZE, 50, 100],
+                index=1,
+                key="activity_page_size",
+            )
+        with page_col:
+            page = st.number_input(
+                "Page", min_value=1, value=1, step=1, key="activity_page"
+            )
+        page_df, total_pages = paginate_dataframe(recent_activity, int(page), page_size)
+        st.caption(f"Page {min(int(page), total_pages)} of {total_pages}")
         st.dataframe(
-            df_chats.sort_values("last_updated", ascending=False),
+            page_df,
             use_container_width=True,
             hide_index=True,
         )
@@ -128,3 +188,32 @@ with st.sidebar:
     # Refresh data button
     if st.button("Refresh Data", use_container_width=True):
         st.rerun()
+
+    # Instrumentation covers every session in the worker, so it needs the admin password
+    st.markdown("### Admin")
+    try:
+        admin_password = st.secrets.get("ADMIN_PASSWORD")
+    except Exception:
+        admin_password = None
+    admin_password = admin_password or os.environ.get("ADMIN_PASSWORD", "")
+    is_admin = False
+    if admin_password:
+        entered = st.text_input("Admin password", type="password", key="admin_password")
+        is_admin = bool(entered) and hmac.compare_digest(entered, admin_password)
+        if is_admin:
+            st.toggle("Show instrumentation panels", key="show_admin_panels")
+    else:
+        st.caption("Set `ADMIN_PASSWORD` to enable the instrumentation panels.")
+
+# Admin instrumentation panels
+if is_admin and st.session_state.get("show_admin_panels"):
+    st.subheader("🛠️ Instrumentation")
+    render_memory_panel()
+    render_latency_panel()
+    render_slow_turns_panel()
+    render_client_pool_panel()
+    render_scheduler_panel()
+    render_resilience_panel()
+    render_response_cache_panel()
+    render_router_panel()
+    render_jobs_panel()
@@ -0,0 +1,220 @@
+"""Process-wide registry of pooled, keep-alive HTTP and LLM clients per provider."""
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import openai
+
+from src.utils.deadline import Deadline
+from src.utils.logger import Logger
+
+logger = Logger("chat_client")
+
+# Pool limits shared by every provider
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+
+# Base URL and default read timeout (seconds) of every upstream provider
+PROVIDERS: Dict[str, Dict[str, Any]] = {
+    "dashscope": {
+        "base_url": "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+        "timeout": 60.0,
+    },
+    "serper": {"base_url": "https://google.serper.dev", "timeout": 30.0},
+    "duckduckgo": {"base_url": "https://api.duckduckgo.com", "timeout": 10.0},
+    "gemini": {
+        "base_url": "https://generativelanguage.googleapis.com",
+        "timeout": 30.0,
+    },
+    "jina": {"base_url": "https://deepsearch.jina.ai", "timeout": 60.0},
+}
+
+
+def _provider_timeout(provider: str) -> httpx.Timeout:
+    """Read timeout from HTTP_TIMEOUT_<PROVIDER>, falling back to the provider default."""
+    default = PROVIDERS.get(provider, {}).get("timeout", 30.0)
+    read = float(os.environ.get(f"HTTP_TIMEOUT_{provider.upper()}", default))
+    return httpx.Timeout(read, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def deadline_timeout(
+    provider: str, deadline: Deadline, read: Optional[float] = None
+) -> httpx.Timeout:
+    """
+    The provider's timeout (or ``read``), capped by what is left of the turn's deadline.
+
+    Raises:
+        DeadlineExceeded: The turn has no time left for the request
+    """
+    read = deadline.timeout(read or _provider_timeout(provider).read)
+    return httpx.Timeout(read, connect=min(HTTP_CONNECT_TIMEOUT, read))
+
+
+class PoolStats:
+    """Request and connection counters for one provider's pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def on_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self.requests += 1
+        # httpcore reports connection setup through the "trace" extension
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            requests, new_connections = self.requests, self.new_connections
+        reused = max(0, requests - new_connections)
+        return {
+            "requests": requests,
+            "new_connections": new_connections,
+            "reuse_ratio": reused / requests if requests else None,
+        }
+
+
+def _connection_counts(client: httpx.Client) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Open and in-use connections of a client's pool, or (None, None) if unknown.
+
+    httpx has no public API for pool state, so this reads the transport's
+    httpcore pool and gives up on anything unexpected (a mocked transport, or
+    internals that changed in another httpx version).
+    """
+    try:
+        connections = list(client._transport._pool.connections)
+        in_use = sum(1 for connection in connections if not connection.is_idle())
+    except Exception:
+        return None, None
+    return len(connections), in_use
+
+
+class ClientRegistry:
+    """
+    Lazily created, long-lived clients shared by every Streamlit session in the worker.
+
+    httpx and OpenAI clients are thread-safe, so one instance per provider is enough;
+    creation is guarded by a lock so concurrent sessions never build duplicates.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._http_clients: Dict[str, httpx.Client] = {}
+        self._llm_clients: Dict[tuple, openai.OpenAI] = {}
+        self._stats: Dict[str, PoolStats] = {}
+
+    def http_client(self, provider: str) -> httpx.Client:
+        """
+        Return the pooled HTTP client for a provider, creating it on first use.
+
+        Args:
+            provider: Provider name, e.g. "serper" or "jina"
+
+        Returns:
+            httpx.Client: A keep-alive client with the provider's default timeout
+        """
+        client = self._http_clients.get(provider)
+        if client is not None:
+            return client
+
+        with self._lock:
+            if provider not in self._http_clients:
+                stats = self._stats.setdefault(provider, PoolStats())
+                self._http_clients[provider] = httpx.Client(
+                    timeout=_provider_timeout(provider),
+                    limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                    ),
+                    event_hooks={"request": [stats.on_request]},
+                )
+                logger.info(f"Created pooled HTTP client for {provider}")
+            return self._http_clients[provider]
+
+    def llm_client(
+        self,
+        provider: str = "dashscope",
+        api_key: str = "",
+        base_url: Optional[str] = None,
+    ) -> openai.OpenAI:
+        """
+        Return the pooled OpenAI-compatible client for a provider and API key.
+
+        Args:
+            provider: Provider whose HTTP pool the client should use
+            api_key: API key for the provider
+            base_url: Override of the provider's base URL
+
+        Returns:
+            openai.OpenAI: A client backed by the shared keep-alive pool
+        """
+        base_url = base_url or PROVIDERS[provider]["base_url"]
+        key = (provider, api_key, base_url)
+        client = self._llm_clients.get(key)
+        if client is not None:
+            return client
+
+        http_client = self.http_client(provider)
+        with self._lock:
+            if key not in self._llm_clients:
+                self._llm_clients[key] = openai.OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=http_client,
+                )
+            return self._llm_clients[key]
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return request, connection reuse and open connection counts per provider.
+
+        Returns:
+            dict: Provider name to its pool metrics
+        """
+        with self._lock:
+            clients = dict(self._http_clients)
+
+        result = {}
+        for provider, client in clients.items():
+            stats = self._stats[provider].snapshot()
+            stats["connections_open"], stats["connections_in_use"] = _connection_counts(
+                client
+            )
+            result[provider] = stats
+        return result
+
+    def close_all(self) -> None:
+        """Close every pooled client (used on shutdown and in tests)."""
+        with self._lock:
+            for client in self._http_clients.values():
+                client.close()
+            self._http_clients.clear()
+            self._llm_clients.clear()
+
+
+# Shared registry for the whole worker process
+registry = ClientRegistry()
+
+
+def get_http_client(provider: str) -> httpx.Client:
+    """Return the shared HTTP client for a provider."""
+    return registry.http_client(provider)
+
+
+def get_llm_client(
+    provider: str = "dashscope", api_key: str = "", base_url: Optional[str] = None
+) -> openai.OpenAI:
+    """Return the shared OpenAI-compatible client for a provider."""
+    return registry.llm_client(provider, api_key, base_url)
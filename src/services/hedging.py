@@ -0,0 +1,290 @@
+"""Hedged streaming completions: race a backup request when the first token is late."""
+
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+from src.utils.cancellation import cancellable
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+
+logger = Logger("hedging")
+
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "0") == "1"
+
+# A backup request is sent when the first token is later than this percentile
+# of the endpoint's observed time to first token
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "90"))
+
+# Delay used until an endpoint has HEDGE_MIN_SAMPLES observations (seconds)
+HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", "3"))
+HEDGE_MIN_SAMPLES = 20
+
+# Never hedge sooner than this (seconds)
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", "0.5"))
+
+# Largest share of recent streaming requests that may be hedged
+HEDGE_MAX_RATE = float(os.environ.get("HEDGE_MAX_RATE", "0.1"))
+HEDGE_WINDOW = 200
+
+# Model for the backup request when no other endpoint serves the model
+# (empty: repeat the request on the same endpoint)
+HEDGE_MODEL = os.environ.get("HEDGE_MODEL", "")
+
+# Marks a stream that ended before producing any chunk
+_END = object()
+
+# Opens a streaming completion on (endpoint, model)
+OpenStream = Callable[[Any, str], Any]
+
+# Takes a scheduler slot for a hedge on an endpoint without waiting, or returns None
+AcquireSlot = Callable[[Any], Optional[Any]]
+
+
+class HedgeBudget:
+    """Caps the share of requests that are hedged over a sliding window."""
+
+    def __init__(self, max_rate: float = HEDGE_MAX_RATE, window: int = HEDGE_WINDOW):
+        self.max_rate = max_rate
+        self._recent: Deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, hedged: bool) -> None:
+        """Record whether a finished request was hedged."""
+        with self._lock:
+            self._recent.append(hedged)
+
+    def allow(self) -> bool:
+        """Whether one more hedge stays within the rate cap."""
+        with self._lock:
+            total = len(self._recent) + 1
+            return (sum(self._recent) + 1) / total <= self.max_rate
+
+    def rate(self) -> Optional[float]:
+        with self._lock:
+            return sum(self._recent) / len(self._recent) if self._recent else None
+
+
+# Shared budget for the whole worker process
+hedge_budget = HedgeBudget()
+
+
+def hedge_delay(endpoint: str, model: str) -> float:
+    """
+    How long to wait for the first token before sending the backup request.
+
+    Args:
+        endpoint: Endpoint name
+        model: Model name
+
+    Returns:
+        float: The observed HEDGE_PERCENTILE time to first token, in seconds
+    """
+    series = metrics.series("llm_first_token_seconds", endpoint=endpoint, model=model)
+    if len(series) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    observed = metrics.percentile(
+        "llm_first_token_seconds", HEDGE_PERCENTILE, endpoint=endpoint, model=model
+    )
+    return max(HEDGE_MIN_DELAY, observed)
+
+
+class _Attempt:
+    """
+    One request of a hedged call, run until its first chunk in a worker thread.
+
+    The thread runs in a copy of the caller's context, so the request sees the
+    turn's generation, deadline and scheduler identity.
+    """
+
+    def __init__(
+        self,
+        open_stream: OpenStream,
+        endpoint: Any,
+        model: str,
+        results: "queue.Queue",
+        label: str,
+        slot: Any = None,
+    ):
+        self.endpoint = endpoint
+        self.model = model
+        self.label = label
+        self.stream: Any = None
+        self._open_stream = open_stream
+        self._results = results
+        self._slot = slot
+        self._cancelled = threading.Event()
+        context = contextvars.copy_context()
+        threading.Thread(
+            target=context.run, args=(self._run,), name=f"hedge-{label}", daemon=True
+        ).start()
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.stream = cancellable(self._open_stream(self.endpoint, self.model))
+            if self._cancelled.is_set():
+                self.close()
+                return
+            iterator = iter(self.stream)
+            first = next(iterator, _END)
+        except Exception as e:
+            if not self._cancelled.is_set():
+                self._results.put((self, None, e))
+            return
+
+        if self._cancelled.is_set():
+            self.close()
+            return
+        latency = time.perf_counter() - started
+        self.endpoint.record_success(latency)
+        metrics.observe(
+            "llm_first_token_seconds",
+            latency,
+            endpoint=self.endpoint.name,
+            model=self.model,
+        )
+        self._results.put((self, first, iterator))
+
+    def release_slot(self) -> None:
+        """Give back the scheduler slot taken for this attempt, if any."""
+        slot, self._slot = self._slot, None
+        if slot is not None:
+            slot.release()
+
+    def close(self) -> None:
+        """Cancel the attempt, closing its stream if it has been opened."""
+        self._cancelled.set()
+        stream = self.stream
+        close = getattr(stream, "close", None)
+        try:
+            if close is not None:
+                close()
+        except Exception as e:
+            logger.debug(f"Error closing hedged stream: {str(e)}")
+        finally:
+            self.release_slot()
+
+
+class HedgedStream:
+    """
+    A streaming completion that is raced against a backup when it is slow to start.
+
+    The primary request starts immediately. If no chunk arrives within ``delay``
+    seconds and the hedge budget allows it, an identical request goes to the next
+    target; whichever yields a chunk first is streamed and the other is closed.
+    A target that fails before its first chunk is replaced by the next one.
+
+    The caller holds one scheduler slot for the call, which the primary request
+    and its failovers use in turn. A hedge runs alongside the primary, so it
+    takes a slot of its own through ``acquire_slot`` and is skipped when none is
+    free at once.
+    """
+
+    def __init__(
+        self,
+        open_stream: OpenStream,
+        targets: List[Tuple[Any, str]],
+        delay: float,
+        should_fail_over: Callable[[Exception], bool],
+        budget: HedgeBudget = hedge_budget,
+        acquire_slot: Optional[AcquireSlot] = None,
+    ):
+        self._open_stream = open_stream
+        self._targets = list(targets)
+        self._delay = delay
+        self._should_fail_over = should_fail_over
+        self._budget = budget
+        self._acquire_slot = acquire_slot
+        self._results: "queue.Queue" = queue.Queue()
+        self._attempts: List[_Attempt] = []
+        self.hedged = False
+        self._start_next("primary")
+
+    def _start_next(self, label: str, slot: Any = None) -> bool:
+        if not self._targets:
+            return False
+        endpoint, model = self._targets.pop(0)
+        self._attempts.append(
+            _Attempt(self._open_stream, endpoint, model, self._results, label, slot)
+        )
+        return True
+
+    def _start_hedge(self) -> bool:
+        if not self._targets or not self._budget.allow():
+            return False
+        slot = None
+        if self._acquire_slot is not None:
+            slot = self._acquire_slot(self._targets[0][0])
+            if slot is None:
+                metrics.increment("llm_hedges_skipped", reason="no_slot")
+                return False
+        return self._start_next("hedge", slot)
+
+    def _first_chunk(self) -> Tuple[_Attempt, Any, Iterator[Any]]:
+        pending = 1
+        last_error: Optional[Exception] = None
+        timeout: Optional[float] = self._delay
+        while pending:
+            try:
+                attempt, first, result = self._results.get(timeout=timeout)
+            except queue.Empty:
+                timeout = None
+                if self._start_hedge():
+                    self.hedged = True
+                    pending += 1
+                    metrics.increment("llm_hedges")
+                    logger.info(f"Hedging a request slower than {self._delay:.2f}s")
+                continue
+
+            if first is not None:
+                return attempt, first, result
+
+            pending -= 1
+            last_error = result
+            attempt.release_slot()
+            if not self._should_fail_over(result):
+                raise result
+            attempt.endpoint.record_failure(result)
+            logger.warning(f"Endpoint {attempt.endpoint.name} failed: {str(result)}")
+            if self._start_next("failover"):
+                pending += 1
+                metrics.increment("router_failovers", endpoint=attempt.endpoint.name)
+        raise last_error
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            winner, first, iterator = self._first_chunk()
+        except BaseException:
+            self.close()
+            raise
+        finally:
+            self._budget.record(self.hedged)
+
+        for attempt in self._attempts:
+            if attempt is not winner:
+                attempt.close()
+        if self.hedged:
+            metrics.increment("llm_hedge_wins", winner=winner.label)
+
+        try:
+            if first is _END:
+                return
+            yield first
+            yield from iterator
+        except Exception as e:
+            if self._should_fail_over(e):
+                winner.endpoint.record_failure(e)
+            raise
+        finally:
+            winner.release_slot()
+
+    def close(self) -> None:
+        """Close every request of the call."""
+        self._targets = []
+        for attempt in self._attempts:
+            attempt.close()
@@ -0,0 +1,380 @@
+"""Background jobs for long chat modes, run on a worker pool independent of Streamlit sessions."""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src.services.scheduler import BACKGROUND, scheduled_as
+from src.utils.history_manager import LEGACY_HISTORY_PATH, append_legacy_chat_message
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+from src.utils.token_counter import message_tokens
+
+logger = Logger("job_runner")
+
+BACKGROUND_JOBS_ENABLED = os.environ.get("BACKGROUND_JOBS_ENABLED", "1") == "1"
+
+# Jobs running at once in this worker process, and per user (browser session)
+JOBS_MAX_CONCURRENT = int(os.environ.get("JOBS_MAX_CONCURRENT", "4"))
+JOBS_MAX_PER_USER = int(os.environ.get("JOBS_MAX_PER_USER", "1"))
+
+# Progress is written to the store at most this often (seconds)
+JOB_SAVE_INTERVAL = float(os.environ.get("JOB_SAVE_INTERVAL", "1"))
+
+# Finished jobs are forgotten this long after their last update (seconds); their
+# answers are already saved to their chats
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", "86400"))
+
+JOBS_PATH = os.path.join(LEGACY_HISTORY_PATH, "jobs")
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobLimitError(Exception):
+    """The user or the worker already runs as many jobs as allowed."""
+
+
+class Job:
+    """
+    A long chat turn running in the background.
+
+    The work function appends text and sets progress; both are persisted to the
+    store so a page can attach to the job, or pick up its result after a reload.
+    """
+
+    def __init__(
+        self,
+        user: str,
+        chat_key: str,
+        mode: str,
+        prompt: str,
+        job_id: Optional[str] = None,
+    ):
+        self.id = job_id or uuid.uuid4().hex
+        self.user = user
+        self.chat_key = chat_key
+        self.mode = mode
+        self.prompt = prompt
+        self.status = QUEUED
+        # Streamed chunks, joined when the text is read
+        self._chunks: List[str] = []
+        self.progress: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._saved_at = 0.0
+        self._delivered = False
+
+    @property
+    def text(self) -> str:
+        """The answer streamed so far."""
+        return "".join(self._chunks)
+
+    @text.setter
+    def text(self, value: str) -> None:
+        self._chunks = [value]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the work function should stop."""
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def append_text(self, delta: str) -> None:
+        """Add streamed text to the job's answer."""
+        with self._lock:
+            self._chunks.append(delta)
+            self.updated_at = time.time()
+        self.save()
+
+    def set_progress(self, **values: Any) -> None:
+        """Record progress such as visited URLs."""
+        with self._lock:
+            self.progress.update(values)
+            self.updated_at = time.time()
+        self.save()
+
+    def result_text(self, status: Optional[str] = None) -> str:
+        """The text to store for the job finished with ``status`` (default: its own)."""
+        if (status or self.status) == FAILED and not self.text:
+            return f"Error: {self.error}"
+        return self.text
+
+    def to_message(self, status: Optional[str] = None) -> Dict[str, Any]:
+        """The assistant message recording the finished job in its chat."""
+        status = status or self.status
+        text = self.result_text(status)
+        return {
+            "role": "assistant",
+            "content": text,
+            "stopped": status == CANCELLED,
+            "tokens": message_tokens({"content": text}),
+            "job_id": self.id,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "user": self.user,
+                "chat_key": self.chat_key,
+                "mode": self.mode,
+                "prompt": self.prompt,
+                "status": self.status,
+                "text": self.text,
+                "progress": dict(self.progress),
+                "error": self.error,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        job = cls(
+            data["user"], data["chat_key"], data["mode"], data["prompt"], data["id"]
+        )
+        job.status = data["status"]
+        job.text = data.get("text", "")
+        job.progress = data.get("progress", {})
+        job.error = data.get("error")
+        job.created_at = data.get("created_at", job.created_at)
+        job.updated_at = data.get("updated_at", job.updated_at)
+        return job
+
+    def save(self, force: bool = False) -> None:
+        """Write the job to the store, throttled unless forced."""
+        now = time.time()
+        if not force and now - self._saved_at < JOB_SAVE_INTERVAL:
+            return
+        self._saved_at = now
+        self._write(self.to_dict())
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        """Record the final state; it is persisted before the job reports finished."""
+        self.error = error
+        self.updated_at = time.time()
+        self._write({**self.to_dict(), "status": status})
+        self.status = status
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with self._save_lock:
+            # A delivered job's file is gone for good; a late save must not revive it
+            if self._delivered:
+                return
+            os.makedirs(JOBS_PATH, exist_ok=True)
+            path = os.path.join(JOBS_PATH, f"{self.id}.json")
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(record, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Error saving job {self.id}: {str(e)}")
+
+    def delete(self) -> None:
+        """Remove the job from the store and stop any later save."""
+        with self._save_lock:
+            self._delivered = True
+            try:
+                os.remove(os.path.join(JOBS_PATH, f"{self.id}.json"))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Error removing job {self.id}: {str(e)}")
+
+
+class JobRunner:
+    """Runs jobs on a thread pool and enforces global and per-user limits."""
+
+    def __init__(
+        self,
+        max_concurrent: int = JOBS_MAX_CONCURRENT,
+        max_per_user: int = JOBS_MAX_PER_USER,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent, thread_name_prefix="job"
+        )
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._loaded = False
+
+    def _load_store(self) -> None:
+        """Load jobs left by an earlier process; unfinished ones cannot resume."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(JOBS_PATH):
+            return
+        for filename in os.listdir(JOBS_PATH):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(JOBS_PATH, filename), encoding="utf-8") as f:
+                    job = Job.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Skipping unreadable job file {filename}: {str(e)}")
+                continue
+            if not job.finished:
+                job.finish(FAILED, "The server restarted before the job finished")
+                self._save_to_chat(job, FAILED)
+            self._jobs.setdefault(job.id, job)
+
+    def _prune(self) -> None:
+        """Forget finished jobs kept longer than JOB_RETENTION."""
+        cutoff = time.time() - JOB_RETENTION
+        expired = [
+            job
+            for job in self._jobs.values()
+            if job.finished and job.updated_at < cutoff
+        ]
+        for job in expired:
+            del self._jobs[job.id]
+            job.delete()
+        if expired:
+            logger.info(f"Pruned {len(expired)} expired job(s)")
+
+    def active_jobs(self, user: Optional[str] = None) -> List[Job]:
+        """Queued or running jobs, optionally of one user."""
+        with self._lock:
+            return [
+                job
+                for job in self._jobs.values()
+                if not job.finished and (user is None or job.user == user)
+            ]
+
+    def submit(
+        self,
+        user: str,
+        chat_key: str,
+        mode: str,
+        prompt: str,
+        work: Callable[..., str],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Job:
+        """
+        Start a job.
+
+        Args:
+            user: The user (browser session) the job counts against
+            chat_key: Key of the chat the answer belongs to
+            mode: Chat mode name
+            prompt: The user's question
+            work: Called as ``work(job, *args, **kwargs)``; streams into the job
+                with ``append_text``/``set_progress``, checks ``job.cancelled``
+                and returns the final text
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            JobLimitError: The user already has JOBS_MAX_PER_USER active jobs
+        """
+        job = Job(user, chat_key, mode, prompt)
+        with self._lock:
+            self._load_store()
+            self._prune()
+            user_jobs = sum(
+                1
+                for other in self._jobs.values()
+                if other.user == user and not other.finished
+            )
+            if user_jobs >= self.max_per_user:
+                metrics.increment("jobs_rejected", reason="user_limit")
+                raise JobLimitError(
+                    f"You already have {user_jobs} background job(s) running"
+                )
+            self._jobs[job.id] = job
+
+        job.save(force=True)
+        self._executor.submit(self._run, job, work, args, kwargs)
+        metrics.increment("jobs_submitted", mode=mode)
+        logger.info(f"Queued {mode} job {job.id}")
+        return job
+
+    def _run(self, job: Job, work: Callable[..., str], args, kwargs) -> None:
+        if job.cancelled:
+            self._save_to_chat(job, CANCELLED)
+            job.finish(CANCELLED)
+            return
+
+        job.status = RUNNING
+        job.save(force=True)
+        started = time.perf_counter()
+        try:
+            # Upstream requests of jobs yield to interactive turns
+            with scheduled_as(job.user, BACKGROUND):
+                text = work(job, *args, **kwargs)
+            if text is not None:
+                with job._lock:
+                    job.text = text
+            status, error = CANCELLED if job.cancelled else DONE, None
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}", exc_info=True)
+            status, error = FAILED, str(e)
+        # Saved before the job reports finished, so an attached page that then
+        # saves its own history already has the answer on disk
+        job.error = error
+        self._save_to_chat(job, status)
+        job.finish(status, error)
+        metrics.observe("job_seconds", time.perf_counter() - started, mode=job.mode)
+        metrics.increment("jobs_finished", status=job.status)
+
+    def _save_to_chat(self, job: Job, status: str) -> None:
+        """Append the job's answer to its chat, even if no page is open."""
+        try:
+            if not append_legacy_chat_message(job.chat_key, job.to_message(status)):
+                logger.warning(f"Chat {job.chat_key} of job {job.id} not found")
+        except (OSError, ValueError) as e:
+            logger.error(f"Error saving job {job.id} to its chat: {str(e)}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._load_store()
+            return self._jobs.get(job_id)
+
+    def jobs_for_chat(self, chat_key: str) -> List[Job]:
+        """Jobs of a chat that have not been delivered yet, oldest first."""
+        with self._lock:
+            self._load_store()
+            self._prune()
+            jobs = [job for job in self._jobs.values() if job.chat_key == chat_key]
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    def cancel_chat_jobs(self, chat_key: str) -> int:
+        """Ask the active jobs of a chat to stop; returns how many were asked."""
+        jobs = [job for job in self.jobs_for_chat(chat_key) if not job.finished]
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def mark_delivered(self, job: Job) -> None:
+        """Forget a finished job whose answer has been added to its chat."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        job.delete()
+
+
+# Shared runner for the whole worker process
+job_runner = JobRunner()
@@ -0,0 +1,401 @@
+"""Latency-aware routing of LLM requests across models and OpenAI-compatible endpoints."""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+import openai
+
+from src.services.chat_client import get_llm_client
+from src.services.hedging import HEDGE_ENABLED, HEDGE_MODEL, HedgedStream, hedge_delay
+from src.services.scheduler import ScheduledStream, scheduler
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+from src.utils.token_counter import count_tokens
+
+logger = Logger("model_router")
+
+# Sidebar choice that lets the router pick the model
+AUTO_MODEL = "Auto"
+
+# Models the app can use, with their size tier
+MODELS: Dict[str, str] = {
+    "qwen2.5-72b-instruct": "large",
+    "qwen2.5-32b-instruct": "medium",
+    "qwen2.5-7b-instruct": "small",
+}
+
+# Model used for complex prompts and when no choice is made
+DEFAULT_MODEL = os.environ.get("ROUTER_DEFAULT_MODEL", "qwen2.5-72b-instruct")
+
+# Model used for short, simple prompts such as greetings and chit-chat
+FAST_MODEL = os.environ.get("ROUTER_FAST_MODEL", "qwen2.5-7b-instruct")
+
+# Prompts up to this many tokens without complexity markers go to FAST_MODEL
+ROUTER_SIMPLE_MAX_TOKENS = int(os.environ.get("ROUTER_SIMPLE_MAX_TOKENS", "40"))
+
+# An endpoint is skipped for ROUTER_COOLDOWN * 2^(failures - 1) seconds after failing
+ROUTER_COOLDOWN = float(os.environ.get("ROUTER_COOLDOWN", "10"))
+ROUTER_MAX_COOLDOWN = 300.0
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.3
+
+# Assumed latency of an endpoint with no observations yet (seconds)
+UNKNOWN_LATENCY = 1.0
+
+# Endpoints serving the models; override with a JSON list in LLM_ENDPOINTS, e.g.
+# [{"name": "backup", "base_url": "https://.../v1", "api_key": "BACKUP_API_KEY",
+#   "models": ["qwen2.5-72b-instruct"]}]
+# "api_key" names a Streamlit secret or environment variable; "models" defaults to all
+DEFAULT_ENDPOINTS = [
+    {"name": "dashscope", "provider": "dashscope", "api_key": "QWEN_API_KEY"},
+]
+
+# Words that suggest a prompt needs the larger model
+COMPLEX_PATTERN = re.compile(
+    r"```|\b(code|debug|explain|analy[sz]e|compare|why|how|step|write|plan|prove|"
+    r"calculate|implement|summari[sz]e|translate|giải thích|phân tích|so sánh|"
+    r"tại sao|như thế nào|viết|tính)\b",
+    re.IGNORECASE,
+)
+
+
+class RouterError(Exception):
+    """No configured endpoint could serve the request."""
+
+
+class Endpoint:
+    """An OpenAI-compatible endpoint with moving averages of latency and errors."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: Optional[str] = None,
+        api_key: str = "",
+        provider: Optional[str] = None,
+        models: Optional[List[str]] = None,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.api_key_name = api_key
+        self.provider = provider or name
+        self.models = set(models) if models else None
+        self._lock = threading.Lock()
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_error: Optional[str] = None
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def available(self, now: Optional[float] = None) -> bool:
+        """Whether the endpoint is outside its failure cooldown."""
+        return (now or time.time()) >= self.cooldown_until
+
+    def score(self) -> float:
+        """Expected cost of a request: lower is better."""
+        latency = self.latency if self.latency is not None else UNKNOWN_LATENCY
+        return latency * (1 + 4 * self.error_rate)
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latency = (
+                latency
+                if self.latency is None
+                else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+            )
+            self.error_rate *= 1 - EWMA_ALPHA
+            self.consecutive_failures = 0
+            self.cooldown_until = 0.0
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+            self.consecutive_failures += 1
+            cooldown = min(
+                ROUTER_MAX_COOLDOWN,
+                ROUTER_COOLDOWN * 2 ** (self.consecutive_failures - 1),
+            )
+            self.cooldown_until = time.time() + cooldown
+            self.last_error = f"{type(error).__name__}: {error}"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "endpoint": self.name,
+                "requests": self.requests,
+                "failures": self.failures,
+                "latency_ewma": round(self.latency, 3) if self.latency else None,
+                "error_rate": round(self.error_rate, 3),
+                "cooling_down": not self.available(),
+                "last_error": self.last_error,
+            }
+
+
+def _should_fail_over(error: Exception) -> bool:
+    """Connection, rate-limit, auth and server errors are worth trying elsewhere."""
+    if isinstance(error, openai.BadRequestError):
+        # The request itself is invalid; another endpoint would reject it too
+        return False
+    return isinstance(error, openai.APIError)
+
+
+class TrackedStream:
+    """Stream wrapper that reports time to first chunk and mid-stream errors."""
+
+    def __init__(self, stream: Any, endpoint: Endpoint, model: str, started: float):
+        self._stream = stream
+        self._endpoint = endpoint
+        self._model = model
+        self._started = started
+
+    def __iter__(self) -> Iterator[Any]:
+        first = True
+        try:
+            for chunk in self._stream:
+                if first:
+                    first = False
+                    latency = time.perf_counter() - self._started
+                    self._endpoint.record_success(latency)
+                    metrics.observe(
+                        "llm_first_token_seconds",
+                        latency,
+                        endpoint=self._endpoint.name,
+                        model=self._model,
+                    )
+                yield chunk
+        except openai.APIError as e:
+            self._endpoint.record_failure(e)
+            raise
+
+    def close(self) -> None:
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            close()
+
+
+class ModelRouter:
+    """
+    Picks a model for each prompt and an endpoint for each request.
+
+    Endpoints serving the model are tried in order of their latency and error
+    moving averages; an endpoint that fails is put in an exponential cooldown
+    and the request fails over to the next one.
+    """
+
+    def __init__(self, endpoints: List[Endpoint], hedging: bool = HEDGE_ENABLED):
+        self.endpoints = endpoints
+        self.hedging = hedging
+
+    def candidates(self, model: str) -> List[Endpoint]:
+        """Endpoints serving a model, best first; cooling-down ones are a last resort."""
+        now = time.time()
+        serving = [e for e in self.endpoints if e.serves(model)]
+        return sorted(serving, key=lambda e: (not e.available(now), e.score()))
+
+    def has_healthy_endpoint(self, model: str) -> bool:
+        now = time.time()
+        return any(e.serves(model) and e.available(now) for e in self.endpoints)
+
+    def choose_model(
+        self, messages: List[Dict[str, Any]], requested: str = AUTO_MODEL
+    ) -> str:
+        """
+        Choose the model for a turn.
+
+        Args:
+            messages: Model input; the last user message decides the complexity
+            requested: The sidebar choice; anything but "Auto" is used as is
+
+        Returns:
+            str: The model name
+        """
+        if requested and requested != AUTO_MODEL:
+            return requested
+
+        prompt = next(
+            (m["content"] for m in reversed(messages) if m.get("role") == "user"), ""
+        )
+        short = count_tokens(prompt) <= ROUTER_SIMPLE_MAX_TOKENS
+        simple = short and not COMPLEX_PATTERN.search(prompt)
+        model = FAST_MODEL if simple else DEFAULT_MODEL
+
+        # Prefer a model whose endpoints are healthy over waiting out a cooldown
+        if not self.has_healthy_endpoint(model):
+            fallback = DEFAULT_MODEL if model == FAST_MODEL else FAST_MODEL
+            if self.has_healthy_endpoint(fallback):
+                logger.warning(f"No healthy endpoint for {model}, using {fallback}")
+                model = fallback
+
+        metrics.increment("router_model_choice", model=model)
+        return model
+
+    def create(self, secrets: Mapping[str, Any], model: str, **kwargs) -> Any:
+        """
+        Run a chat completion, failing over between endpoints.
+
+        Args:
+            secrets: Mapping used to resolve endpoint API keys (e.g. st.secrets)
+            model: Model name
+            **kwargs: Arguments for ``chat.completions.create``
+
+        Returns:
+            The completion, or a TrackedStream (HedgedStream when hedging) when
+            ``stream=True``
+        """
+        if kwargs.get("stream") and self.hedging:
+            return self._create_hedged(secrets, model, **kwargs)
+
+        last_error: Optional[Exception] = None
+        for attempt, endpoint in enumerate(self.candidates(model)):
+            if attempt:
+                metrics.increment("router_failovers", endpoint=endpoint.name)
+                logger.warning(f"Failing over to endpoint {endpoint.name} for {model}")
+
+            client = get_llm_client(
+                endpoint.provider,
+                _resolve_api_key(endpoint.api_key_name, secrets),
+                endpoint.base_url,
+            )
+            # Waits for the provider's scheduler slot; streams hold it until they end
+            slot = scheduler.acquire(endpoint.provider)
+            started = time.perf_counter()
+            try:
+                response = client.chat.completions.create(model=model, **kwargs)
+            except Exception as e:
+                slot.release()
+                if not _should_fail_over(e):
+                    raise
+                endpoint.record_failure(e)
+                logger.warning(f"Endpoint {endpoint.name} failed: {str(e)}")
+                last_error = e
+                continue
+
+            if kwargs.get("stream"):
+                return TrackedStream(
+                    ScheduledStream(response, slot), endpoint, model, started
+                )
+            slot.release()
+            latency = time.perf_counter() - started
+            endpoint.record_success(latency)
+            metrics.observe(
+                "llm_request_seconds", latency, endpoint=endpoint.name, model=model
+            )
+            return response
+
+        if last_error is not None:
+            raise last_error
+        raise RouterError(f"No endpoint is configured for model {model}")
+
+    def _create_hedged(self, secrets: Mapping[str, Any], model: str, **kwargs) -> Any:
+        """Stream from the best endpoint, racing the next target if it is slow."""
+        candidates = self.candidates(model)
+        if not candidates:
+            raise RouterError(f"No endpoint is configured for model {model}")
+
+        targets = [(endpoint, model) for endpoint in candidates]
+        if len(candidates) == 1:
+            # Without a second endpoint, repeat the request (or use the hedge model)
+            targets.append((candidates[0], HEDGE_MODEL or model))
+
+        def open_stream(endpoint: Endpoint, target_model: str) -> Any:
+            client = get_llm_client(
+                endpoint.provider,
+                _resolve_api_key(endpoint.api_key_name, secrets),
+                endpoint.base_url,
+            )
+            return client.chat.completions.create(model=target_model, **kwargs)
+
+        # The primary request waits for a slot; a hedge only goes out if another
+        # slot is free at once, and holds it until it loses or its stream ends
+        slot = scheduler.acquire(candidates[0].provider)
+        try:
+            stream = HedgedStream(
+                open_stream,
+                targets,
+                hedge_delay(candidates[0].name, model),
+                _should_fail_over,
+                acquire_slot=lambda endpoint: scheduler.try_acquire(endpoint.provider),
+            )
+        except Exception:
+            slot.release()
+            raise
+        return ScheduledStream(stream, slot)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return the moving averages of every endpoint."""
+        return [endpoint.snapshot() for endpoint in self.endpoints]
+
+
+def _resolve_api_key(name: str, secrets: Mapping[str, Any]) -> str:
+    """Look an API key up by name in the secrets, then the environment."""
+    if not name:
+        return ""
+    try:
+        value = secrets.get(name)
+    except Exception:
+        value = None
+    return value or os.environ.get(name, "")
+
+
+def _load_endpoints() -> List[Endpoint]:
+    raw = os.environ.get("LLM_ENDPOINTS")
+    configs = DEFAULT_ENDPOINTS
+    if raw:
+        try:
+            configs = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid LLM_ENDPOINTS, using the default endpoint: {str(e)}")
+    return [Endpoint(**config) for config in configs]
+
+
+class _Completions:
+    def __init__(self, routed: "RoutedClient"):
+        self._routed = routed
+
+    def create(self, model: str = DEFAULT_MODEL, **kwargs) -> Any:
+        return self._routed.router.create(self._routed.secrets, model, **kwargs)
+
+
+class _Chat:
+    def __init__(self, routed: "RoutedClient"):
+        self.completions = _Completions(routed)
+
+
+class RoutedClient:
+    """
+    Drop-in for ``openai.OpenAI`` in the chat engines.
+
+    ``client.chat.completions.create(...)`` goes through the router, so engines
+    get failover and latency tracking without knowing about endpoints.
+    """
+
+    def __init__(self, router: ModelRouter, secrets: Mapping[str, Any]):
+        self.router = router
+        self.secrets = secrets
+        self.chat = _Chat(self)
+
+
+# Shared router for the whole worker process
+router = ModelRouter(_load_endpoints())
+
+
+def get_routed_client(secrets: Mapping[str, Any]) -> RoutedClient:
+    """Return a client whose completions are routed across the configured endpoints."""
+    return RoutedClient(router, secrets)
+
+
+def choose_model(messages: List[Dict[str, Any]], requested: str = AUTO_MODEL) -> str:
+    """Choose the model for a turn with the shared router."""
+    return router.choose_model(messages, requested)
@@ -0,0 +1,337 @@
+"""Shared resilience policy for provider calls: retries with backoff, adaptive timeouts and circuit breakers."""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from src.services.chat_client import deadline_timeout, get_http_client
+from src.services.scheduler import upstream_slot
+from src.utils.deadline import MIN_STAGE_TIMEOUT, Deadline
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+
+logger = Logger("resilience")
+
+# Attempts per call, including the first one
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "3"))
+
+# Backoff before retry n is drawn from [0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**n)]
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", "10"))
+
+# A longer Retry-After than this is not waited for (seconds)
+RETRY_AFTER_LIMIT = 60.0
+
+# Statuses worth retrying: rate limited or a server-side failure
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Consecutive failures that open a provider's breaker, and how long it stays
+# open before a single trial request is let through (seconds)
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "30"))
+
+# Timeouts follow this percentile of the provider's observed latency, times the
+# factor, once there are enough samples; never above the provider's default
+ADAPTIVE_TIMEOUT_PERCENTILE = float(os.environ.get("ADAPTIVE_TIMEOUT_PERCENTILE", "99"))
+ADAPTIVE_TIMEOUT_FACTOR = float(os.environ.get("ADAPTIVE_TIMEOUT_FACTOR", "2"))
+ADAPTIVE_TIMEOUT_MIN = 2.0
+ADAPTIVE_MIN_SAMPLES = 20
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The provider's breaker is open; the request was not sent."""
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """Connection problems and server errors count against the provider."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether the same request may succeed if sent again."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, httpx.TransportError)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the response's Retry-After header (delay or HTTP date), if any."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, server_delay: Optional[float] = None) -> float:
+    """
+    Delay before retry ``attempt`` (0 for the first retry).
+
+    Full jitter spreads the retries of concurrent sessions apart; a delay the
+    server asked for is honoured, with a little jitter on top.
+    """
+    if server_delay is not None:
+        return server_delay + random.uniform(0, RETRY_BASE_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a provider keeps failing.
+
+    After BREAKER_FAILURE_THRESHOLD consecutive failures the breaker opens and
+    requests are rejected for BREAKER_COOLDOWN seconds. Then one trial request
+    is let through: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN,
+    ):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_started: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_timeout: Optional[float] = None
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Circuit breaker for {self.provider}: {self.state} -> {state}")
+        self.state = state
+        metrics.increment("circuit_transitions", provider=self.provider, state=state)
+        metrics.record_event(
+            "circuit_breaker",
+            {
+                "provider": self.provider,
+                "state": state,
+                "last_error": self.last_error,
+            },
+        )
+
+    def before_request(self) -> None:
+        """
+        Let a request through or reject it.
+
+        Raises:
+            CircuitOpenError: The breaker is open, or a trial request is in flight
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self.cooldown - (now - self.opened_at)
+                if remaining > 0:
+                    metrics.increment("circuit_rejected", provider=self.provider)
+                    raise CircuitOpenError(
+                        f"The {self.provider} service is failing; requests are "
+                        f"paused for {remaining:.0f}s. Please try again later."
+                    )
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                # A trial that never reported back does not block the provider forever
+                if (
+                    self.trial_started is not None
+                    and now - self.trial_started < self.cooldown
+                ):
+                    metrics.increment("circuit_rejected", provider=self.provider)
+                    raise CircuitOpenError(
+                        f"The {self.provider} service is recovering; please try "
+                        "again in a few seconds."
+                    )
+                self.trial_started = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.trial_started = None
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self.trial_started = None
+            self.last_error = f"{type(error).__name__}: {error}"
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED
+                and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def record(self, error: Exception) -> None:
+        """Record a failed request; client errors still show the provider is up."""
+        if is_provider_failure(error):
+            self.record_failure(error)
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reopens_in = None
+            if self.state == OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                reopens_in = round(max(0.0, self.cooldown - elapsed), 1)
+            return {
+                "provider": self.provider,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "next_trial_in": reopens_in,
+                "timeout": self.last_timeout,
+                "retries": int(
+                    metrics.counters().get(
+                        f"upstream_retries{{provider={self.provider}}}", 0
+                    )
+                ),
+                "last_error": self.last_error,
+            }
+
+
+_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Return the provider's breaker, shared by the whole worker process."""
+    with _lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def breaker_stats() -> List[Dict[str, Any]]:
+    """Return the state of every provider's breaker."""
+    with _lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
+
+
+def adaptive_timeout(provider: str, default: float) -> float:
+    """
+    Read timeout from the provider's observed latency, capped by its default.
+
+    Args:
+        provider: Provider name
+        default: The provider's configured timeout (seconds)
+
+    Returns:
+        float: The timeout to use (the default until enough samples exist)
+    """
+    if (
+        len(metrics.series("upstream_seconds", provider=provider))
+        < ADAPTIVE_MIN_SAMPLES
+    ):
+        return default
+    observed = metrics.percentile(
+        "upstream_seconds", ADAPTIVE_TIMEOUT_PERCENTILE, provider=provider
+    )
+    return min(default, max(ADAPTIVE_TIMEOUT_MIN, observed * ADAPTIVE_TIMEOUT_FACTOR))
+
+
+def retry_delay(
+    provider: str, error: Exception, attempt: int, deadline: Deadline
+) -> Optional[float]:
+    """
+    Decide whether a failed request is retried, and after how long.
+
+    Args:
+        provider: Provider name
+        error: The request's error
+        attempt: Retries made so far
+        deadline: The turn's deadline; a retry must fit in it
+
+    Returns:
+        float or None: Seconds to wait before retrying, or None to give up
+    """
+    if attempt + 1 >= RETRY_MAX_ATTEMPTS or not is_retryable(error):
+        return None
+    server_delay = retry_after(error)
+    if server_delay is not None and server_delay > RETRY_AFTER_LIMIT:
+        return None
+    delay = backoff_delay(attempt, server_delay)
+    if not deadline.allows(delay + MIN_STAGE_TIMEOUT):
+        deadline.degrade(provider, "not_retried")
+        return None
+
+    metrics.increment("upstream_retries", provider=provider)
+    logger.warning(
+        f"Retrying {provider} request in {delay:.1f}s after "
+        f"{type(error).__name__}: {error}"
+    )
+    return delay
+
+
+def send_with_retries(
+    provider: str,
+    send: Callable[[httpx.Timeout], httpx.Response],
+    deadline: Deadline,
+) -> httpx.Response:
+    """
+    Send a request through the provider's breaker and scheduler, retrying failures.
+
+    Args:
+        provider: Provider name, e.g. "serper"
+        send: Sends the request with the given timeout and returns the response
+        deadline: The turn's deadline, capping timeouts and retries
+
+    Returns:
+        httpx.Response: A successful response
+
+    Raises:
+        CircuitOpenError: The provider's breaker is open
+        httpx.HTTPError: The last error once retries are exhausted
+        SchedulerOverloaded: The provider is too busy to take the request
+        DeadlineExceeded: The turn has no time left for the request
+    """
+    breaker = get_breaker(provider)
+    default = get_http_client(provider).timeout.read
+    attempt = 0
+    while True:
+        timeout = deadline_timeout(
+            provider, deadline, adaptive_timeout(provider, default)
+        )
+        breaker.last_timeout = timeout.read
+        breaker.before_request()
+        started = time.perf_counter()
+        try:
+            with upstream_slot(provider):
+                response = send(timeout)
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            breaker.record(e)
+            delay = retry_delay(provider, e, attempt, deadline)
+            if delay is None:
+                raise
+            attempt += 1
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        metrics.observe(
+            "upstream_seconds", time.perf_counter() - started, provider=provider
+        )
+        return response
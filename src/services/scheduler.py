@@ -0,0 +1,387 @@
+"""Process-wide scheduler for upstream requests: concurrency caps, rate limits and fair queuing."""
+
+import contextvars
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.deadline import current_deadline
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+
+logger = Logger("scheduler")
+
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "1") == "1"
+
+# Interactive turns are served before background work (jobs, prefetching, titles)
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+_PRIORITY_ORDER = {INTERACTIVE: 0, BACKGROUND: 1}
+
+# Requests in flight at once and requests started per minute, per provider;
+# override with SCHEDULER_CONCURRENCY_<PROVIDER> and SCHEDULER_RPM_<PROVIDER>
+PROVIDER_LIMITS: Dict[str, Dict[str, int]] = {
+    "dashscope": {"concurrency": 16, "rpm": 600},
+    "serper": {"concurrency": 8, "rpm": 300},
+    "duckduckgo": {"concurrency": 4, "rpm": 60},
+    "gemini": {"concurrency": 8, "rpm": 300},
+    "jina": {"concurrency": 4, "rpm": 30},
+}
+DEFAULT_LIMITS = {"concurrency": 8, "rpm": 300}
+
+# Requests that may wait for one provider before new ones are turned away;
+# background work is turned away once half of the queue is taken
+SCHEDULER_MAX_QUEUE = int(os.environ.get("SCHEDULER_MAX_QUEUE", "32"))
+
+# Longest wait for a slot (seconds), further capped by the turn's deadline
+SCHEDULER_MAX_WAIT = float(os.environ.get("SCHEDULER_MAX_WAIT", "30"))
+
+_caller: contextvars.ContextVar[Tuple[str, str]] = contextvars.ContextVar(
+    "scheduler_caller", default=("anonymous", INTERACTIVE)
+)
+
+
+class SchedulerOverloaded(Exception):
+    """The provider's queue is full, or no slot freed up in time."""
+
+
+def _provider_limits(provider: str) -> Tuple[int, int]:
+    """Concurrency cap and requests per minute from the environment or the defaults."""
+    limits = PROVIDER_LIMITS.get(provider, DEFAULT_LIMITS)
+    concurrency = int(
+        os.environ.get(
+            f"SCHEDULER_CONCURRENCY_{provider.upper()}", limits["concurrency"]
+        )
+    )
+    per_minute = int(os.environ.get(f"SCHEDULER_RPM_{provider.upper()}", limits["rpm"]))
+    return max(1, concurrency), max(1, per_minute)
+
+
+class RateLimiter:
+    """
+    Token bucket refilled at ``per_minute`` requests per minute.
+
+    The bucket holds ten seconds' worth of requests, so short bursts pass at
+    once. Not thread-safe; the owning queue calls it with its lock held.
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute / 6)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def wait_time(self) -> float:
+        """Seconds until a request may start (0 when one may start now)."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.per_minute / 60
+        )
+        self._updated = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) * 60 / self.per_minute
+
+    def take(self) -> None:
+        self._tokens -= 1
+
+
+class _Waiter:
+    __slots__ = ("user", "priority", "seq")
+
+    def __init__(self, user: str, priority: str, seq: int):
+        self.user = user
+        self.priority = priority
+        self.seq = seq
+
+
+class ProviderQueue:
+    """
+    Admission control for one provider.
+
+    A waiting request is served when a slot is free and the rate limit allows
+    it. Among waiters, interactive requests go first, then the user with the
+    fewest requests in flight, then the oldest request, so one busy user cannot
+    starve the others.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        concurrency: int,
+        per_minute: int,
+        max_queue: int = SCHEDULER_MAX_QUEUE,
+    ):
+        self.provider = provider
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._rate = RateLimiter(per_minute)
+        self._condition = threading.Condition()
+        self._waiters: List[_Waiter] = []
+        self._in_flight = 0
+        self._user_in_flight: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self.served = 0
+        self.shed = 0
+
+    def _next(self) -> _Waiter:
+        return min(
+            self._waiters,
+            key=lambda w: (
+                _PRIORITY_ORDER[w.priority],
+                self._user_in_flight.get(w.user, 0),
+                w.seq,
+            ),
+        )
+
+    def _shed(self, reason: str, message: str) -> SchedulerOverloaded:
+        self.shed += 1
+        metrics.increment("scheduler_shed", provider=self.provider, reason=reason)
+        logger.warning(f"Shedding a {self.provider} request: {reason}")
+        return SchedulerOverloaded(message)
+
+    def acquire(self, user: str, priority: str, timeout: float) -> None:
+        """
+        Wait for a slot.
+
+        Args:
+            user: The caller the request counts against
+            priority: INTERACTIVE or BACKGROUND
+            timeout: Longest wait (seconds)
+
+        Raises:
+            SchedulerOverloaded: The queue is full or the wait timed out
+        """
+        started = time.monotonic()
+        with self._condition:
+            queued = len(self._waiters)
+            limit = self.max_queue if priority == INTERACTIVE else self.max_queue // 2
+            if queued >= max(1, limit):
+                raise self._shed(
+                    "queue_full",
+                    f"The {self.provider} service is busy right now ({queued} "
+                    "requests waiting). Please try again in a few seconds.",
+                )
+
+            waiter = _Waiter(user, priority, next(self._seq))
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    wait = None
+                    if self._in_flight < self.concurrency and self._next() is waiter:
+                        wait = self._rate.wait_time()
+                        if wait <= 0:
+                            self._rate.take()
+                            break
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        raise self._shed(
+                            "timeout",
+                            f"The {self.provider} service is busy right now (waited "
+                            f"{timeout:.0f}s). Please try again in a few seconds.",
+                        )
+                    self._condition.wait(
+                        remaining if wait is None else min(wait, remaining)
+                    )
+            finally:
+                self._waiters.remove(waiter)
+                # The next waiter may be served now
+                self._condition.notify_all()
+
+            self._in_flight += 1
+            self._user_in_flight[user] = self._user_in_flight.get(user, 0) + 1
+            self.served += 1
+
+        metrics.observe(
+            "scheduler_wait_seconds",
+            time.monotonic() - started,
+            provider=self.provider,
+            priority=priority,
+        )
+
+    def try_acquire(self, user: str) -> bool:
+        """
+        Take a slot only if one is free now and no request is waiting for it.
+
+        Args:
+            user: The caller the request counts against
+
+        Returns:
+            bool: Whether the slot was taken
+        """
+        with self._condition:
+            if (
+                self._waiters
+                or self._in_flight >= self.concurrency
+                or self._rate.wait_time() > 0
+            ):
+                return False
+            self._rate.take()
+            self._in_flight += 1
+            self._user_in_flight[user] = self._user_in_flight.get(user, 0) + 1
+            self.served += 1
+        return True
+
+    def release(self, user: str) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._user_in_flight[user] -= 1
+            if not self._user_in_flight[user]:
+                del self._user_in_flight[user]
+            self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "provider": self.provider,
+                "in_flight": self._in_flight,
+                "concurrency": self.concurrency,
+                "queued": len(self._waiters),
+                "queued_interactive": sum(
+                    1 for w in self._waiters if w.priority == INTERACTIVE
+                ),
+                "users_in_flight": len(self._user_in_flight),
+                "requests_per_minute": self._rate.per_minute,
+                "served": self.served,
+                "shed": self.shed,
+            }
+
+
+class Slot:
+    """A granted request slot; releasing it more than once has no effect."""
+
+    def __init__(self, queue: Optional[ProviderQueue], user: str):
+        self._queue = queue
+        self._user = user
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            queue, self._queue = self._queue, None
+        if queue is not None:
+            queue.release(self._user)
+
+
+class ScheduledStream:
+    """A streaming response that holds its slot until it ends or is closed."""
+
+    def __init__(self, stream: Any, slot: Slot):
+        self._stream = stream
+        self._slot = slot
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            yield from self._stream
+        finally:
+            self._slot.release()
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._slot.release()
+
+
+class Scheduler:
+    """
+    Every upstream request of the worker process waits here for a slot.
+
+    Queues are created per provider on first use. Callers are identified by
+    ``scheduled_as``; requests made outside it count as one anonymous
+    interactive user.
+    """
+
+    def __init__(self, enabled: bool = SCHEDULER_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._queues: Dict[str, ProviderQueue] = {}
+
+    def queue(self, provider: str) -> ProviderQueue:
+        with self._lock:
+            if provider not in self._queues:
+                concurrency, per_minute = _provider_limits(provider)
+                self._queues[provider] = ProviderQueue(
+                    provider, concurrency, per_minute
+                )
+            return self._queues[provider]
+
+    def acquire(self, provider: str) -> Slot:
+        """
+        Wait for a slot for one request to a provider.
+
+        Args:
+            provider: Provider name, e.g. "dashscope" or "serper"
+
+        Returns:
+            Slot: The slot, to be released when the response is done
+
+        Raises:
+            SchedulerOverloaded: The provider's queue is full or the wait timed out
+            DeadlineExceeded: The turn has no time left to wait
+        """
+        user, priority = _caller.get()
+        if not self.enabled:
+            return Slot(None, user)
+        queue = self.queue(provider)
+        queue.acquire(user, priority, current_deadline().timeout(SCHEDULER_MAX_WAIT))
+        return Slot(queue, user)
+
+    def try_acquire(self, provider: str) -> Optional[Slot]:
+        """
+        Take a slot for an optional request, such as a hedge, without waiting.
+
+        Args:
+            provider: Provider name
+
+        Returns:
+            Slot or None: The slot, or None if the provider is busy
+        """
+        user, _ = _caller.get()
+        if not self.enabled:
+            return Slot(None, user)
+        queue = self.queue(provider)
+        return Slot(queue, user) if queue.try_acquire(user) else None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return the load of every provider queue."""
+        with self._lock:
+            queues = list(self._queues.values())
+        return [queue.snapshot() for queue in queues]
+
+
+# Shared scheduler for the whole worker process
+scheduler = Scheduler()
+
+
+def current_user() -> str:
+    """The user (or background subsystem) the current upstream requests count against."""
+    return _caller.get()[0]
+
+
+@contextmanager
+def scheduled_as(user: str, priority: str = INTERACTIVE) -> Iterator[None]:
+    """
+    Attribute the upstream requests made in the block to a user and priority.
+
+    Args:
+        user: The user (browser session) or background subsystem making them
+        priority: INTERACTIVE or BACKGROUND
+    """
+    token = _caller.set((user, priority))
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+@contextmanager
+def upstream_slot(provider: str) -> Iterator[None]:
+    """Hold a scheduler slot for the provider while the block runs."""
+    slot = scheduler.acquire(provider)
+    try:
+        yield
+    finally:
+        slot.release()
@@ -0,0 +1,315 @@
+"""Shared Server-Sent Events client: incremental parsing, idle timeouts and resumable reconnects."""
+
+import codecs
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+from src.services.chat_client import HTTP_CONNECT_TIMEOUT, get_http_client
+from src.services.resilience import get_breaker, retry_delay
+from src.services.scheduler import upstream_slot
+from src.utils.cancellation import cancellable
+from src.utils.deadline import MIN_STAGE_TIMEOUT, Deadline, current_deadline
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+
+logger = Logger("sse_client")
+
+# A stream is abandoned when no bytes arrive for this long (seconds); there is no
+# limit on the total duration of a stream
+SSE_IDLE_TIMEOUT = float(os.environ.get("SSE_IDLE_TIMEOUT", "60"))
+
+# Reconnect attempts for providers that support resuming with Last-Event-ID
+SSE_MAX_RECONNECTS = int(os.environ.get("SSE_MAX_RECONNECTS", "3"))
+
+# Delay before reconnecting unless the server sets one with "retry:" (milliseconds)
+SSE_DEFAULT_RETRY_MS = 1000
+
+# Largest event or line kept in memory; protects against a stream without newlines
+SSE_MAX_EVENT_BYTES = int(os.environ.get("SSE_MAX_EVENT_BYTES", str(4 * 1024 * 1024)))
+
+# Errors after which a resumable stream is reconnected
+RECONNECT_ERRORS = (httpx.ReadTimeout, httpx.ReadError, httpx.RemoteProtocolError)
+
+
+class SSEError(Exception):
+    """The event stream is malformed or could not be resumed."""
+
+
+class SSEEvent:
+    """One dispatched event."""
+
+    __slots__ = ("event", "data", "id", "retry")
+
+    def __init__(
+        self,
+        data: str,
+        event: str = "message",
+        id: Optional[str] = None,
+        retry: Optional[int] = None,
+    ):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def json(self) -> Any:
+        return json.loads(self.data)
+
+    def __repr__(self) -> str:
+        return f"SSEEvent(event={self.event!r}, data={self.data!r}, id={self.id!r})"
+
+
+class SSEParser:
+    """
+    Incremental parser for the text/event-stream format.
+
+    Bytes are fed as they arrive; UTF-8 sequences and lines split across chunks
+    are buffered, CR, LF and CRLF line endings are accepted, and multi-line
+    ``data:`` fields are joined with newlines as the specification requires.
+    """
+
+    def __init__(self, max_event_bytes: int = SSE_MAX_EVENT_BYTES):
+        self.max_event_bytes = max_event_bytes
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._pending_cr = False
+        self._reset_event()
+
+    def _reset_event(self) -> None:
+        self._data: List[str] = []
+        self._event = ""
+        self._id: Optional[str] = None
+        self._size = 0
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """
+        Consume bytes and return the events they complete.
+
+        Args:
+            chunk: Raw bytes from the response body
+
+        Returns:
+            list: Dispatched events, in order
+        """
+        text = self._decoder.decode(chunk)
+        if not text:
+            return []
+        if self._pending_cr and text.startswith("\n"):
+            # The LF of a CRLF split across chunks
+            text = text[1:]
+        self._pending_cr = text.endswith("\r")
+        self._buffer += text
+
+        events: List[SSEEvent] = []
+        lines = self._buffer.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self._buffer = lines.pop()
+        if len(self._buffer) > self.max_event_bytes:
+            raise SSEError("Event stream line exceeds the size limit")
+        for line in lines:
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def discard_partial(self) -> None:
+        """Drop a partly received event, e.g. before resuming a dropped stream."""
+        self._decoder.reset()
+        self._buffer = ""
+        self._pending_cr = False
+        self._reset_event()
+
+    def _process_line(self, line: str) -> Optional[SSEEvent]:
+        if not line:
+            return self._dispatch()
+        if line.startswith(":"):
+            # Comment, used by servers as a keep-alive heartbeat
+            return None
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+
+        if field == "data":
+            self._size += len(value)
+            if self._size > self.max_event_bytes:
+                raise SSEError("Event exceeds the size limit")
+            self._data.append(value)
+        elif field == "event":
+            self._event = value
+        elif field == "id":
+            if "\0" not in value:
+                self._id = value
+        elif field == "retry" and value.isdigit():
+            self.retry = int(value)
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        # The id only counts once its event is complete, so a resumed stream
+        # replays an event that was cut off
+        if self._id is not None:
+            self.last_event_id = self._id
+        if not self._data:
+            self._reset_event()
+            return None
+        event = SSEEvent(
+            "\n".join(self._data),
+            self._event or "message",
+            self.last_event_id,
+            self.retry,
+        )
+        self._reset_event()
+        return event
+
+
+def stream_sse(
+    provider: str,
+    url: str,
+    json_body: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    method: str = "POST",
+    idle_timeout: float = SSE_IDLE_TIMEOUT,
+    resumable: bool = False,
+    max_reconnects: int = SSE_MAX_RECONNECTS,
+    deadline: Optional[Deadline] = None,
+) -> Iterator[SSEEvent]:
+    """
+    Stream Server-Sent Events from a provider through its pooled HTTP client.
+
+    Events are read only as fast as the caller consumes them, so a slow consumer
+    applies backpressure through the socket instead of buffering the stream.
+    Requests go through the provider's circuit breaker; failures before the
+    first event are retried with backoff like any other provider call.
+
+    Args:
+        provider: Provider whose pooled client to use, e.g. "jina" or "gemini"
+        url: Stream URL
+        json_body: JSON request body
+        headers: Extra request headers
+        method: HTTP method
+        idle_timeout: Longest wait for the next bytes (seconds)
+        resumable: Whether the provider resumes a stream from ``Last-Event-ID``
+        max_reconnects: Reconnect attempts for resumable streams
+        deadline: Turn deadline capping the connect and idle waits (default:
+            the current turn's); a stream that keeps producing is never cut
+
+    Yields:
+        SSEEvent: Events in order; after a reconnect the stream continues
+        from the last event id the server sent
+
+    Raises:
+        httpx.HTTPStatusError: The server answered with an error status
+        httpx.RequestError: The connection failed and could not be resumed
+        SSEError: The stream was malformed
+        SchedulerOverloaded: The provider is too busy to take the stream
+        CircuitOpenError: The provider's breaker is open
+        DeadlineExceeded: The turn ran out of time before (re)connecting
+    """
+    parser = SSEParser()
+    request_headers = {"Accept": "text/event-stream", **(headers or {})}
+    deadline = deadline or current_deadline()
+    http_client = get_http_client(provider)
+    breaker = get_breaker(provider)
+    reconnects = 0
+    retries = 0
+    received = False
+
+    while True:
+        if parser.last_event_id is not None:
+            request_headers["Last-Event-ID"] = parser.last_event_id
+        wait = deadline.timeout(idle_timeout)
+        timeout = httpx.Timeout(wait, connect=min(HTTP_CONNECT_TIMEOUT, wait))
+        breaker.before_request()
+        try:
+            # The provider's scheduler slot is held for as long as the stream is open
+            with (
+                upstream_slot(provider),
+                http_client.stream(
+                    method,
+                    url,
+                    json=json_body,
+                    headers=request_headers,
+                    timeout=timeout,
+                ) as response,
+            ):
+                # Closed at once if the user stops or leaves the turn
+                cancellable(response)
+                if response.is_error:
+                    # Read the body so callers can report the provider's message
+                    response.read()
+                response.raise_for_status()
+                breaker.record_success()
+                for chunk in response.iter_bytes():
+                    for event in parser.feed(chunk):
+                        received = True
+                        yield event
+                    reconnects = 0
+                # An event without its terminating blank line is incomplete
+                parser.discard_partial()
+                return
+        except httpx.HTTPError as e:
+            breaker.record(e)
+            # Nothing was delivered yet, so the request can simply be sent again
+            if not received:
+                delay = retry_delay(provider, e, retries, deadline)
+                if delay is not None:
+                    retries += 1
+                    time.sleep(delay)
+                    continue
+            if not isinstance(e, RECONNECT_ERRORS):
+                raise
+            can_resume = resumable and parser.last_event_id is not None
+            if not can_resume or reconnects >= max_reconnects:
+                raise
+            delay = (parser.retry or SSE_DEFAULT_RETRY_MS) / 1000 * (reconnects + 1)
+            if not deadline.allows(delay + MIN_STAGE_TIMEOUT):
+                deadline.degrade(provider, "not_resumed")
+                raise
+            reconnects += 1
+            parser.discard_partial()
+            metrics.increment("sse_reconnects", provider=provider)
+            logger.warning(
+                f"SSE stream from {provider} dropped ({type(e).__name__}), resuming "
+                f"after event {parser.last_event_id} in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+def iter_sse_json(
+    events: Iterable[SSEEvent], provider: str, done: str = "[DONE]"
+) -> Iterator[Any]:
+    """
+    Decode the JSON payload of each event, stopping at the ``done`` sentinel.
+
+    Malformed payloads are logged and counted instead of silently skipped.
+
+    Args:
+        events: Events from ``stream_sse``
+        provider: Provider name used in logs and metrics
+        done: Data value that marks the end of the stream
+
+    Yields:
+        The decoded JSON value of each event
+    """
+    try:
+        for event in events:
+            if event.data == done:
+                return
+            try:
+                yield event.json()
+            except json.JSONDecodeError as e:
+                metrics.increment("sse_malformed_events", provider=provider)
+                logger.warning(
+                    f"Skipping malformed event from {provider}: {str(e)}",
+                    extra={"data": event.data[:200]},
+                )
+    finally:
+        # Release the connection when the caller stops early
+        close = getattr(events, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,314 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+from src.services.chat_client import registry
+from src.services.hedging import HEDGE_ENABLED, hedge_budget
+from src.services.job_runner import job_runner
+from src.services.model_router import router
+from src.services.resilience import OPEN, breaker_stats
+from src.services.scheduler import SCHEDULER_ENABLED, scheduler
+from src.utils.chart_utils import DEFAULT_MAX_POINTS, downsample_series
+from src.utils.memory_profiler import (
+    get_session_reports,
+    record_session_memory,
+    session_label,
+    tracemalloc_top,
+)
+from src.utils.metrics import metrics
+from src.utils.response_cache import RESPONSE_CACHE_ENABLED, response_cache
+from src.utils.tracing import SLOW_TURN_THRESHOLD
+
+
+def _format_bytes(size: int) -> str:
+    """Format a byte count for display."""
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def render_memory_panel() -> None:
+    """Render per-session and per-key memory estimates for this worker."""
+    st.markdown("#### 🧠 Session Memory")
+
+    # Measure the current session on demand so the panel is never stale for it
+    current = record_session_memory(st.session_state, force=True)
+    reports = get_session_reports()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Active Sessions", len(reports))
+    with col2:
+        st.metric(
+            "Total Session Memory",
+            _format_bytes(sum(report["total_bytes"] for report in reports)),
+        )
+    with col3:
+        st.metric("This Session", _format_bytes(current["total_bytes"]))
+
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {
+                    "session": session_label(report["session_id"]),
+                    "total": _format_bytes(report["total_bytes"]),
+                    "keys": report["key_count"],
+                    "largest_key": next(iter(report["keys"]), ""),
+                    "measured_at": report["timestamp"],
+                }
+                for report in reports
+            ]
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    with st.expander("Largest keys in this session"):
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {"key": key, "size": _format_bytes(size), "bytes": size}
+                    for key, size in current["keys"].items()
+                ]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    top_lines = tracemalloc_top()
+    with st.expander("tracemalloc top allocations"):
+        if top_lines:
+            st.dataframe(
+                pd.DataFrame(top_lines), use_container_width=True, hide_index=True
+            )
+        else:
+            st.caption("Set `MEMORY_TRACEMALLOC=1` to enable allocation tracing.")
+
+
+def render_latency_panel() -> None:
+    """Render turn latency over time and the average per-stage breakdown."""
+    st.markdown("#### ⏱️ Turn Latency")
+
+    turn_series = [
+        name for name in metrics.series_names() if name.startswith("turn_seconds")
+    ]
+    if not turn_series:
+        st.info("No chat turns recorded by this worker yet.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Turns", sum(len(metrics.series(name)) for name in turn_series))
+    with col2:
+        p50 = [metrics.percentile(name, 50) for name in turn_series]
+        st.metric("Median Turn (worst mode)", f"{max(p50):.2f}s")
+    with col3:
+        p90 = [metrics.percentile(name, 90) for name in turn_series]
+        st.metric("p90 Turn (worst mode)", f"{max(p90):.2f}s")
+
+    # One downsampled line per chat mode
+    latency = {}
+    for name in turn_series:
+        samples = metrics.series(name)
+        series = pd.Series(
+            [value for _, value in samples],
+            index=pd.to_datetime([ts for ts, _ in samples], unit="s"),
+        ).sort_index()
+        latency[name.split("mode=")[-1].rstrip("}")] = downsample_series(
+            series, DEFAULT_MAX_POINTS
+        )
+    st.line_chart(pd.DataFrame(latency))
+
+    stage_rows = []
+    for name in metrics.series_names():
+        if name.startswith("turn_stage_seconds"):
+            values = [value for _, value in metrics.series(name)]
+            stage_rows.append(
+                {
+                    "stage": name.split("stage=")[-1].rstrip("}"),
+                    "mean_seconds": sum(values) / len(values),
+                    "samples": len(values),
+                }
+            )
+    st.dataframe(pd.DataFrame(stage_rows), use_container_width=True, hide_index=True)
+
+
+def render_slow_turns_panel() -> None:
+    """Render the span trees of recent turns that exceeded the slow-turn threshold."""
+    st.markdown("#### 🐢 Slow Turns")
+
+    slow_turns = metrics.events("slow_turn")
+    if not slow_turns:
+        st.caption(f"No turn exceeded {SLOW_TURN_THRESHOLD:.0f}s in this worker.")
+        return
+
+    for tree in reversed(slow_turns[-10:]):
+        label = f"{tree['trace_id']} – {tree['duration']:.2f}s ({tree['attributes'].get('mode')})"
+        with st.expander(label):
+            st.json(tree)
+
+
+def render_client_pool_panel() -> None:
+    """Render connection pool usage of the shared upstream clients."""
+    st.markdown("#### 🔌 Upstream Connection Pools")
+
+    stats = registry.pool_stats()
+    if not stats:
+        st.caption("No upstream client has been created in this worker yet.")
+        return
+
+    st.dataframe(
+        pd.DataFrame(
+            [{"provider": provider, **values} for provider, values in stats.items()]
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+def render_scheduler_panel() -> None:
+    """Render load, queue lengths and shed requests of the upstream scheduler."""
+    st.markdown("#### 🚦 Upstream Scheduler")
+
+    if not SCHEDULER_ENABLED:
+        st.caption("The upstream scheduler is disabled (`SCHEDULER_ENABLED=0`).")
+        return
+
+    stats = scheduler.stats()
+    if not stats:
+        st.caption("No upstream request has been scheduled in this worker yet.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("In Flight", sum(queue["in_flight"] for queue in stats))
+    with col2:
+        st.metric("Waiting", sum(queue["queued"] for queue in stats))
+    with col3:
+        st.metric("Shed", sum(queue["shed"] for queue in stats))
+
+    st.dataframe(pd.DataFrame(stats), use_container_width=True, hide_index=True)
+
+
+def render_resilience_panel() -> None:
+    """Render circuit breaker state, retries and timeouts of the providers."""
+    st.markdown("#### 🛡️ Provider Resilience")
+
+    stats = breaker_stats()
+    if not stats:
+        st.caption("No provider call has gone through the retry policy yet.")
+        return
+
+    counters = metrics.counters()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Open Breakers", sum(1 for row in stats if row["state"] == OPEN))
+    with col2:
+        st.metric("Retries", sum(row["retries"] for row in stats))
+    with col3:
+        st.metric(
+            "Rejected While Open",
+            int(
+                sum(
+                    count
+                    for name, count in counters.items()
+                    if name.startswith("circuit_rejected")
+                )
+            ),
+        )
+
+    st.dataframe(pd.DataFrame(stats), use_container_width=True, hide_index=True)
+
+
+def render_response_cache_panel() -> None:
+    """Render hit rates of the shared LLM response cache."""
+    st.markdown("#### ♻️ Response Cache")
+
+    if not RESPONSE_CACHE_ENABLED:
+        st.caption("The response cache is disabled (`RESPONSE_CACHE_ENABLED=0`).")
+        return
+
+    stats = response_cache.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Entries", stats["entries"])
+    with col2:
+        st.metric("Exact Hits", stats["exact_hits"])
+    with col3:
+        st.metric("Near-Duplicate Hits", stats["near_hits"])
+    with col4:
+        ratio = stats["hit_ratio"]
+        st.metric("Hit Ratio", f"{ratio:.0%}" if ratio is not None else "–")
+
+
+def render_router_panel() -> None:
+    """Render latency and error moving averages of the LLM endpoints."""
+    st.markdown("#### 🧭 Model Router")
+
+    st.dataframe(
+        pd.DataFrame(router.stats()), use_container_width=True, hide_index=True
+    )
+
+    counters = metrics.counters()
+    choices = {
+        name: count
+        for name, count in counters.items()
+        if name.startswith("router_model_choice")
+    }
+    failovers = sum(
+        count for name, count in counters.items() if name.startswith("router_failovers")
+    )
+    hedge_wins = counters.get("llm_hedge_wins{winner=hedge}", 0)
+    hedge_rate = hedge_budget.rate()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Failovers", int(failovers))
+    with col2:
+        st.metric("Routed Turns", int(sum(choices.values())))
+    with col3:
+        st.metric(
+            "Hedge Rate",
+            f"{hedge_rate:.0%}" if HEDGE_ENABLED and hedge_rate is not None else "–",
+        )
+    with col4:
+        st.metric(
+            "Hedge Wins", f"{int(hedge_wins)} / {int(counters.get('llm_hedges', 0))}"
+        )
+    if choices:
+        st.caption(
+            " · ".join(
+                f"{name.split('=', 1)[-1].rstrip('}')}: {int(count)}"
+                for name, count in sorted(choices.items())
+            )
+        )
+
+
+def render_jobs_panel() -> None:
+    """Render background jobs that are queued or running in this worker."""
+    st.markdown("#### 🗂️ Background Jobs")
+
+    jobs = job_runner.active_jobs()
+    st.caption(
+        f"{len(jobs)} active · limit {job_runner.max_concurrent} at once, "
+        f"{job_runner.max_per_user} per user"
+    )
+    if jobs:
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "job": job.id[:8],
+                        "mode": job.mode,
+                        "status": job.status,
+                        "characters": len(job.text),
+                        "running_for_s": round(time.time() - job.created_at),
+                    }
+                    for job in jobs
+                ]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
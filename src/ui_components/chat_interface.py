@@ -1,65 +1,52 @@
 import json
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
 import streamlit as st
 
+from src.core.registry import get_engine, list_engines
+from src.utils.think_parser import answer_text, format_segments, split_thinking
+
 
 def parse_thinking_content(content: str) -> str:
     """Parse content to handle thinking sections from model output."""
-    if not content or ("<think>" not in content or "</think>" not in content):
-        return content
-
-    try:
-        parts = content.split("</think>")
-        if len(parts) > 1:
-            pre_think = parts[0].split("<think>")[0].strip()
-            post_think = parts[1].strip()
-            thinking_content = parts[0].split("<think>")[1].strip()
-
-            # Format thinking section
-            thinking_section = f"""<details class="thinking-details">
-                <summary>💭 Thinking Process</summary>
-                <div class="thinking-content">
-                    <div class="thinking-text">{thinking_content}</div>
-                </div>
-            </details>"""
-
-            # Combine parts with proper spacing
-            if pre_think and post_think:
-                return f"{pre_think}\n\n{thinking_section}\n\n{post_think}"
-            elif pre_think:
-                return f"{pre_think}\n\n{thinking_section}"
-            elif post_think:
-                return f"{thinking_section}\n\n{post_think}"
-            else:
-                return thinking_section
-    except Exception as e:
-        st.error(f"Error parsing thinking content: {str(e)}")
+    if not content or "<think>" not in content:
         return content
 
-    return content
+    # Segments are cached per message, so reruns do not re-parse the history
+    return format_segments(list(split_thinking(content)))
 
 
 def clean_thinking_tags(content: str) -> str:
     """Clean <think> tags from content when we need just the final output."""
-    if not content:
-        return ""
+    return answer_text(content)
+
 
-    if "<think>" in content:
-        if "</think>" in content:
-            content = content.split("</think>")[-1].strip()
-        else:
-            content = content.split("<think>")[0].strip()
-    return content
+def show_timing_panel(timings: Dict[str, Any]) -> None:
+    """Display the timing breakdown of a single turn in an expander."""
+    stages = timings.get("stages", {})
+    total = stages.get("Total turn")
+    label = f"⏱️ Timing ({total:.2f}s)" if total is not None else "⏱️ Timing"
 
+    with st.expander(label, expanded=False):
+        for stage, seconds in stages.items():
+            st.markdown(f"- {stage}: {seconds:.2f} seconds")
+        if timings.get("tokens"):
+            st.markdown(f"- Streamed tokens: {timings['tokens']}")
+        if timings.get("tokens_per_second"):
+            st.markdown(f"- Tokens per second: {timings['tokens_per_second']:.1f}")
 
-def show_chat_message(message: Dict[str, str]) -> None:
+
+def show_chat_message(message: Dict[str, Any]) -> None:
     """Display a single chat message with appropriate styling."""
     if message["role"] in ["user", "assistant"]:
         with st.chat_message(message["role"]):
             # Parse thinking content before displaying
             content = parse_thinking_content(message["content"])
             st.markdown(content, unsafe_allow_html=True)
+            if message.get("stopped"):
+                st.caption("⏹️ Stopped before the answer was complete")
+            if "timings" in message:
+                show_timing_panel(message["timings"])
 
 
 def show_chat_history(chat_history: List[Dict[str, str]]) -> None:
@@ -86,14 +73,8 @@ def render_chat_modes() -> str:
     Returns:
         str: The selected chat mode
     """
-    # Create a mapping of options to icons
-    option_map = {
-        "Default": "💬",
-        "Search-Agent": "🔍",
-        "Grounding Truth with Google": "🌐",
-        "Deep-Research": "🔍🧠🌐",
-        "ReAct-Agent": "🧠",
-    }
+    # Build the options from the engine registry (no engine module is imported here)
+    option_map = {engine.name: engine.icon for engine in list_engines()}
 
     # Use segmented control for selecting chat mode
     selection = st.segmented_control(
@@ -105,32 +86,51 @@ def render_chat_modes() -> str:
     )
 
     # Show description based on selected mode
-    if selection == "Search-Agent":
-        st.caption("Uses **web search** to find information before responding")
-    elif selection == "Grounding Truth with Google":
-        st.caption("Uses **Google search API** for real-time information")
-    elif selection == "Deep-Research":
-        st.caption("Performs in-depth research with **Jina DeepSearch**")
-    elif selection == "ReAct-Agent":
-        st.caption("Uses **step-by-step reasoning** approach")
-    else:
-        st.caption("**Standard chat** without additional tools")
+    st.caption(get_engine(selection).description)
 
     return selection
 
 
 def render_chat_input(
     on_submit: Callable[[str], None], placeholder: str = "Ask something..."
-) -> None:
+) -> Optional[str]:
     """
     Render the chat input box.
 
     Args:
         on_submit: Callback function to call when a message is submitted
         placeholder: Placeholder text for the input box
+
+    Returns:
+        str or None: The submitted message
     """
     if prompt := st.chat_input(placeholder):
         on_submit(prompt)
+    return prompt
+
+
+def show_followups(followups: List[str], key: str = "followup") -> None:
+    """
+    Show suggested follow-up questions as chips; clicking one asks it.
+
+    The clicked question is left in ``st.session_state["followup_prompt"]`` for
+    the page to answer on the rerun.
+    """
+    if not followups:
+        return
+
+    def _select(question: str) -> None:
+        st.session_state["followup_prompt"] = question
+
+    columns = st.columns(len(followups))
+    for i, (column, question) in enumerate(zip(columns, followups)):
+        column.button(
+            question,
+            key=f"{key}_{i}",
+            on_click=_select,
+            args=(question,),
+            use_container_width=True,
+        )
 
 
 def apply_css_styling() -> None:
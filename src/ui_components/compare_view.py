@@ -0,0 +1,204 @@
+import contextvars
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from src.core.registry import ChatEngine, get_engine, list_engines
+from src.ui_components.chat_interface import parse_thinking_content
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+from src.utils.timing import (
+    TIME_TO_FIRST_TOKEN,
+    TOTAL,
+    record_turn_metrics,
+    start_turn_timer,
+)
+from src.utils.tracing import span
+
+logger = Logger("compare_view")
+
+# Most modes compared at once (one column each)
+COMPARE_MAX_ENGINES = 4
+
+# How often the page refreshes the comparison's progress (seconds)
+COMPARE_POLL_SECONDS = 0.25
+
+
+def compare_stats_text(answer: Dict[str, Any]) -> str:
+    """One-line timing and token summary of a compared answer."""
+    timings = answer["timings"]
+    stages = timings["stages"]
+    parts = [f"⏱️ {stages[TOTAL]:.1f}s"]
+    if TIME_TO_FIRST_TOKEN in stages:
+        parts.append(f"first token {stages[TIME_TO_FIRST_TOKEN]:.1f}s")
+    if timings.get("tokens"):
+        parts.append(f"{timings['tokens']} tokens")
+    if timings.get("tokens_per_second"):
+        parts.append(f"{timings['tokens_per_second']:.0f} tokens/s")
+    if answer.get("model"):
+        parts.append(answer["model"])
+    return " · ".join(parts)
+
+
+def _answer_footer(
+    comparison_id: str,
+    answer: Dict[str, Any],
+    index: int,
+    on_keep: Callable[[int], None],
+) -> None:
+    st.caption(compare_stats_text(answer))
+    st.button(
+        "✅ Keep this answer",
+        key=f"keep_{comparison_id}_{index}",
+        on_click=on_keep,
+        args=(index,),
+        use_container_width=True,
+    )
+
+
+def _run_engine(
+    engine: ChatEngine,
+    client,
+    prompt: str,
+    history_input: List[Dict],
+    kwargs: Dict[str, Any],
+    container,
+    answer: Dict[str, Any],
+) -> None:
+    """Stream one engine into its column; runs in a worker thread."""
+    timer = start_turn_timer()
+    with container, span(engine.name, mode=engine.name):
+        try:
+            answer["content"] = engine.stream(client, prompt, history_input, **kwargs)
+        except Exception as e:
+            logger.error(f"Error comparing {engine.name}: {str(e)}", exc_info=True)
+            answer["content"] = f"Error: {str(e)}"
+            st.error(answer["content"])
+    answer["timings"] = timer.summary()
+
+
+def render_compare_modes() -> List[str]:
+    """
+    Render the compare switch and the modes to compare.
+
+    Returns:
+        list: Names of the modes to compare, empty when comparing is off
+    """
+    if not st.toggle(
+        "Compare modes",
+        key="compare_enabled",
+        help="Send the next message to several modes at once and keep the best answer.",
+    ):
+        return []
+
+    names = [engine.name for engine in list_engines()]
+    return st.multiselect(
+        "Modes to compare:",
+        options=names,
+        default=names[:2],
+        max_selections=COMPARE_MAX_ENGINES,
+        key="compare_modes",
+    )
+
+
+def run_comparison(
+    engines: List[ChatEngine],
+    client,
+    prompt: str,
+    history_input: List[Dict],
+    engine_kwargs: Dict[str, Dict[str, Any]],
+    on_keep: Callable[[int], None],
+) -> Dict[str, Any]:
+    """
+    Stream several engines' answers to one prompt side by side, concurrently.
+
+    Each engine runs in its own thread with the script run context attached, so
+    it renders into its column as it would in a normal turn. The comparison takes
+    as long as the slowest engine.
+
+    Args:
+        engines: The engines to compare
+        client: OpenAI client instance
+        prompt: User's query
+        history_input: Model input shared by all engines
+        engine_kwargs: Extra arguments per engine name, such as the routed model
+        on_keep: Called with the index of the answer the user keeps
+
+    Returns:
+        dict: The comparison: "id", "prompt" and one answer per engine with
+            "mode", "content", "timings" and "model"
+    """
+    comparison_id = uuid.uuid4().hex[:8]
+    script_ctx = get_script_run_ctx()
+    status = st.empty()
+    columns = st.columns(len(engines))
+
+    answers, threads, footers = [], [], []
+    for engine, column in zip(engines, columns):
+        kwargs = engine_kwargs.get(engine.name, {})
+        answer = {"mode": engine.name, "content": ""}
+        if "model" in kwargs:
+            answer["model"] = kwargs["model"]
+
+        column.markdown(f"**{engine.icon} {engine.name}**")
+        body = column.container()
+        footers.append(column.empty())
+
+        # Each thread gets its own copy of the turn's context (trace, generation)
+        thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(
+                _run_engine,
+                engine,
+                client,
+                prompt,
+                history_input,
+                kwargs,
+                body,
+                answer,
+            ),
+            name=f"compare-{engine.name}",
+            daemon=True,
+        )
+        add_script_run_ctx(thread, script_ctx)
+        answers.append(answer)
+        threads.append(thread)
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    # Polling keeps the script thread responsive to Stop and reruns
+    while any(thread.is_alive() for thread in threads):
+        finished = sum(not thread.is_alive() for thread in threads)
+        status.caption(
+            f"⏱️ {time.perf_counter() - started:.1f}s · "
+            f"{finished}/{len(threads)} modes finished"
+        )
+        time.sleep(COMPARE_POLL_SECONDS)
+    status.empty()
+    metrics.observe("compare_seconds", time.perf_counter() - started)
+
+    for index, (answer, footer) in enumerate(zip(answers, footers)):
+        record_turn_metrics(answer["mode"], answer["timings"])
+        with footer.container():
+            _answer_footer(comparison_id, answer, index, on_keep)
+    return {"id": comparison_id, "prompt": prompt, "answers": answers}
+
+
+def show_comparison(comparison: Dict[str, Any], on_keep: Callable[[int], None]) -> None:
+    """Show a finished comparison whose answer has not been chosen yet."""
+    st.chat_message("user").markdown(comparison["prompt"])
+    answers = comparison["answers"]
+    for index, (answer, column) in enumerate(zip(answers, st.columns(len(answers)))):
+        with column:
+            engine = get_engine(answer["mode"])
+            st.markdown(f"**{engine.icon} {engine.name}**")
+            st.markdown(
+                parse_thinking_content(answer["content"]), unsafe_allow_html=True
+            )
+            _answer_footer(comparison["id"], answer, index, on_keep)
@@ -0,0 +1,102 @@
+import time
+from typing import Callable
+
+import streamlit as st
+
+from src.services.job_runner import CANCELLED, FAILED, Job, job_runner
+from src.ui_components.chat_interface import parse_thinking_content
+from src.utils.stream_renderer import StreamRenderer
+from src.utils.timing import get_turn_timer
+
+# How often the page polls a background job (seconds)
+JOB_POLL_SECONDS = 0.25
+
+# How often a job shown after a reload is refreshed (seconds)
+JOB_REFRESH_SECONDS = 2
+
+
+def job_status_text(job: Job) -> str:
+    """One-line progress summary of a background job."""
+    progress = job.progress
+    parts = [f"🔍🧠🌐 {job.mode} is running in the background"]
+    if progress.get("visited_urls"):
+        parts.append(f"{len(progress['visited_urls'])} URLs visited")
+    if progress.get("read_urls"):
+        parts.append(f"{len(progress['read_urls'])} read")
+    return " · ".join(parts)
+
+
+def job_result_text(job: Job) -> str:
+    """The text to store for a finished job."""
+    return job.result_text()
+
+
+def stream_job(job: Job) -> str:
+    """
+    Stream a running job's text into the current container until it finishes.
+
+    Leaving the page does not stop the job; its result is picked up on the next run.
+
+    Args:
+        job: The job to attach to
+
+    Returns:
+        str: The final text of the job
+    """
+    status = st.empty()
+    renderer = StreamRenderer(st.empty(), unsafe_allow_html=True)
+    timer = get_turn_timer()
+    shown = 0
+
+    while True:
+        finished = job.finished
+        text = job.text
+        if len(text) > shown:
+            timer.on_token(text[shown:])
+            renderer.write(text[shown:])
+            shown = len(text)
+        if finished:
+            break
+        status.caption(job_status_text(job))
+        time.sleep(JOB_POLL_SECONDS)
+
+    status.empty()
+    renderer.close()
+    if job.status == FAILED:
+        st.error(job.error)
+    return job_result_text(job)
+
+
+def show_running_job(job: Job, on_stop: Callable[[], None]) -> None:
+    """
+    Show a job that is still running after a reload, refreshing its progress.
+
+    The rest of the page stays interactive; when the job finishes the whole page
+    reruns so the answer is added to the chat.
+    """
+
+    @st.fragment(run_every=JOB_REFRESH_SECONDS)
+    def _job_fragment():
+        current = job_runner.get(job.id)
+        if current is None or current.finished:
+            st.rerun(scope="app")
+            return
+        with st.chat_message("assistant"):
+            st.caption(job_status_text(current))
+            if current.text:
+                st.markdown(
+                    parse_thinking_content(current.text) + "▌", unsafe_allow_html=True
+                )
+            st.button("⏹️ Stop", key=f"stop_job_{job.id}", on_click=on_stop)
+
+    _job_fragment()
+
+
+def show_job_outcome(job: Job) -> None:
+    """Toast how a job that finished while the user was away ended."""
+    if job.status == CANCELLED:
+        st.toast("⏹️ The background research was stopped; the partial answer was kept.")
+    elif job.status == FAILED:
+        st.toast(f"⚠️ The background research failed: {job.error}")
+    else:
+        st.toast(f"✅ {job.mode} finished in the background.")
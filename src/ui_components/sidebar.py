@@ -1,9 +1,12 @@
 import streamlit as st
 
+from src.services.model_router import AUTO_MODEL, MODELS
+from src.utils.chat_metadata import chat_title, get_chat_metadata
 from src.utils.history_manager import (
     clear_session_history,
 )
 from src.utils.logger import Logger
+from src.utils.token_counter import DEFAULT_CONTEXT_TOKENS
 
 logger = Logger("sidebar")
 
@@ -39,7 +42,8 @@ def render_sidebar(
 
         # Display existing chats
         for i, chat in enumerate(st.session_state["history_chats"]):
-            chat_name = chat.split("_")[0]
+            chat_name = chat_title(chat)
+            metadata = get_chat_metadata(chat)
 
             # Create a container for each chat entry with buttons
             with st.container():
@@ -50,6 +54,7 @@ def render_sidebar(
                     if st.button(
                         f"{chat_name}",
                         key=f"history_btn_{i}",
+                        help=metadata["summary"] if metadata else None,
                         use_container_width=True,
                         type=(
                             "secondary"
@@ -115,14 +120,10 @@ def render_sidebar(
         st.selectbox(
             "Select Model:",
             index=0,
-            options=[
-                "gemini-1.5-flash",
-                "gemini-1.5-pro",
-                "gemini-2.0-flash",
-                "gemini-2.0-pro-exp-02-05",
-                "gemini-2.0-flash-thinking-exp-01-21",
-            ],
+            options=[AUTO_MODEL, *MODELS],
             key="select_model",
+            help="Auto sends short, simple prompts to a small fast model and "
+            "everything else to the large model.",
         )
 
         # Only show advanced model settings in an expander to save space
@@ -137,17 +138,30 @@ def render_sidebar(
                 st.session_state["presence_penalty"] = 0.7
             if "frequency_penalty" not in st.session_state:
                 st.session_state["frequency_penalty"] = 0.7
-            if "context_level" not in st.session_state:
-                st.session_state["context_level"] = 3
+            if "context_tokens" not in st.session_state:
+                st.session_state["context_tokens"] = DEFAULT_CONTEXT_TOKENS
 
             st.slider(
-                "Context Level",
-                0,
-                10,
-                st.session_state["context_level"],
-                1,
-                key="context_level",
-                help="Higher values include more chat history but may slow down responses.",
+                "Context Budget (tokens)",
+                1000,
+                32000,
+                st.session_state["context_tokens"],
+                500,
+                key="context_tokens",
+                help="Maximum tokens of chat history sent with each message. Higher values include more history but may slow down responses.",
+            )
+
+            st.checkbox(
+                "Recall from other chats",
+                key="memory_all_chats",
+                help="Also search your other chats for earlier turns relevant to the new message.",
+            )
+
+            st.checkbox(
+                "Suggest follow-up questions",
+                key="speculative_followups",
+                help="Offer likely next questions after each answer and prepare their "
+                "answers in the background, so clicking one answers instantly.",
             )
 
             st.slider(
@@ -0,0 +1,137 @@
+"""Cancellable generations: track upstream streams of a turn and close them on cancel."""
+
+import contextvars
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+
+logger = Logger("cancellation")
+
+_current_generation: contextvars.ContextVar[Optional["Generation"]] = (
+    contextvars.ContextVar("generation", default=None)
+)
+
+_lock = threading.Lock()
+_active: Dict[str, "Generation"] = {}
+
+
+class Generation:
+    """
+    One assistant response being generated for a session.
+
+    Upstream streams registered with ``cancellable()`` are closed when the
+    generation ends, so an interrupted run (Stop button, new prompt, navigation)
+    stops consuming tokens immediately. The renderer of the response is kept so
+    its partial text can be saved.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.cancelled = False
+        self.interrupted = False
+        self.reason: Optional[str] = None
+        self.renderer: Optional[Any] = None
+        self._upstreams: List[Any] = []
+        self._lock = threading.Lock()
+        self._token = None
+
+    def register(self, upstream: Any) -> None:
+        """Track an object with a ``close()`` method, such as an OpenAI or httpx stream."""
+        if not hasattr(upstream, "close"):
+            return
+        with self._lock:
+            self._upstreams.append(upstream)
+        if self.cancelled:
+            self._close_upstreams()
+
+    def partial_text(self) -> str:
+        """The text rendered so far."""
+        return self.renderer.text if self.renderer is not None else ""
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Mark the generation as cancelled and close its upstream streams."""
+        if not self.cancelled:
+            self.cancelled = True
+            self.reason = reason
+            logger.info(
+                f"Generation cancelled ({reason})", extra={"session": self.session_id}
+            )
+        self._close_upstreams()
+
+    def _close_upstreams(self) -> None:
+        with self._lock:
+            upstreams, self._upstreams = self._upstreams, []
+        for upstream in upstreams:
+            try:
+                upstream.close()
+            except Exception as e:
+                logger.debug(f"Error closing upstream stream: {str(e)}")
+
+    def __enter__(self) -> "Generation":
+        self._token = _current_generation.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Streamlit stops a run for a rerun or navigation with exceptions that are
+        # not subclasses of Exception; treat those as the user abandoning the turn
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            self.interrupted = True
+            self.cancel("interrupted")
+        else:
+            self._close_upstreams()
+        _current_generation.reset(self._token)
+        finish_generation(self)
+
+
+def start_generation(session_id: str) -> Generation:
+    """
+    Start a generation for a session, cancelling one it supersedes.
+
+    Args:
+        session_id: The Streamlit session generating the response
+
+    Returns:
+        Generation: Use it as a context manager around the engine call
+    """
+    generation = Generation(session_id)
+    with _lock:
+        previous = _active.get(session_id)
+        _active[session_id] = generation
+    if previous is not None:
+        previous.cancel("superseded")
+        metrics.increment("generations_cancelled", reason="superseded")
+    return generation
+
+
+def finish_generation(generation: Generation) -> None:
+    """Forget a generation that has ended."""
+    with _lock:
+        if _active.get(generation.session_id) is generation:
+            del _active[generation.session_id]
+    if generation.interrupted:
+        metrics.increment("generations_cancelled", reason=generation.reason)
+
+
+def cancel_session_generation(session_id: str, reason: str = "stopped") -> bool:
+    """Cancel the active generation of a session, if any."""
+    with _lock:
+        generation = _active.get(session_id)
+    if generation is None:
+        return False
+    generation.cancel(reason)
+    return True
+
+
+def current_generation() -> Optional[Generation]:
+    """Return the generation of the current turn, or None outside of one."""
+    return _current_generation.get()
+
+
+def cancellable(upstream: Any) -> Any:
+    """Register an upstream stream with the current generation and return it."""
+    generation = _current_generation.get()
+    if generation is not None:
+        generation.register(upstream)
+    return upstream
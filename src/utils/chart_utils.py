@@ -0,0 +1,161 @@
+"""Downsampling and pagination helpers that keep dashboard payloads bounded."""
+
+import math
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Maximum number of points sent to a single chart
+DEFAULT_MAX_POINTS = 500
+
+# Default number of rows per dataframe page
+DEFAULT_PAGE_SIZE = 25
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Return the positions selected by Largest-Triangle-Three-Buckets."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket i covers [edges[i], edges[i + 1]); first and last points are fixed
+    every = (n - 2) / (threshold - 2)
+    edges = np.floor(np.arange(threshold - 1) * every).astype(int) + 1
+    counts = np.diff(edges)
+
+    # Average point of every bucket, computed once for all buckets
+    avg_x = np.add.reduceat(x[: edges[-1]], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[: edges[-1]], edges[:-1]) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Twice the triangle area between the last pick, each candidate and the next average
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y[i] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def _minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Return the positions of the minimum and maximum of every bucket."""
+    n = len(y)
+    if n_buckets < 1 or n <= 2 * n_buckets:
+        return np.arange(n)
+
+    bucket_size = math.ceil(n / n_buckets)
+    rows = math.ceil(n / bucket_size)
+
+    # Pad with NaN so every bucket has the same width and can be reduced at once
+    padded = np.full(rows * bucket_size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(rows, bucket_size)
+
+    offsets = np.arange(rows) * bucket_size
+    min_idx = offsets + np.nanargmin(grid, axis=1)
+    max_idx = offsets + np.nanargmax(grid, axis=1)
+
+    return np.unique(np.concatenate([min_idx, max_idx]))
+
+
+def lttb_downsample(x, y, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    Args:
+        x: Monotonic x values (numbers or timestamps as integers)
+        y: Values for each x
+        threshold: Number of points to keep, including the first and last one
+
+    Returns:
+        tuple: (x, y) arrays with at most ``threshold`` points
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    selected = _lttb_indices(x, y, threshold)
+    return x[selected], y[selected]
+
+
+def minmax_downsample(x, y, n_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsample a series by keeping the minimum and maximum of each bucket.
+
+    This preserves spikes better than LTTB, which matters for bar charts of counts.
+
+    Args:
+        x: Monotonic x values
+        y: Values for each x
+        n_buckets: Number of buckets; at most ``2 * n_buckets`` points are kept
+
+    Returns:
+        tuple: (x, y) arrays in their original order
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    selected = _minmax_indices(y, n_buckets)
+    return x[selected], y[selected]
+
+
+def downsample_series(
+    series: pd.Series, max_points: int = DEFAULT_MAX_POINTS, method: str = "lttb"
+) -> pd.Series:
+    """
+    Downsample a pandas series so that at most ``max_points`` points are charted.
+
+    Args:
+        series: Series indexed by numbers or datetimes
+        max_points: Maximum number of points to return
+        method: "lttb" for line charts or "minmax" for spiky count data
+
+    Returns:
+        pd.Series: The downsampled series with the same kind of index
+    """
+    if len(series) <= max_points:
+        return series
+
+    series = series.dropna()
+    y = series.to_numpy(dtype=float)
+
+    if method == "minmax":
+        selected = _minmax_indices(y, max_points // 2)
+    else:
+        # Timestamps are only used for relative distances, so any integer unit works
+        x = (
+            series.index.asi8
+            if isinstance(series.index, pd.DatetimeIndex)
+            else series.index.to_numpy()
+        ).astype(float)
+        selected = _lttb_indices(x, y, max_points)
+
+    return series.iloc[selected]
+
+
+def paginate_dataframe(
+    df: pd.DataFrame, page: int, page_size: int = DEFAULT_PAGE_SIZE
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Slice a dataframe to a single page on the server side.
+
+    Args:
+        df: The full dataframe
+        page: 1-based page number, clamped to the valid range
+        page_size: Number of rows per page
+
+    Returns:
+        tuple: (page_df, total_pages)
+    """
+    total_pages = max(1, math.ceil(len(df) / page_size))
+    page = min(max(1, page), total_pages)
+    start = (page - 1) * page_size
+    return df.iloc[start : start + page_size], total_pages
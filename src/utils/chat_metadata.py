@@ -0,0 +1,296 @@
+"""Generated chat titles and summaries, produced by a background batcher off the turn path."""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.services.scheduler import BACKGROUND, scheduled_as
+from src.utils.helper import chat_key
+from src.utils.history_manager import LEGACY_HISTORY_PATH
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+from src.utils.think_parser import answer_text
+
+logger = Logger("chat_metadata")
+
+METADATA_ENABLED = os.environ.get("CHAT_METADATA_ENABLED", "1") == "1"
+
+# Model used for titles and summaries; a small model keeps them cheap
+METADATA_MODEL = os.environ.get("CHAT_METADATA_MODEL", "qwen2.5-7b-instruct")
+
+# Most chats titled in one request, and how long the batcher waits to fill a batch
+METADATA_BATCH_SIZE = int(os.environ.get("CHAT_METADATA_BATCH_SIZE", "8"))
+METADATA_BATCH_WAIT = float(os.environ.get("CHAT_METADATA_BATCH_WAIT", "5"))
+
+# A chat's summary is refreshed after this many new messages
+METADATA_REFRESH_MESSAGES = int(os.environ.get("CHAT_METADATA_REFRESH_MESSAGES", "6"))
+
+# Messages and characters per message of a chat shown to the model
+METADATA_MESSAGES = 6
+METADATA_MESSAGE_CHARS = 600
+
+METADATA_PATH = os.path.join(LEGACY_HISTORY_PATH, "metadata.json")
+
+# Name prefix of chats that have not been renamed by the user
+DEFAULT_CHAT_NAME = "New Chat"
+
+METADATA_PROMPT = """You write titles and summaries for a list of conversations between a user and
+an assistant. For each conversation write a title of at most 6 words and a one-sentence summary,
+both in the language of the conversation. Reply with a JSON array containing one object with the
+keys "id", "title" and "summary" per conversation, and nothing else."""
+
+
+def _transcript(messages: List[Dict[str, Any]]) -> str:
+    """The first message and the latest ones, shortened."""
+    chat_messages = [m for m in messages if m["role"] in ("user", "assistant")]
+    shown = chat_messages[:1] + chat_messages[1:][-(METADATA_MESSAGES - 1) :]
+    return "\n".join(
+        f"{m['role']}: {answer_text(m['content'])[:METADATA_MESSAGE_CHARS]}"
+        for m in shown
+    )
+
+
+def parse_metadata_reply(text: str) -> List[Dict[str, str]]:
+    """Extract the objects of a JSON array reply, tolerating text around it."""
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        return []
+    try:
+        items = json.loads(text[start : end + 1])
+    except ValueError:
+        return []
+    return [item for item in items if isinstance(item, dict) and "id" in item]
+
+
+class MetadataBatcher:
+    """
+    Collects chats that need a title or summary and generates them in batches.
+
+    ``submit`` only records the chat, so it adds nothing to a turn; a single
+    daemon thread combines the pending chats into one request per batch and
+    writes the results to the metadata store. A batch only holds chats of one
+    user, so a reply that mixes up conversation ids can never give a chat the
+    title of another user's conversation.
+    """
+
+    def __init__(
+        self,
+        path: str = METADATA_PATH,
+        batch_size: int = METADATA_BATCH_SIZE,
+        batch_wait: float = METADATA_BATCH_WAIT,
+        model: str = METADATA_MODEL,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.model = model
+        self._condition = threading.Condition()
+        self._pending: Dict[str, Tuple[Any, str, int, str]] = {}
+        self._metadata: Optional[Dict[str, Dict[str, Any]]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """The metadata store, read from disk on first use (call with the lock held)."""
+        if self._metadata is None:
+            self._metadata = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self._metadata = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Error reading chat metadata: {str(e)}")
+        return self._metadata
+
+    def _save(self) -> None:
+        """Write the store atomically (call with the lock held)."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._load(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Error saving chat metadata: {str(e)}")
+
+    def get(self, chat_name: str) -> Optional[Dict[str, Any]]:
+        """Return the chat's "title", "summary" and "messages" (count covered)."""
+        with self._condition:
+            metadata = self._load().get(chat_key(chat_name))
+            return dict(metadata) if metadata else None
+
+    def forget(self, chat_name: str) -> None:
+        """Drop the metadata of a deleted chat."""
+        key = chat_key(chat_name)
+        with self._condition:
+            self._pending.pop(key, None)
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+    def submit(
+        self, client, user: str, chat_name: str, messages: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Queue a chat for a new title and summary if it changed enough since the last.
+
+        Args:
+            client: OpenAI-compatible client
+            user: The user (browser session) the chat belongs to
+            chat_name: The chat name
+            messages: The chat history
+
+        Returns:
+            bool: Whether the chat was queued
+        """
+        count = sum(1 for m in messages if m["role"] in ("user", "assistant"))
+        key = chat_key(chat_name)
+        with self._condition:
+            current = self._load().get(key)
+            if current and count - current["messages"] < METADATA_REFRESH_MESSAGES:
+                return False
+            # The worker never reads session state; a newer snapshot replaces an older one
+            self._pending[key] = (client, user, count, _transcript(messages))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="chat-metadata", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        return True
+
+    def _pop_batch(self) -> List[Tuple[str, Any, str, int, str]]:
+        """Take up to batch_size chats of the longest-waiting user (call with the lock held)."""
+        if not self._pending:
+            return []
+        user = next(iter(self._pending.values()))[1]
+        keys = [key for key, item in self._pending.items() if item[1] == user]
+        return [(key, *self._pending.pop(key)) for key in keys[: self.batch_size]]
+
+    def _take_batch(self) -> List[Tuple[str, Any, str, int, str]]:
+        """Wait for pending chats, then up to batch_wait for the batch to fill."""
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            deadline = time.monotonic() + self.batch_wait
+            while len(self._pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self._pop_batch()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.run_batch(self._take_batch())
+            except Exception as e:
+                logger.error(f"Chat metadata batch failed: {str(e)}", exc_info=True)
+
+    def flush(self) -> int:
+        """Generate metadata for every pending chat now; returns how many were updated."""
+        updated = 0
+        while True:
+            with self._condition:
+                batch = self._pop_batch()
+            if not batch:
+                return updated
+            updated += self.run_batch(batch)
+
+    def run_batch(self, batch: List[Tuple[str, Any, str, int, str]]) -> int:
+        """
+        Title and summarize a batch of one user's chats with one request.
+
+        Args:
+            batch: (chat key, client, user, message count, transcript) per chat
+
+        Returns:
+            int: Number of chats whose metadata was updated
+        """
+        if not batch:
+            return 0
+        ids = {str(i): item for i, item in enumerate(batch, 1)}
+        conversations = "\n\n".join(
+            f"### Conversation {i}\n{transcript}"
+            for i, (_, _, _, _, transcript) in ids.items()
+        )
+        client, user = batch[-1][1], batch[-1][2]
+
+        started = time.perf_counter()
+        try:
+            with scheduled_as(user, BACKGROUND):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": METADATA_PROMPT},
+                        {"role": "user", "content": conversations},
+                    ],
+                    temperature=0.2,
+                )
+            items = parse_metadata_reply(response.choices[0].message.content or "")
+        except Exception as e:
+            logger.error(f"Failed to generate chat titles: {str(e)}")
+            metrics.increment("chat_metadata_batches", result="error")
+            return 0
+
+        updated = 0
+        with self._condition:
+            store = self._load()
+            for item in items:
+                if str(item["id"]) not in ids:
+                    continue
+                key, _, _, count, _ = ids[str(item["id"])]
+                title = str(item.get("title", "")).strip().strip('"')[:60]
+                if not title:
+                    continue
+                store[key] = {
+                    "title": title,
+                    "summary": str(item.get("summary", "")).strip(),
+                    "messages": count,
+                    "updated_at": time.time(),
+                }
+                updated += 1
+            if updated:
+                self._save()
+
+        metrics.increment("chat_metadata_batches", result="ok")
+        metrics.observe("chat_metadata_seconds", time.perf_counter() - started)
+        logger.info(f"Generated titles for {updated} of {len(batch)} chats")
+        return updated
+
+
+# Shared batcher for the whole worker process
+metadata_batcher = MetadataBatcher()
+
+
+def schedule_chat_metadata(
+    client, user: str, chat_name: str, messages: List[Dict[str, Any]]
+) -> bool:
+    """Queue a chat for a generated title and summary (never blocks the turn)."""
+    if not METADATA_ENABLED:
+        return False
+    return metadata_batcher.submit(client, user, chat_name, messages)
+
+
+def get_chat_metadata(chat_name: str) -> Optional[Dict[str, Any]]:
+    """Return the generated title and summary of a chat, if any."""
+    return metadata_batcher.get(chat_name)
+
+
+def forget_chat_metadata(chat_name: str) -> None:
+    """Drop the metadata of a deleted chat."""
+    metadata_batcher.forget(chat_name)
+
+
+def chat_title(chat_name: str) -> str:
+    """
+    The title to display for a chat.
+
+    A name the user gave the chat wins; chats still carrying the default name
+    show their generated title once the batcher has produced one.
+    """
+    name = chat_name.rsplit("_", 1)[0]
+    if name != DEFAULT_CHAT_NAME:
+        return name
+    metadata = get_chat_metadata(chat_name)
+    return metadata["title"] if metadata else name
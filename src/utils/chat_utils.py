@@ -1,53 +1,117 @@
 import hashlib
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import streamlit as st
 
 from src.utils.helper import set_context_all
-from src.utils.history_manager import get_history_input
+from src.utils.history_manager import get_history_input, load_legacy_chat
 from src.utils.logger import Logger
+from src.utils.memory_index import (
+    MEMORY_BUDGET_SHARE,
+    MEMORY_ENABLED,
+    is_indexed,
+    memory_message,
+    retrieve_memories,
+    update_chat_memory,
+)
+from src.utils.summarizer import (
+    get_summary,
+    schedule_summary_update,
+    summary_message,
+)
+from src.utils.token_counter import (
+    DEFAULT_CONTEXT_TOKENS,
+    MESSAGE_OVERHEAD,
+    count_tokens,
+)
 
 logger = Logger("chat_utils")
 
 
 def prepare_model_input(
-    current_chat: str, context_level: int = None
+    current_chat: str, max_tokens: int = None, client=None
 ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
     """
     Prepare the chat history and parameters for the model.
 
+    System and context prompts and the rolling summary of older turns are always
+    included. Older turns the prompt refers back to are recalled from a BM25 index,
+    and the remaining token budget is filled with the newest chat messages.
+
     Args:
         current_chat: The name of the current chat
-        context_level: The context level to use (default: None, will use the value from session state)
+        max_tokens: Token budget for the prompt (default: None, will use the value from session state)
+        client: OpenAI client used to summarize turns that no longer fit (default: None, no summary update)
 
     Returns:
         tuple: (history, parameters)
             - history: List of messages to send to the model
             - parameters: Dictionary of model parameters
     """
-    if context_level is None:
-        context_level = st.session_state.get("context_level" + current_chat, 3)
+    if max_tokens is None:
+        max_tokens = st.session_state.get("context_tokens", DEFAULT_CONTEXT_TOKENS)
 
-    # Format history for model input
-    history = get_history_input(
-        st.session_state["history" + current_chat], context_level
-    )
+    # Pinned messages: context prompts and any pending user input
+    context_select = st.session_state.get("context_select" + current_chat, "Mặc định")
+    context_input = st.session_state.get("context_input" + current_chat, "")
 
+    pinned_system = []
+    for ctx in [context_input, set_context_all.get(context_select, "")]:
+        if ctx != "":
+            pinned_system = [{"role": "system", "content": ctx}] + pinned_system
+
+    pinned_user = []
     if "pre_user_input_content" in st.session_state:
-        history.append(
+        pinned_user.append(
             {
                 "role": "user",
                 "content": st.session_state["pre_user_input_content"],
             }
         )
 
-    # Add context if available
-    context_select = st.session_state.get("context_select" + current_chat, "Mặc định")
-    context_input = st.session_state.get("context_input" + current_chat, "")
+    # Rolling summary of the turns that no longer fit the budget
+    chat_messages = [
+        msg
+        for msg in st.session_state["history" + current_chat]
+        if msg["role"] != "system"
+    ]
+    summary = summary_message(current_chat, len(chat_messages))
+    if summary:
+        pinned_system.append(summary)
 
-    for ctx in [context_input, set_context_all.get(context_select, "")]:
-        if ctx != "":
-            history = [{"role": "system", "content": ctx}] + history
+    pinned_tokens = sum(
+        count_tokens(msg["content"]) + MESSAGE_OVERHEAD
+        for msg in pinned_system + pinned_user
+    )
+
+    # Format history for model input within the remaining budget
+    available = max(0, max_tokens - pinned_tokens)
+    history = get_history_input(chat_messages, available)
+
+    # Recall older turns the prompt refers back to, then re-pack the window
+    memory = _recall_memory(
+        current_chat,
+        chat_messages,
+        len(chat_messages) - len(history),
+        int(available * MEMORY_BUDGET_SHARE),
+    )
+    if memory:
+        pinned_system.append(memory)
+        memory_tokens = count_tokens(memory["content"]) + MESSAGE_OVERHEAD
+        pinned_tokens += memory_tokens
+        history = get_history_input(chat_messages, max(0, available - memory_tokens))
+
+    # Fold aged-out turns into the summary in the background for later requests
+    aged_out = chat_messages[: len(chat_messages) - len(history)]
+    if client is not None and aged_out:
+        schedule_summary_update(client, current_chat, aged_out)
+
+    history = pinned_system + history + pinned_user
+
+    logger.debug(
+        f"Assembled {len(history)} messages for {current_chat}",
+        extra={"budget": max_tokens, "pinned_tokens": pinned_tokens},
+    )
 
     # Model parameters
     parameters = {
@@ -64,6 +128,57 @@ def prepare_model_input(
     return history, parameters
 
 
+def _recall_memory(
+    current_chat: str,
+    chat_messages: List[Dict[str, Any]],
+    window_start: int,
+    max_tokens: int,
+) -> Optional[Dict[str, str]]:
+    """
+    Index the chat's new turns and return relevant older turns as a system message.
+
+    Args:
+        current_chat: The name of the current chat
+        chat_messages: The chat's user/assistant messages, the prompt last
+        window_start: Position of the first message that is sent verbatim
+        max_tokens: Token budget for the recalled turns
+
+    Returns:
+        dict or None: A system message with the recalled turns
+    """
+    if not MEMORY_ENABLED or not chat_messages:
+        return None
+
+    update_chat_memory(current_chat, chat_messages)
+
+    # Other chats of this session are indexed once, from memory or from disk
+    other_chats = []
+    if st.session_state.get("memory_all_chats"):
+        for name in st.session_state.get("history_chats", []):
+            if name == current_chat:
+                continue
+            if not is_indexed(name):
+                history = st.session_state.get("history" + name)
+                if history is None:
+                    history = load_legacy_chat(name)["history"]
+                update_chat_memory(
+                    name, [msg for msg in history if msg["role"] != "system"]
+                )
+            other_chats.append(name)
+
+    if window_start == 0 and not other_chats:
+        return None
+
+    memories = retrieve_memories(
+        chat_messages[-1]["content"],
+        current_chat,
+        window_start,
+        max_tokens,
+        other_chats,
+    )
+    return memory_message(memories) if memories else None
+
+
 def save_chat_parameters(current_chat: str, arg: str) -> None:
     """
     Update the session state when a parameter is changed.
@@ -112,12 +227,18 @@ def save_current_chat_data(current_chat: str, new_chat_name: str = None) -> None
             "context_select" + current_chat, "Mặc định"
         ),
         "context_input": st.session_state.get("context_input" + current_chat, ""),
-        "context_level": st.session_state.get("context_level" + current_chat, 3),
+        "context_tokens": st.session_state.get(
+            "context_tokens", DEFAULT_CONTEXT_TOKENS
+        ),
     }
 
     # Save to legacy format
     save_legacy_chat(
-        target_chat, st.session_state["history" + current_chat], parameters, contexts
+        target_chat,
+        st.session_state["history" + current_chat],
+        parameters,
+        contexts,
+        get_summary(current_chat),
     )
 
 
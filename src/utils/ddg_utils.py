@@ -1,9 +1,15 @@
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import httpx
 import streamlit as st
 
+from src.services.chat_client import get_http_client
+from src.services.resilience import CircuitOpenError, send_with_retries
+from src.services.scheduler import SchedulerOverloaded
+from src.utils.deadline import Deadline, DeadlineExceeded, current_deadline
+from src.utils.tracing import traced
+
 
 async def search_duckduckgo_async(
     query: str, max_results: int = 5
@@ -69,13 +75,17 @@ async def search_duckduckgo_async(
         return []
 
 
-def duckduckgo_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+@traced()
+def duckduckgo_search(
+    query: str, max_results: int = 5, deadline: Optional[Deadline] = None
+) -> List[Dict[str, Any]]:
     """
     Synchronous wrapper for DuckDuckGo search
 
     Args:
         query: The search query string
         max_results: Maximum number of results to return
+        deadline: Turn deadline capping the request (default: the current turn's)
 
     Returns:
         List of search results (each a dict with title, url, and snippet)
@@ -90,46 +100,59 @@ def duckduckgo_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         "skip_disambig": 1,
     }
 
+    deadline = deadline or current_deadline()
     try:
-        # Using httpx for the request
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(url, params=params)
-            response.raise_for_status()
-
-            data = response.json()
-            results = []
-
-            # Extract main results
-            if data.get("AbstractText"):
-                results.append(
-                    {
-                        "title": data.get("Heading", ""),
-                        "url": data.get("AbstractURL", ""),
-                        "snippet": data.get("AbstractText", ""),
-                    }
-                )
-
-            # Extract related topics results
-            for topic in data.get("RelatedTopics", [])[: max_results - len(results)]:
-                if "Topics" in topic:
-                    continue  # Skip nested topics
-
-                results.append(
-                    {
-                        "title": topic.get("Text", "").split(" - ")[0]
-                        if " - " in topic.get("Text", "")
-                        else topic.get("Text", ""),
-                        "url": topic.get("FirstURL", ""),
-                        "snippet": topic.get("Text", ""),
-                    }
-                )
-
-                if len(results) >= max_results:
-                    break
-
-            return results
-
+        # Shared keep-alive client; failures are retried within the turn's deadline
+        client = get_http_client("duckduckgo")
+        response = send_with_retries(
+            "duckduckgo",
+            lambda timeout: client.get(url, params=params, timeout=timeout),
+            deadline,
+        )
+
+        data = response.json()
+        results = []
+
+        # Extract main results
+        if data.get("AbstractText"):
+            results.append(
+                {
+                    "title": data.get("Heading", ""),
+                    "url": data.get("AbstractURL", ""),
+                    "snippet": data.get("AbstractText", ""),
+                }
+            )
+
+        # Extract related topics results
+        for topic in data.get("RelatedTopics", [])[: max_results - len(results)]:
+            if "Topics" in topic:
+                continue  # Skip nested topics
+
+            results.append(
+                {
+                    "title": topic.get("Text", "").split(" - ")[0]
+                    if " - " in topic.get("Text", "")
+                    else topic.get("Text", ""),
+                    "url": topic.get("FirstURL", ""),
+                    "snippet": topic.get("Text", ""),
+                }
+            )
+
+            if len(results) >= max_results:
+                break
+
+        return results
+
+    except DeadlineExceeded:
+        deadline.degrade("search", "skipped")
+        return []
+    except (SchedulerOverloaded, CircuitOpenError) as e:
+        st.warning(str(e))
+        return []
     except (httpx.HTTPError, json.JSONDecodeError, KeyError) as e:
+        if isinstance(e, httpx.TimeoutException) and deadline.expired:
+            deadline.degrade("search", "timed_out")
+            return []
         st.error(f"Error performing search: {str(e)}")
         return []
 
@@ -0,0 +1,140 @@
+"""Per-turn deadlines: every stage gets the remaining budget and degrades when it runs short."""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+from src.utils.tracing import current_span
+
+logger = Logger("deadline")
+
+# Time budget of an interactive turn, and of long modes such as Deep-Research
+# (seconds; 0 disables the deadline)
+TURN_DEADLINE = float(os.environ.get("TURN_DEADLINE", "120"))
+LONG_TURN_DEADLINE = float(os.environ.get("LONG_TURN_DEADLINE", "900"))
+
+# Shortest timeout handed to a stage; below this a stage is not worth starting
+MIN_STAGE_TIMEOUT = 1.0
+
+# Web-search modes fall back to the Default mode with less time than this left
+WEB_SEARCH_MIN_BUDGET = float(os.environ.get("WEB_SEARCH_MIN_BUDGET", "30"))
+
+_current_deadline: contextvars.ContextVar[Optional["Deadline"]] = (
+    contextvars.ContextVar("deadline", default=None)
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The turn's budget is spent before a stage could start."""
+
+
+class Deadline:
+    """
+    The time budget of one turn.
+
+    Stages ask for ``timeout(default)`` instead of using a fixed timeout, so the
+    whole chain finishes within the budget, and check ``allows(seconds)`` before
+    optional work. Degradations are counted in metrics and kept on the deadline.
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.degradations: List[Dict[str, str]] = []
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None for a turn without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining < MIN_STAGE_TIMEOUT
+
+    def allows(self, seconds: float) -> bool:
+        """Whether at least this much time is left."""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+    def timeout(self, default: Optional[float] = None) -> Optional[float]:
+        """
+        Timeout for a stage: its own default, capped by the remaining budget.
+
+        Args:
+            default: The stage's usual timeout (None for no limit)
+
+        Returns:
+            float or None: The timeout to use (None when neither limits it)
+
+        Raises:
+            DeadlineExceeded: Less than MIN_STAGE_TIMEOUT is left for the stage
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        if remaining < MIN_STAGE_TIMEOUT:
+            raise DeadlineExceeded(f"{remaining:.1f}s left in the turn")
+        return remaining if default is None else min(default, remaining)
+
+    def timeout_kwargs(self, default: Optional[float] = None) -> Dict[str, float]:
+        """``timeout=`` for an OpenAI call, or nothing to keep the client default."""
+        timeout = self.timeout(default)
+        return {} if timeout is None else {"timeout": timeout}
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """
+        A deadline that expires ``seconds`` earlier, keeping time for later stages.
+
+        Degradations recorded on it are shared with this deadline.
+        """
+        child = Deadline(None)
+        child.seconds = self.seconds
+        if self.expires_at is not None:
+            child.expires_at = self.expires_at - seconds
+        child.degradations = self.degradations
+        return child
+
+    def degrade(self, stage: str, action: str) -> None:
+        """Record that a stage did less than usual to stay within the budget."""
+        self.degradations.append({"stage": stage, "action": action})
+        metrics.increment("turn_degradations", stage=stage, action=action)
+        active = current_span()
+        if active is not None:
+            active.set_attribute(f"degraded.{stage}", action)
+        logger.info(
+            f"Degraded {stage}: {action}", extra={"remaining": self.remaining()}
+        )
+
+
+@contextmanager
+def start_deadline(seconds: Optional[float] = TURN_DEADLINE) -> Iterator[Deadline]:
+    """
+    Give the enclosed turn a deadline that stages find with ``current_deadline()``.
+
+    Args:
+        seconds: The turn's budget (None or 0 for no deadline)
+
+    Yields:
+        Deadline: The turn's deadline
+    """
+    deadline = Deadline(seconds)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+        if deadline.expires_at is not None:
+            met = deadline.remaining() > 0
+            metrics.increment("turn_deadlines", result="met" if met else "missed")
+
+
+def current_deadline() -> Deadline:
+    """Return the deadline of the current turn (an unlimited one outside a turn)."""
+    deadline = _current_deadline.get()
+    return deadline if deadline is not None else Deadline(None)
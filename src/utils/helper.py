@@ -52,3 +52,8 @@ def show_messages(chat_id: str, messages: List[Dict[str, str]]) -> None:
         if msg["role"] != "system":
             with st.container():
                 show_each_message(msg["content"], msg["role"], f"{chat_id}_{i}")
+
+
+def chat_key(chat_name: str) -> str:
+    """Key a chat by the UUID suffix of its name, which survives renames."""
+    return chat_name.rsplit("_", 1)[-1]
@@ -3,11 +3,14 @@ import os
 import re
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import streamlit as st
 
+from src.utils.helper import chat_key
 from src.utils.logger import Logger
+from src.utils.summarizer import get_summary
+from src.utils.token_counter import DEFAULT_CONTEXT_TOKENS, message_tokens
 
 logger = Logger("history_manager")
 
@@ -230,13 +233,18 @@ def save_legacy_chat(
     history: List[Dict[str, str]],
     parameters: Dict[str, float],
     context: Dict[str, Any],
+    summary: Optional[Dict[str, Any]] = None,
 ) -> None:
-    """Save chat data to a legacy format file."""
+    """Save chat data (and its rolling summary, if any) to a legacy format file."""
     file_path = get_legacy_file_path(chat_name)
 
+    data = {"history": history, "parameters": parameters, "context": context}
+    if summary:
+        data["summary"] = summary
+
     with open(file_path, "w", encoding="utf-8") as f:
         json.dump(
-            {"history": history, "parameters": parameters, "context": context},
+            data,
             f,
             ensure_ascii=False,
             indent=2,
@@ -267,11 +275,40 @@ def load_legacy_chat(chat_name: str) -> Dict[str, Any]:
         "context": {
             "context_select": "Mặc định",
             "context_input": "",
-            "context_level": 3,
+            "context_tokens": DEFAULT_CONTEXT_TOKENS,
         },
     }
 
 
+def append_legacy_chat_message(key: str, message: Dict[str, Any]) -> bool:
+    """
+    Append a message to a saved chat, found by its key (it may have been renamed).
+
+    Args:
+        key: The chat key (UUID suffix of the chat name)
+        message: The message to append
+
+    Returns:
+        bool: Whether the chat file was found and updated
+    """
+    if not os.path.isdir(LEGACY_HISTORY_PATH):
+        return False
+    for filename in os.listdir(LEGACY_HISTORY_PATH):
+        if not filename.endswith(".json") or chat_key(filename[:-5]) != key:
+            continue
+        chat_name = filename[:-5]
+        data = load_legacy_chat(chat_name)
+        save_legacy_chat(
+            chat_name,
+            data["history"] + [message],
+            data["parameters"],
+            data["context"],
+            data.get("summary"),
+        )
+        return True
+    return False
+
+
 def delete_legacy_chat(chat_name: str) -> None:
     """Delete a legacy chat file."""
     file_path = get_legacy_file_path(chat_name)
@@ -298,7 +335,7 @@ def create_new_chat() -> Tuple[str, str]:
         {
             "context_select": "Mặc định",
             "context_input": "",
-            "context_level": 3,
+            "context_tokens": DEFAULT_CONTEXT_TOKENS,
         },
     )
 
@@ -322,7 +359,11 @@ def rename_chat(old_name: str, new_name: str) -> str:
 
     # Save with the new name
     save_legacy_chat(
-        new_chat_name, data["history"], data["parameters"], data["context"]
+        new_chat_name,
+        data["history"],
+        data["parameters"],
+        data["context"],
+        data.get("summary"),
     )
 
     # Delete the old file
@@ -333,21 +374,36 @@ def rename_chat(old_name: str, new_name: str) -> str:
 
 
 def get_history_input(
-    history: List[Dict[str, str]], context_level: int
+    history: List[Dict[str, Any]], max_tokens: int = DEFAULT_CONTEXT_TOKENS
 ) -> List[Dict[str, str]]:
-    """Format chat history for API input, considering context level."""
+    """
+    Format chat history for API input, packing the newest messages into a token budget.
+
+    Args:
+        history: Stored chat messages (token counts are cached on them)
+        max_tokens: Token budget for the returned messages
+
+    Returns:
+        list: The most recent messages that fit, oldest first
+    """
     if not history:
         return []
 
-    # Filter out system messages
-    user_assistant_msgs = [msg for msg in history if msg["role"] != "system"]
+    # Walk back from the newest message; the newest one is always kept
+    selected = []
+    used = 0
+    for msg in reversed(history):
+        if msg["role"] == "system":
+            continue
+        tokens = message_tokens(msg)
+        if selected and used + tokens > max_tokens:
+            break
+        used += tokens
+        # Drop display-only fields such as timings and token counts
+        selected.append({"role": msg["role"], "content": msg["content"]})
 
-    # Apply context level
-    if context_level > 0 and len(user_assistant_msgs) > context_level * 2:
-        # Keep most recent context_level exchanges
-        return user_assistant_msgs[-context_level * 2 :]
-
-    return user_assistant_msgs
+    selected.reverse()
+    return selected
 
 
 def download_history(history: List[Dict[str, str]]) -> str:
@@ -396,10 +452,16 @@ def save_current_chat_data(current_chat: str, new_chat_name: str = None):
             "context_select" + current_chat, "Mặc định"
         ),
         "context_input": st.session_state.get("context_input" + current_chat, ""),
-        "context_level": st.session_state.get("context_level" + current_chat, 3),
+        "context_tokens": st.session_state.get(
+            "context_tokens", DEFAULT_CONTEXT_TOKENS
+        ),
     }
 
     # Save to legacy format
     save_legacy_chat(
-        target_chat, st.session_state["history" + current_chat], parameters, contexts
+        target_chat,
+        st.session_state["history" + current_chat],
+        parameters,
+        contexts,
+        get_summary(current_chat),
     )
@@ -1,17 +1,35 @@
+import atexit
 import functools
 import json
 import logging
 import os
+import queue
+import sys
+import threading
+import time
 import traceback
-from datetime import datetime
-from typing import Any
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
 
 from rich.console import Console
 from rich.logging import RichHandler
 
 console = Console()
 
-os.makedirs("logs", exist_ok=True)
+# Pipeline configuration, read once per process
+LOG_ENV = os.environ.get("LOG_ENV", "development").lower()
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_CONSOLE_LEVEL = os.environ.get(
+    "LOG_CONSOLE_LEVEL", "WARNING" if LOG_ENV == "production" else "INFO"
+).upper()
+LOG_FILE = os.environ.get("LOG_FILE", os.path.join("logs", "app.log"))
+os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", "0.5"))
+LOG_SAMPLE_PER_SECOND = float(os.environ.get("LOG_SAMPLE_PER_SECOND", "5"))
 
 
 class CustomJsonFormatter(logging.Formatter):
@@ -25,6 +43,10 @@ class CustomJsonFormatter(logging.Formatter):
             "message": record.getMessage(),
         }
 
+        # Correlate the line with the chat turn that emitted it
+        if getattr(record, "trace_id", None):
+            log_record["trace_id"] = record.trace_id
+
         # Add exception info if available
         if record.exc_info:
             log_record["exc_info"] = self.formatException(record.exc_info)
@@ -33,11 +55,165 @@ class CustomJsonFormatter(logging.Formatter):
         if hasattr(record, "extra") and record.extra:
             log_record.update(record.extra)
 
-        return json.dumps(log_record)
+        return json.dumps(log_record, ensure_ascii=False, default=str)
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamp each record with the trace ID of the active chat turn."""
+
+    def filter(self, record):
+        # Imported lazily because the tracing module itself logs through Logger
+        from src.utils.tracing import current_trace_id
+
+        record.trace_id = current_trace_id()
+        return True
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """Size-rotated file handler that writes a whole batch with one write and flush."""
+
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+
+        data = "".join(lines)
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0 and self.stream.tell() + len(data) >= self.maxBytes:
+            self.doRollover()
+        self.stream.write(data)
+        self.stream.flush()
+
+
+class LogPipeline:
+    """
+    Process-wide logging pipeline: producers enqueue, one background thread writes.
+
+    Records are formatted and written off the hot path, in batches, to a single
+    shared file handle. Console output uses Rich in development and a plain
+    stream handler in production.
+    """
+
+    def __init__(self):
+        self.queue: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue(
+            maxsize=LOG_QUEUE_SIZE
+        )
+        self.dropped = 0
+
+        self.file_handler = BatchingRotatingFileHandler(
+            LOG_FILE,
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        self.file_handler.setFormatter(CustomJsonFormatter())
+
+        if LOG_ENV == "production":
+            self.console_handler = logging.StreamHandler(sys.stderr)
+            self.console_handler.setFormatter(
+                logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+            )
+        else:
+            self.console_handler = RichHandler(
+                console=console,
+                rich_tracebacks=True,
+                show_time=True,
+                omit_repeated_times=False,
+                show_level=True,
+            )
+        self.console_handler.setLevel(LOG_CONSOLE_LEVEL)
+
+        self._thread = threading.Thread(
+            target=self._run, name="log-pipeline", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Hand a record to the writer without ever blocking the caller."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            batch = [record]
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+
+            # Drain whatever else arrives within the flush interval
+            while len(batch) < LOG_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is None:
+                    self._write(batch)
+                    return
+                batch.append(record)
+
+            self._write(batch)
+
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        self.file_handler.emit_batch(batch)
+        for record in batch:
+            if record.levelno >= self.console_handler.level:
+                self.console_handler.handle(record)
+
+    def stop(self) -> None:
+        """Flush pending records and stop the writer thread."""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+        self.file_handler.close()
+
+
+class PipelineHandler(logging.Handler):
+    """Producer-side handler: resolves the message and enqueues the record."""
+
+    def __init__(self, pipeline: LogPipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def emit(self, record):
+        try:
+            # Render the message now so arguments are not mutated before the writer runs
+            record.msg = record.getMessage()
+            record.args = None
+            self.pipeline.enqueue(record)
+        except Exception:
+            self.handleError(record)
+
+
+_pipeline: Optional[LogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_log_pipeline() -> LogPipeline:
+    """Return the shared pipeline, starting it on first use."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = LogPipeline()
+        return _pipeline
 
 
 class Logger:
     _instances = {}
+    _sample_lock = threading.Lock()
+    _sample_buckets: Dict[str, List[float]] = {}
 
     def __new__(cls, name: str = "default"):
         if name not in cls._instances:
@@ -47,48 +223,66 @@ class Logger:
 
     def _setup_logger(self, name: str):
         self.logger = logging.getLogger(f"erpbot-{name}")
-        self.logger.setLevel(logging.INFO)
+        self.logger.setLevel(LOG_LEVEL)
 
         # Remove existing handlers if any
         if self.logger.handlers:
             self.logger.handlers.clear()
 
-        # Custom JSON formatter for file logging
-        json_formatter = CustomJsonFormatter()
+        # Correlate records with the active trace
+        self.logger.addFilter(TraceIdFilter())
 
-        # Rich handler for console output
-        rich_handler = RichHandler(
-            console=console,
-            rich_tracebacks=True,
-            show_time=True,
-            omit_repeated_times=False,
-            show_level=True,
-        )
-        rich_handler.setLevel(logging.INFO)
-        self.logger.addHandler(rich_handler)
-
-        # File handler with JSON formatting
-        file_handler = logging.FileHandler(
-            f"logs/{datetime.now().strftime('%Y-%m-%d')}.log"
-        )
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(json_formatter)
-        self.logger.addHandler(file_handler)
+        # Single queue handler; formatting and I/O happen on the pipeline thread
+        self.logger.addHandler(PipelineHandler(get_log_pipeline()))
 
         # Prevent propagation to root logger
         self.logger.propagate = False
 
     def info(self, message, extra=None):
-        self.logger.info(message, extra=extra)
+        self.logger.info(message, extra=self._wrap_extra(extra))
 
     def error(self, message, exc_info=None, extra=None):
-        self.logger.error(message, exc_info=exc_info, extra=extra)
+        self.logger.error(message, exc_info=exc_info, extra=self._wrap_extra(extra))
 
     def warning(self, message, extra=None):
-        self.logger.warning(message, extra=extra)
+        self.logger.warning(message, extra=self._wrap_extra(extra))
 
-    def debug(self, message, extra=None):
-        self.logger.debug(message, extra=extra)
+    def debug(self, message, extra=None, sample_key=None):
+        """
+        Log a debug record, optionally rate-limited.
+
+        Args:
+            message: The message (only converted to text if the record is kept)
+            extra: Extra fields for the JSON record
+            sample_key: Records sharing this key are limited to
+                LOG_SAMPLE_PER_SECOND per second, for per-chunk logging
+        """
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        if sample_key is not None and not self._allow_sample(sample_key):
+            return
+        self.logger.debug(message, extra=self._wrap_extra(extra))
+
+    @classmethod
+    def _allow_sample(cls, key: str) -> bool:
+        # Token bucket per key: [tokens, last refill time]
+        now = time.monotonic()
+        with cls._sample_lock:
+            bucket = cls._sample_buckets.setdefault(key, [LOG_SAMPLE_PER_SECOND, now])
+            bucket[0] = min(
+                LOG_SAMPLE_PER_SECOND,
+                bucket[0] + (now - bucket[1]) * LOG_SAMPLE_PER_SECOND,
+            )
+            bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+    @staticmethod
+    def _wrap_extra(extra):
+        # Nest the fields under "extra" so CustomJsonFormatter can merge them
+        return {"extra": extra} if extra else None
 
 
 def auto_log_error(logger_name: str = "default", response_if_error: Any = None):
@@ -103,6 +297,14 @@ def auto_log_error(logger_name: str = "default", response_if_error: Any = None):
                 tb = traceback.extract_tb(e.__traceback__)
                 frame = tb[-1]  # Last frame in traceback
 
+                # Mark the active span as failed so the trace shows where it broke
+                from src.utils.tracing import current_span
+
+                active_span = current_span()
+                if active_span is not None:
+                    active_span.status = "error"
+                    active_span.error = str(e)
+
                 logger.error(
                     "Unexpected error",
                     extra={
@@ -0,0 +1,243 @@
+"""Incremental BM25 index of saved chat turns for long-term memory retrieval."""
+
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.helper import chat_key
+from src.utils.logger import Logger
+from src.utils.token_counter import MESSAGE_OVERHEAD, count_tokens
+
+logger = Logger("memory_index")
+
+MEMORY_ENABLED = os.environ.get("MEMORY_ENABLED", "1") == "1"
+
+# Maximum number of earlier turns recalled per request
+MEMORY_TOP_K = int(os.environ.get("MEMORY_TOP_K", "3"))
+
+# Minimum BM25 score for a turn to count as referred to by the prompt
+MEMORY_MIN_SCORE = float(os.environ.get("MEMORY_MIN_SCORE", "1.0"))
+
+# Share of the context budget that recalled turns may use
+MEMORY_BUDGET_SHARE = float(os.environ.get("MEMORY_BUDGET_SHARE", "0.25"))
+
+# Chat indexes kept in memory; the least recently used are dropped above this, and
+# rebuilt from the chat's history when it is used again
+MEMORY_MAX_CHATS = int(os.environ.get("MEMORY_MAX_CHATS", "256"))
+
+# Very common words that carry no meaning for retrieval (English and Vietnamese)
+STOPWORDS = {
+    "a", "an", "and", "are", "be", "can", "do", "for", "how", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "that", "the", "this", "to", "was",
+    "what", "with", "you", "và", "là", "của", "có", "cho", "không", "được",
+    "một", "những", "các", "này", "tôi", "bạn", "thì", "với", "đã", "gì",
+}  # fmt: skip
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, dropping stopwords."""
+    text = unicodedata.normalize("NFC", text or "").casefold()
+    return [term for term in re.findall(r"\w+", text) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """An Okapi BM25 index that accepts documents one at a time."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Any, int]] = defaultdict(dict)
+        self._doc_lengths: Dict[Any, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, doc_id: Any, text: str) -> None:
+        """Index a document; only the postings of its own terms are touched."""
+        terms = Counter(tokenize(text))
+        for term, frequency in terms.items():
+            self._postings[term][doc_id] = frequency
+        length = sum(terms.values())
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def search(
+        self, query: str, k: int = MEMORY_TOP_K, doc_filter=None
+    ) -> List[Tuple[Any, float]]:
+        """
+        Return the best matching documents for a query.
+
+        Args:
+            query: The query text
+            k: Maximum number of results
+            doc_filter: Optional predicate on document IDs
+
+        Returns:
+            list: (doc_id, score) pairs, best first
+        """
+        if not self._doc_lengths:
+            return []
+
+        count = len(self._doc_lengths)
+        average_length = self._total_length / count or 1
+        scores: Dict[Any, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                if doc_filter is not None and not doc_filter(doc_id):
+                    continue
+                norm = 1 - self.b + self.b * self._doc_lengths[doc_id] / average_length
+                scores[doc_id] += (
+                    idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+                )
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class ChatMemory:
+    """The turns of one chat and their BM25 index."""
+
+    def __init__(self):
+        self.index = BM25Index()
+        self.turns: Dict[int, List[Dict[str, str]]] = {}
+        self.indexed = 0
+
+    def update(self, messages: List[Dict[str, Any]]) -> None:
+        """
+        Index the complete turns added since the last update.
+
+        A turn is a user message and the assistant reply that follows it; its ID is
+        the position of its first message in ``messages``.
+        """
+        i = self.indexed
+        while i < len(messages):
+            turn = [messages[i]]
+            if messages[i]["role"] == "user":
+                if i + 1 >= len(messages):
+                    # The reply has not been stored yet
+                    break
+                if messages[i + 1]["role"] == "assistant":
+                    turn.append(messages[i + 1])
+            turn = [{"role": m["role"], "content": m["content"]} for m in turn]
+            self.turns[i] = turn
+            self.index.add(i, "\n".join(m["content"] for m in turn))
+            i += len(turn)
+        self.indexed = i
+
+
+_lock = threading.Lock()
+_memories: "OrderedDict[str, ChatMemory]" = OrderedDict()
+
+
+def update_chat_memory(chat_name: str, messages: List[Dict[str, Any]]) -> None:
+    """
+    Bring a chat's index up to date with its user/assistant messages.
+
+    The index is rebuilt only if the history shrank (e.g. it was cleared).
+    """
+    key = chat_key(chat_name)
+    with _lock:
+        memory = _memories.get(key)
+        if memory is None or memory.indexed > len(messages):
+            memory = _memories[key] = ChatMemory()
+        memory.update(messages)
+        _memories.move_to_end(key)
+        while len(_memories) > MEMORY_MAX_CHATS:
+            _memories.popitem(last=False)
+
+
+def is_indexed(chat_name: str) -> bool:
+    """Whether a chat has an index in this worker."""
+    with _lock:
+        return chat_key(chat_name) in _memories
+
+
+def forget_chat(chat_name: str) -> None:
+    """Drop the index of a deleted chat."""
+    with _lock:
+        _memories.pop(chat_key(chat_name), None)
+
+
+def format_turn(turn: List[Dict[str, str]]) -> str:
+    """Render a recalled turn for the prompt."""
+    return "\n".join(f"{m['role']}: {m['content']}" for m in turn)
+
+
+def retrieve_memories(
+    query: str,
+    chat_name: str,
+    before: int,
+    max_tokens: int,
+    other_chats: Optional[List[str]] = None,
+    k: int = MEMORY_TOP_K,
+    min_score: float = MEMORY_MIN_SCORE,
+) -> List[Dict[str, Any]]:
+    """
+    Return the earlier turns most relevant to a prompt, within a token budget.
+
+    Args:
+        query: The new prompt
+        chat_name: The current chat; only turns ending before ``before`` are used
+        before: Position of the first message still sent verbatim
+        max_tokens: Token budget for the recalled turns
+        other_chats: Other chats to search as well
+        k: Maximum number of turns
+        min_score: Minimum BM25 score for a turn to be recalled
+
+    Returns:
+        list: Dicts with "chat", "turn", "score" and "tokens", best first
+    """
+    candidates = []
+    with _lock:
+        memory = _memories.get(chat_key(chat_name))
+        if memory is not None:
+            for doc_id, score in memory.index.search(
+                query,
+                k,
+                lambda doc_id: doc_id + len(memory.turns[doc_id]) <= before,
+            ):
+                candidates.append((score, chat_name, memory.turns[doc_id]))
+
+        for other in other_chats or []:
+            other_memory = _memories.get(chat_key(other))
+            if other_memory is None:
+                continue
+            for doc_id, score in other_memory.index.search(query, k):
+                candidates.append((score, other, other_memory.turns[doc_id]))
+
+    candidates.sort(key=lambda item: item[0], reverse=True)
+
+    results = []
+    used = 0
+    for score, chat, turn in candidates:
+        if score < min_score or len(results) >= k:
+            break
+        tokens = count_tokens(format_turn(turn)) + MESSAGE_OVERHEAD
+        if used + tokens > max_tokens:
+            continue
+        used += tokens
+        results.append({"chat": chat, "turn": turn, "score": score, "tokens": tokens})
+
+    if results:
+        logger.debug(
+            f"Recalled {len(results)} earlier turns for {chat_name}",
+            extra={"scores": [round(item["score"], 2) for item in results]},
+        )
+    return results
+
+
+def memory_message(memories: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Combine recalled turns into one system message."""
+    turns = "\n\n".join(format_turn(item["turn"]) for item in memories)
+    return {
+        "role": "system",
+        "content": f"Relevant earlier messages from the user's chats:\n{turns}",
+    }
@@ -0,0 +1,207 @@
+"""Per-session memory footprint estimation for Streamlit session state."""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+
+from src.utils.logger import Logger
+
+logger = Logger("memory_profiler")
+
+# Seconds between two periodic memory records for the same session
+MEMORY_LOG_INTERVAL = float(os.environ.get("MEMORY_LOG_INTERVAL", "300"))
+
+# Reports of sessions not measured for this long (seconds) are dropped, since
+# Streamlit does not tell us when a browser tab goes away
+MEMORY_REPORT_MAX_AGE = float(os.environ.get("MEMORY_REPORT_MAX_AGE", "3600"))
+
+# Start tracemalloc at import time when explicitly enabled (it slows allocations)
+TRACEMALLOC_ENABLED = os.environ.get("MEMORY_TRACEMALLOC", "0") == "1"
+
+# Number of largest keys kept in each report
+TOP_KEYS = 20
+
+# Objects that are shared process-wide and must not be charged to a session
+_SKIP_TYPES = (type, type(sys), type(len), type(lambda: None))
+
+# Latest report per session id, shared by every session in the worker
+_session_reports: Dict[str, Dict[str, Any]] = {}
+_last_logged: Dict[str, float] = {}
+_reports_lock = threading.Lock()
+
+if TRACEMALLOC_ENABLED and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def session_label(session_id: str) -> str:
+    """Short stable label for a session; its id names the history file, so it is not shown."""
+    return hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:8]
+
+
+def _evict_stale(now: float) -> None:
+    """Drop reports of sessions no longer measured; call with the lock held."""
+    for session_id, logged_at in list(_last_logged.items()):
+        if now - logged_at > MEMORY_REPORT_MAX_AGE:
+            _session_reports.pop(session_id, None)
+            del _last_logged[session_id]
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Estimate the memory used by an object and everything it references.
+
+    Shared objects are only counted once, and classes, modules and functions are skipped.
+
+    Args:
+        obj: The object to measure
+
+    Returns:
+        int: Estimated size in bytes
+    """
+    seen = set()
+    total = 0
+    stack = deque([obj])
+
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+
+        if isinstance(current, (str, bytes, bytearray, int, float, bool)):
+            continue
+        if isinstance(current, Mapping):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        else:
+            if hasattr(current, "__dict__"):
+                stack.append(vars(current))
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+
+    return total
+
+
+def session_memory_report(
+    session_state: Mapping[str, Any], session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Build a memory report for one Streamlit session.
+
+    Args:
+        session_state: The session state (or any mapping of keys to values)
+        session_id: Identifier of the session (default: the "session_id" key)
+
+    Returns:
+        dict: Session id, timestamp, total bytes and the largest keys
+    """
+    key_sizes = {}
+    for key in list(session_state.keys()):
+        try:
+            key_sizes[str(key)] = deep_sizeof(session_state[key])
+        except Exception:
+            # Widget values can disappear between keys() and the lookup
+            continue
+
+    top_keys = sorted(key_sizes.items(), key=lambda item: item[1], reverse=True)
+
+    return {
+        "session_id": session_id or str(session_state.get("session_id", "unknown")),
+        "timestamp": datetime.now().isoformat(),
+        "total_bytes": sum(key_sizes.values()),
+        "key_count": len(key_sizes),
+        "keys": dict(top_keys[:TOP_KEYS]),
+    }
+
+
+def record_session_memory(
+    session_state: Mapping[str, Any], force: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Periodically measure a session and emit the result as a JSON log record.
+
+    The measurement is skipped unless ``MEMORY_LOG_INTERVAL`` seconds have passed
+    since the last record for this session, so it is cheap to call on every rerun.
+
+    Args:
+        session_state: The session state to measure
+        force: Measure even if the interval has not elapsed
+
+    Returns:
+        dict or None: The new report, or None if the measurement was skipped
+    """
+    session_id = str(session_state.get("session_id", "unknown"))
+    now = time.monotonic()
+
+    with _reports_lock:
+        _evict_stale(now)
+        if not force and now - _last_logged.get(session_id, 0.0) < MEMORY_LOG_INTERVAL:
+            return None
+        _last_logged[session_id] = now
+
+    report = session_memory_report(session_state, session_id)
+
+    with _reports_lock:
+        _session_reports[session_id] = report
+
+    logger.info("Session memory report", extra=report)
+    return report
+
+
+def get_session_reports() -> List[Dict[str, Any]]:
+    """Return the latest report of every session, largest first."""
+    with _reports_lock:
+        _evict_stale(time.monotonic())
+        reports = list(_session_reports.values())
+    return sorted(reports, key=lambda report: report["total_bytes"], reverse=True)
+
+
+def forget_session(session_id: str) -> None:
+    """Drop the stored report of a session that no longer exists."""
+    with _reports_lock:
+        _session_reports.pop(session_id, None)
+        _last_logged.pop(session_id, None)
+
+
+def tracemalloc_top(limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Return the source lines holding the most memory according to tracemalloc.
+
+    Args:
+        limit: Number of lines to return
+
+    Returns:
+        list: Dicts with location, size in bytes and allocation count (empty if not tracing)
+    """
+    if not tracemalloc.is_tracing():
+        return []
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+    )
+
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
@@ -0,0 +1,89 @@
+"""Process-wide in-memory metrics store shared by every Streamlit session."""
+
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Number of observations kept per series
+MAX_SAMPLES = 10_000
+
+# Number of recent events kept
+MAX_EVENTS = 1_000
+
+
+def _series_key(name: str, labels: Dict[str, Any]) -> str:
+    """Build a key such as ``turn_seconds{mode=Default}`` from a name and labels."""
+    if not labels:
+        return name
+    label_str = ",".join(f"{key}={value}" for key, value in sorted(labels.items()))
+    return f"{name}{{{label_str}}}"
+
+
+class MetricsStore:
+    """Thread-safe counters, sampled series and recent events."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES, max_events: int = MAX_EVENTS):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._series: Dict[str, Deque[Tuple[float, float]]] = defaultdict(
+            lambda: deque(maxlen=max_samples)
+        )
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Increase a counter."""
+        with self._lock:
+            self._counters[_series_key(name, labels)] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a timestamped observation such as a latency in seconds."""
+        with self._lock:
+            self._series[_series_key(name, labels)].append((time.time(), value))
+
+    def record_event(self, name: str, data: Dict[str, Any]) -> None:
+        """Keep a structured event such as the timing breakdown of a turn."""
+        with self._lock:
+            self._events.append({"name": name, "timestamp": time.time(), **data})
+
+    def counters(self) -> Dict[str, float]:
+        """Return a copy of all counters."""
+        with self._lock:
+            return dict(self._counters)
+
+    def series(self, name: str, **labels) -> List[Tuple[float, float]]:
+        """Return the (timestamp, value) observations of one series."""
+        with self._lock:
+            return list(self._series.get(_series_key(name, labels), ()))
+
+    def series_names(self) -> List[str]:
+        """Return the keys of every recorded series."""
+        with self._lock:
+            return sorted(self._series)
+
+    def percentile(self, name: str, q: float, **labels) -> Optional[float]:
+        """
+        Return the q-th percentile (0-100) of a series, or None if it is empty.
+
+        Args:
+            name: Series name
+            q: Percentile between 0 and 100
+            **labels: Series labels
+
+        Returns:
+            float or None: The percentile value
+        """
+        values = sorted(value for _, value in self.series(name, **labels))
+        if not values:
+            return None
+        index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+        return values[index]
+
+    def events(self, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return recent events, optionally filtered by name."""
+        with self._lock:
+            return [event for event in self._events if name in (None, event["name"])]
+
+
+# Shared store for the whole worker process
+metrics = MetricsStore()
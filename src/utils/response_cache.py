@@ -0,0 +1,353 @@
+"""Exact-match and near-duplicate cache of LLM completions shared by every session."""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.cancellation import current_generation
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+from src.utils.tracing import current_span
+
+logger = Logger("response_cache")
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "1"
+
+# Entries older than this (seconds) are never served
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "1800"))
+
+# Least recently used entries are evicted above this size
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# Near-duplicate hits serve the answer of a rephrased question; off by default
+RESPONSE_CACHE_NEAR_ENABLED = os.environ.get("RESPONSE_CACHE_NEAR_ENABLED", "0") == "1"
+
+# Minimum cosine similarity between two questions for a near-duplicate hit
+RESPONSE_CACHE_SIMILARITY = float(os.environ.get("RESPONSE_CACHE_SIMILARITY", "0.92"))
+
+# Words that may differ between near-duplicates; negations are deliberately absent
+STOPWORDS = frozenset(
+    """
+    a an the is are was were be been am do does did what which who whom how
+    of to in on at for from by with about into as that this these those it its
+    i me my we our us you your please and or but so just tell explain
+    là của và có cho các những một thì được với này đó ở về hãy giúp tôi bạn
+    mình gì nào ạ nhé
+    """.split()
+)
+
+# Size of the hashed n-gram vectors
+VECTOR_DIM = 2048
+
+# Delay between replayed chunks so a cached answer still streams in the UI
+REPLAY_DELAY = float(os.environ.get("RESPONSE_CACHE_REPLAY_DELAY", "0.01"))
+
+# Long answers are replayed in at most this many chunks
+REPLAY_MAX_CHUNKS = 100
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode form, case and whitespace (Vietnamese diacritics are kept)."""
+    text = unicodedata.normalize("NFC", text or "").casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("?!.。 ")
+
+
+def _normalize_messages(messages: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    return [(m["role"], normalize_text(m["content"])) for m in messages]
+
+
+def _digest(payload: Any) -> str:
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def key_terms(text: str) -> FrozenSet[str]:
+    """
+    Return the numbers and content words of a question.
+
+    Two questions are only near-duplicates when these match exactly, so
+    "Monday" vs "Tuesday" or "2023" vs "2024" never share an answer.
+    """
+    words = re.findall(r"\w+", normalize_text(text))
+    return frozenset(word for word in words if word not in STOPWORDS)
+
+
+def embed_text(text: str) -> np.ndarray:
+    """
+    Embed text as an L2-normalized vector of hashed word and character n-grams.
+
+    Args:
+        text: The text to embed
+
+    Returns:
+        np.ndarray: A float32 vector of size VECTOR_DIM
+    """
+    normalized = normalize_text(text)
+    words = re.findall(r"\w+", normalized)
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for feature in features:
+        vector[zlib.crc32(feature.encode("utf-8")) % VECTOR_DIM] += 1.0
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Entry:
+    """A cached response and what it was computed from."""
+
+    __slots__ = ("response", "created", "context_key", "vector", "terms")
+
+    def __init__(
+        self,
+        response: str,
+        context_key: str,
+        vector: Optional[np.ndarray],
+        terms: Optional[FrozenSet[str]],
+    ):
+        self.response = response
+        self.created = time.time()
+        self.context_key = context_key
+        self.vector = vector
+        self.terms = terms
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of completions with a TTL.
+
+    Exact hits are keyed on the normalized messages plus the request
+    parameters, which is everything the answer depends on, so a question asked
+    again with the same history (e.g. in a fresh chat) is served from here.
+    Near-duplicate hits, when enabled, compare the hashed n-gram vector of the
+    last user message against entries with the same context (all earlier
+    messages plus parameters) whose numbers and content words match exactly,
+    so only a reworded question is matched.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl: float = RESPONSE_CACHE_TTL,
+        similarity: float = RESPONSE_CACHE_SIMILARITY,
+        near_duplicates: bool = RESPONSE_CACHE_NEAR_ENABLED,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.near_duplicates = near_duplicates
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._hits = {"exact": 0, "near": 0}
+        self._misses = 0
+
+    @staticmethod
+    def _keys(
+        messages: List[Dict[str, Any]], params: Dict[str, Any]
+    ) -> Tuple[str, str, Optional[str]]:
+        """Return the exact key, the context key and the question of a request."""
+        normalized = _normalize_messages(messages)
+        exact_key = _digest({"messages": normalized, "params": params})
+
+        question = None
+        context = normalized
+        if messages and messages[-1]["role"] == "user":
+            question = messages[-1]["content"]
+            context = normalized[:-1]
+        context_key = _digest({"context": context, "params": params})
+        return exact_key, context_key, question
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created > self.ttl
+
+    def get(self, messages: List[Dict[str, Any]], **params) -> Optional[str]:
+        """
+        Look up a cached response for a request.
+
+        Args:
+            messages: The chat messages sent to the model
+            **params: Request parameters such as model and temperature
+
+        Returns:
+            str or None: The cached response
+        """
+        exact_key, context_key, question = self._keys(messages, params)
+        now = time.time()
+        kind, response, score = None, None, None
+
+        with self._lock:
+            entry = self._entries.get(exact_key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[exact_key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(exact_key)
+                kind, response = "exact", entry.response
+
+        if kind is None and question is not None and self.near_duplicates:
+            vector = embed_text(question)
+            terms = key_terms(question)
+            with self._lock:
+                candidates = [
+                    (key, item)
+                    for key, item in self._entries.items()
+                    if item.context_key == context_key
+                    and item.terms == terms
+                    and item.vector is not None
+                    and not self._expired(item, now)
+                ]
+                if candidates:
+                    scores = np.stack([item.vector for _, item in candidates]) @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity:
+                        key, item = candidates[best]
+                        self._entries.move_to_end(key)
+                        kind, response, score = (
+                            "near",
+                            item.response,
+                            float(scores[best]),
+                        )
+
+        with self._lock:
+            if kind is None:
+                self._misses += 1
+            else:
+                self._hits[kind] += 1
+
+        metrics.increment("response_cache", result=kind or "miss")
+        active = current_span()
+        if active is not None:
+            active.set_attribute("response_cache", kind or "miss")
+        if kind is not None:
+            logger.info(
+                f"Response cache {kind} hit",
+                extra={"similarity": score, "params": params},
+            )
+        return response
+
+    def put(self, messages: List[Dict[str, Any]], response: str, **params) -> None:
+        """
+        Store a completed response.
+
+        Args:
+            messages: The chat messages sent to the model
+            response: The full response text
+            **params: Request parameters such as model and temperature
+        """
+        if not isinstance(response, str) or not response.strip():
+            return
+
+        exact_key, context_key, question = self._keys(messages, params)
+        vector, terms = None, None
+        if question is not None and self.near_duplicates:
+            vector, terms = embed_text(question), key_terms(question)
+
+        with self._lock:
+            self._entries[exact_key] = _Entry(response, context_key, vector, terms)
+            self._entries.move_to_end(exact_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, hits by kind, misses and the hit ratio."""
+        with self._lock:
+            hits = sum(self._hits.values())
+            lookups = hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self._hits["exact"],
+                "near_hits": self._hits["near"],
+                "misses": self._misses,
+                "hit_ratio": hits / lookups if lookups else None,
+            }
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = {"exact": 0, "near": 0}
+            self._misses = 0
+
+
+class CompletionWatcher:
+    """
+    Pass a model stream through and note how it ended.
+
+    Only an answer that ran to its natural end is worth caching: a stream that
+    was stopped, interrupted or cut short by the token limit would be replayed
+    as if it were complete.
+    """
+
+    def __init__(self, stream: Any):
+        self._stream = stream
+        self.finish_reason: Optional[str] = None
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._stream:
+            try:
+                reason = chunk.choices[0].finish_reason
+            except (AttributeError, IndexError, TypeError):
+                reason = None
+            if reason:
+                self.finish_reason = reason
+            yield chunk
+
+    @property
+    def completed(self) -> bool:
+        """Whether the stream finished normally and the turn was not cancelled."""
+        generation = current_generation()
+        if generation is not None and (generation.cancelled or generation.interrupted):
+            return False
+        return self.finish_reason == "stop"
+
+
+def replay_stream(text: str, delay: float = REPLAY_DELAY) -> Iterator[str]:
+    """
+    Yield a cached response in small word chunks, like a model stream.
+
+    Args:
+        text: The cached response
+        delay: Seconds to wait between chunks
+
+    Yields:
+        str: Consecutive pieces of the text
+    """
+    pieces = re.findall(r"\S+\s*|\s+", text)
+    step = max(1, math.ceil(len(pieces) / REPLAY_MAX_CHUNKS))
+    for i in range(0, len(pieces), step):
+        yield "".join(pieces[i : i + step])
+        if delay:
+            time.sleep(delay)
+
+
+# Shared cache for the whole worker process
+response_cache = ResponseCache()
+
+
+def get_cached_response(messages: List[Dict[str, Any]], **params) -> Optional[str]:
+    """Return a cached response for the request, or None (also when disabled)."""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    return response_cache.get(messages, **params)
+
+
+def cache_response(messages: List[Dict[str, Any]], response: str, **params) -> None:
+    """Store a completed response unless caching is disabled."""
+    if RESPONSE_CACHE_ENABLED:
+        response_cache.put(messages, response, **params)
@@ -1,11 +1,21 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import httpx
 import streamlit as st
 
+from src.services.chat_client import get_http_client
+from src.services.resilience import CircuitOpenError, send_with_retries
+from src.services.scheduler import SchedulerOverloaded
+from src.utils.deadline import Deadline, DeadlineExceeded, current_deadline
+from src.utils.tracing import traced
 
+
+@traced()
 def serper_search(
-    query: str, max_results: int = 5, search_type: str = "search"
+    query: str,
+    max_results: int = 5,
+    search_type: str = "search",
+    deadline: Optional[Deadline] = None,
 ) -> List[Dict[str, Any]]:
     """
     Perform a search using Serper.dev API via httpx
@@ -14,6 +24,7 @@ def serper_search(
         query: The search query string
         max_results: Maximum number of results to return (default: 5)
         search_type: Type of search - 'search', 'images', 'news', 'places', or 'videos'
+        deadline: Turn deadline capping the request (default: the current turn's)
 
     Returns:
         List of dictionaries with keys: title, url, snippet
@@ -41,65 +52,83 @@ def serper_search(
         "num": max_results,  # Number of results
     }
 
+    deadline = deadline or current_deadline()
     try:
-        # Using httpx with a timeout
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-
-            # Parse the JSON response
-            data = response.json()
-
-            # Extract organic search results
-            results = []
-
-            if search_type == "search":
-                organic = data.get("organic", [])
-                for item in organic[:max_results]:
-                    results.append(
-                        {
-                            "title": item.get("title", "No title"),
-                            "url": item.get("link", "#"),
-                            "snippet": item.get("snippet", "No description available."),
-                        }
-                    )
-            elif search_type == "news":
-                news = data.get("news", [])
-                for item in news[:max_results]:
-                    results.append(
-                        {
-                            "title": item.get("title", "No title"),
-                            "url": item.get("link", "#"),
-                            "snippet": item.get("snippet", "No description available."),
-                            "source": item.get("source", "Unknown source"),
-                            "date": item.get("date", "Unknown date"),
-                        }
-                    )
-            elif search_type == "images":
-                images = data.get("images", [])
-                for item in images[:max_results]:
-                    results.append(
-                        {
-                            "title": item.get("title", "No title"),
-                            "url": item.get("link", "#"),
-                            "imageUrl": item.get("imageUrl", ""),
-                            "source": item.get("source", "Unknown source"),
-                        }
-                    )
-            elif search_type == "places":
-                places = data.get("places", [])
-                for item in places[:max_results]:
-                    results.append(
-                        {
-                            "title": item.get("title", "No title"),
-                            "address": item.get("address", "No address"),
-                            "rating": item.get("rating", "No rating"),
-                            "reviews": item.get("reviewsCount", "0"),
-                        }
-                    )
-
-            return results
+        # Shared keep-alive client; failures are retried within the turn's deadline
+        client = get_http_client("serper")
+        response = send_with_retries(
+            "serper",
+            lambda timeout: client.post(
+                url, headers=headers, json=payload, timeout=timeout
+            ),
+            deadline,
+        )
 
+        # Parse the JSON response
+        data = response.json()
+
+        # Extract organic search results
+        results = []
+
+        if search_type == "search":
+            organic = data.get("organic", [])
+            for item in organic[:max_results]:
+                results.append(
+                    {
+                        "title": item.get("title", "No title"),
+                        "url": item.get("link", "#"),
+                        "snippet": item.get("snippet", "No description available."),
+                    }
+                )
+        elif search_type == "news":
+            news = data.get("news", [])
+            for item in news[:max_results]:
+                results.append(
+                    {
+                        "title": item.get("title", "No title"),
+                        "url": item.get("link", "#"),
+                        "snippet": item.get("snippet", "No description available."),
+                        "source": item.get("source", "Unknown source"),
+                        "date": item.get("date", "Unknown date"),
+                    }
+                )
+        elif search_type == "images":
+            images = data.get("images", [])
+            for item in images[:max_results]:
+                results.append(
+                    {
+                        "title": item.get("title", "No title"),
+                        "url": item.get("link", "#"),
+                        "imageUrl": item.get("imageUrl", ""),
+                        "source": item.get("source", "Unknown source"),
+                    }
+                )
+        elif search_type == "places":
+            places = data.get("places", [])
+            for item in places[:max_results]:
+                results.append(
+                    {
+                        "title": item.get("title", "No title"),
+                        "address": item.get("address", "No address"),
+                        "rating": item.get("rating", "No rating"),
+                        "reviews": item.get("reviewsCount", "0"),
+                    }
+                )
+
+        return results
+
+    except DeadlineExceeded:
+        deadline.degrade("search", "skipped")
+        return []
+    except (SchedulerOverloaded, CircuitOpenError) as e:
+        st.warning(str(e))
+        return []
+    except httpx.TimeoutException as e:
+        if deadline.expired:
+            deadline.degrade("search", "timed_out")
+            return []
+        st.error(f"HTTP error occurred while searching with Serper: {str(e)}")
+        return []
     except httpx.HTTPError as e:
         st.error(f"HTTP error occurred while searching with Serper: {str(e)}")
         return []
@@ -0,0 +1,293 @@
+"""Speculative follow-ups: suggest likely next questions and prefetch their answers."""
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src.services.scheduler import BACKGROUND, scheduled_as
+from src.utils.helper import chat_key
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+from src.utils.think_parser import answer_text
+from src.utils.token_counter import count_tokens
+
+logger = Logger("speculation")
+
+SPECULATION_ENABLED = os.environ.get("SPECULATION_ENABLED", "1") == "1"
+
+# Small model used to suggest follow-up questions
+SPECULATION_MODEL = os.environ.get("SPECULATION_MODEL", "qwen2.5-7b-instruct")
+
+# Number of follow-ups suggested after an answer
+SPECULATION_MAX_FOLLOWUPS = int(os.environ.get("SPECULATION_MAX_FOLLOWUPS", "3"))
+
+# Longest prefetched answer (completion tokens)
+SPECULATION_MAX_TOKENS = int(os.environ.get("SPECULATION_MAX_TOKENS", "600"))
+
+# Tokens (prompt + completion) all sessions of the worker may spend on
+# prefetching per minute; prefetching stops when the budget is used up
+SPECULATION_TOKENS_PER_MINUTE = int(
+    os.environ.get("SPECULATION_TOKENS_PER_MINUTE", "20000")
+)
+
+# Prefetched answers older than this are not used (seconds)
+SPECULATION_TTL = 600
+
+# Longest wait for a prefetch that is still running when its chip is clicked
+SPECULATION_WAIT = 15.0
+
+# Characters of each recent message shown to the suggestion model
+SUGGEST_MESSAGE_CHARS = 1500
+
+FOLLOWUP_PROMPT = """Suggest the {count} follow-up questions the user is most likely to ask next
+in this conversation. Write them in the user's language, each under 15 words, one per line,
+without numbering or any other text."""
+
+_LIST_PREFIX = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+class TokenBudget:
+    """A token bucket refilled continuously up to ``per_minute`` tokens."""
+
+    def __init__(self, per_minute: int = SPECULATION_TOKENS_PER_MINUTE):
+        self.per_minute = per_minute
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_spend(self, tokens: int) -> bool:
+        """Take tokens from the bucket if enough are available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.per_minute,
+                self._tokens + (now - self._updated) * self.per_minute / 60,
+            )
+            self._updated = now
+            if tokens > self._tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+
+class Speculation:
+    """Suggested follow-ups for one answer and their prefetched answers."""
+
+    def __init__(self, position: int, mode: str, suggestions: List[str]):
+        self.position = position
+        self.mode = mode
+        self.suggestions = suggestions
+        self.created_at = time.monotonic()
+        self.superseded = False
+        self._answers: Dict[str, str] = {}
+        self._ready: Dict[str, threading.Event] = {
+            suggestion: threading.Event() for suggestion in suggestions
+        }
+
+    def set_answer(self, suggestion: str, text: Optional[str]) -> None:
+        if text:
+            self._answers[suggestion] = text
+        self._ready[suggestion].set()
+
+    def answer(self, suggestion: str, wait: float = 0) -> Optional[str]:
+        ready = self._ready.get(suggestion)
+        if ready is None:
+            return None
+        ready.wait(wait)
+        return self._answers.get(suggestion)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.created_at > SPECULATION_TTL
+
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculation")
+_lock = threading.Lock()
+_speculations: Dict[str, Speculation] = {}
+budget = TokenBudget()
+
+
+def parse_followups(text: str, limit: int = SPECULATION_MAX_FOLLOWUPS) -> List[str]:
+    """Extract distinct questions from a one-per-line model reply."""
+    followups: List[str] = []
+    for line in text.splitlines():
+        question = _LIST_PREFIX.sub("", line).strip().strip('"')
+        if 3 <= len(question) <= 150 and question not in followups:
+            followups.append(question)
+        if len(followups) == limit:
+            break
+    return followups
+
+
+def suggest_followups(
+    client, messages: List[Dict[str, Any]], model: str = SPECULATION_MODEL
+) -> List[str]:
+    """
+    Ask a small model for the likely next questions.
+
+    Args:
+        client: OpenAI-compatible client
+        messages: The conversation so far, ending with the answer
+
+    Returns:
+        list: Up to SPECULATION_MAX_FOLLOWUPS questions
+    """
+    recent = [m for m in messages if m["role"] != "system"][-4:]
+    transcript = "\n\n".join(
+        f"{m['role']}: {m['content'][:SUGGEST_MESSAGE_CHARS]}" for m in recent
+    )
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": FOLLOWUP_PROMPT.format(count=SPECULATION_MAX_FOLLOWUPS),
+            },
+            {"role": "user", "content": transcript},
+        ],
+        temperature=0.3,
+        max_tokens=120,
+    )
+    return parse_followups(response.choices[0].message.content or "")
+
+
+def _prefetch(
+    speculation: Speculation,
+    client,
+    model: str,
+    base_messages: List[Dict[str, Any]],
+    build_messages: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+) -> None:
+    """Answer each suggestion in turn while the budget allows."""
+    for suggestion in speculation.suggestions:
+        if speculation.superseded:
+            speculation.set_answer(suggestion, None)
+            continue
+
+        messages = build_messages(
+            base_messages + [{"role": "user", "content": suggestion}]
+        )
+        cost = sum(count_tokens(m["content"]) for m in messages)
+        if not budget.try_spend(cost + SPECULATION_MAX_TOKENS):
+            metrics.increment("speculation_skipped", reason="budget")
+            speculation.set_answer(suggestion, None)
+            continue
+
+        try:
+            # Prefetching yields to interactive turns for upstream capacity
+            with scheduled_as("speculation", BACKGROUND):
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=SPECULATION_MAX_TOKENS,
+                )
+            choice = response.choices[0]
+            # A truncated answer would look broken when replayed; answer it live
+            text = choice.message.content if choice.finish_reason != "length" else None
+            speculation.set_answer(suggestion, text)
+            metrics.increment("speculation_prefetched")
+        except Exception as e:
+            logger.warning(f"Speculative prefetch failed: {str(e)}")
+            speculation.set_answer(suggestion, None)
+
+
+def start_speculation(
+    client,
+    chat_name: str,
+    position: int,
+    mode: str,
+    model: str,
+    messages: List[Dict[str, Any]],
+    build_messages: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+) -> List[str]:
+    """
+    Suggest follow-ups for the latest answer and prefetch their answers.
+
+    Suggestions are produced right away (one small, short request); answers are
+    computed in the background under the worker-wide token budget.
+
+    Args:
+        client: OpenAI-compatible client
+        chat_name: The chat name
+        position: Number of history messages, i.e. where a follow-up would go
+        mode: Chat mode that answered; prefetched answers are only used in it
+        model: Model used for the prefetched answers
+        messages: Model input of the turn plus the answer
+        build_messages: The engine's function turning history into model input
+
+    Returns:
+        list: The suggested follow-ups (empty on error)
+    """
+    discard_speculation(chat_name)
+    base_messages = [
+        {"role": m["role"], "content": answer_text(m["content"])} for m in messages
+    ]
+    try:
+        suggestions = suggest_followups(client, base_messages)
+    except Exception as e:
+        logger.warning(f"Could not suggest follow-ups: {str(e)}")
+        return []
+    if not suggestions:
+        return []
+
+    speculation = Speculation(position, mode, suggestions)
+    with _lock:
+        # Forget chats that were left with unused suggestions
+        for key in [k for k, s in _speculations.items() if s.expired]:
+            del _speculations[key]
+        _speculations[chat_key(chat_name)] = speculation
+    _executor.submit(
+        _prefetch, speculation, client, model, base_messages, build_messages
+    )
+    return suggestions
+
+
+def get_followups(chat_name: str, position: int) -> List[str]:
+    """Suggestions for the answer at ``position``, if they are still current."""
+    with _lock:
+        speculation = _speculations.get(chat_key(chat_name))
+    if speculation is None or speculation.position != position or speculation.expired:
+        return []
+    return speculation.suggestions
+
+
+def take_speculative_answer(
+    chat_name: str, prompt: str, position: int, mode: str
+) -> Optional[str]:
+    """
+    Return the prefetched answer to a clicked follow-up, consuming the speculation.
+
+    Args:
+        chat_name: The chat name
+        prompt: The user's message
+        position: Number of history messages before the user's message
+        mode: The chat mode answering now
+
+    Returns:
+        str or None: The answer, if one was prefetched for exactly this turn
+    """
+    with _lock:
+        speculation = _speculations.pop(chat_key(chat_name), None)
+    if speculation is None:
+        return None
+    speculation.superseded = True
+
+    usable = (
+        speculation.position == position
+        and speculation.mode == mode
+        and not speculation.expired
+    )
+    text = speculation.answer(prompt, SPECULATION_WAIT) if usable else None
+    metrics.increment("speculation_hits" if text else "speculation_misses")
+    return text
+
+
+def discard_speculation(chat_name: str) -> None:
+    """Drop the chat's suggestions and stop its pending prefetches."""
+    with _lock:
+        speculation = _speculations.pop(chat_key(chat_name), None)
+    if speculation is not None:
+        speculation.superseded = True
@@ -0,0 +1,173 @@
+"""Frame-rate-limited rendering of streamed model output into a Streamlit placeholder."""
+
+import os
+import time
+from typing import Any, Iterable, List, Optional
+
+import streamlit as st
+
+from src.utils.cancellation import current_generation
+from src.utils.think_parser import (
+    ANSWER,
+    REASONING,
+    THINK_START,
+    Event,
+    ThinkStreamParser,
+    format_segments,
+)
+from src.utils.timing import delta_text
+
+# Maximum number of placeholder updates per second while streaming
+STREAM_FPS = float(os.environ.get("STREAM_FPS", "15"))
+
+# Appended to the text while the stream is still running
+CURSOR = "▌"
+
+
+class StreamRenderer:
+    """
+    Collect streamed deltas and redraw a placeholder at most ``fps`` times a second.
+
+    Every redraw sends the whole Markdown text to the browser, so redrawing on each
+    token costs O(n²) bytes for long answers. Deltas are kept in a list and joined
+    only when a frame is drawn; ``close()`` always draws the final text.
+
+    ``<think>`` sections are parsed incrementally and drawn as a collapsible
+    reasoning block (expanded while the model is still thinking); ``text`` keeps
+    the raw output including the tags.
+    """
+
+    def __init__(
+        self,
+        placeholder: Optional[Any] = None,
+        fps: float = STREAM_FPS,
+        cursor: str = CURSOR,
+        unsafe_allow_html: bool = False,
+        parse_think: bool = True,
+    ):
+        self.placeholder = placeholder if placeholder is not None else st.empty()
+        self.cursor = cursor
+        self.unsafe_allow_html = unsafe_allow_html
+        self.frames = 0
+        self._interval = 1.0 / fps if fps > 0 else 0.0
+        self._parts: List[str] = []
+        self._dirty = False
+        self._last_frame = 0.0
+        self._parser = ThinkStreamParser() if parse_think else None
+        self._segments: List[List[Any]] = []  # [event type, list of text parts]
+        self._has_reasoning = False
+
+        # The current generation keeps its latest renderer to save partial output
+        self._generation = current_generation()
+        if self._generation is not None:
+            self._generation.renderer = self
+
+    @property
+    def text(self) -> str:
+        """The text received so far."""
+        if len(self._parts) > 1:
+            self._parts[:] = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def write(self, delta: str) -> None:
+        """Add a delta and redraw if the frame interval has passed."""
+        if not delta:
+            return
+        self._parts.append(delta)
+        if self._parser is not None:
+            self._apply(self._parser.feed(delta))
+        self._dirty = True
+        if time.perf_counter() - self._last_frame >= self._interval:
+            self.flush()
+
+    def _apply(self, events: List[Event]) -> None:
+        """Add parser events to the display segments."""
+        for kind, text in events:
+            if kind == THINK_START:
+                # An empty reasoning block shows "Thinking..." until text arrives
+                self._segments.append([REASONING, []])
+                self._has_reasoning = True
+            elif kind in (REASONING, ANSWER):
+                if not self._segments or self._segments[-1][0] != kind:
+                    self._segments.append([kind, []])
+                self._segments[-1][1].append(text)
+
+    def _display_text(self) -> str:
+        """The Markdown to draw, with reasoning sections formatted."""
+        if not self._has_reasoning:
+            return self.text
+        return format_segments(
+            [(kind, "".join(parts)) for kind, parts in self._segments],
+            thinking=self._parser.in_think,
+        )
+
+    def flush(self, final: bool = False) -> None:
+        """Redraw the placeholder now (without the cursor if ``final``)."""
+        if not (self._dirty or final):
+            return
+        if final and self._parser is not None:
+            self._apply(self._parser.close())
+        text = self._display_text()
+        self.placeholder.markdown(
+            text if final else text + self.cursor,
+            unsafe_allow_html=self.unsafe_allow_html or self._has_reasoning,
+        )
+        self.frames += 1
+        self._dirty = False
+        self._last_frame = time.perf_counter()
+
+    def clear(self) -> None:
+        """Drop the text received so far and empty the placeholder."""
+        self._parts.clear()
+        self._dirty = False
+        self._segments.clear()
+        self._has_reasoning = False
+
+        # The current generation keeps its latest renderer to save partial output
+        self._generation = current_generation()
+        if self._generation is not None:
+            self._generation.renderer = self
+        if self._parser is not None:
+            self._parser = ThinkStreamParser()
+        self.placeholder.empty()
+
+    def close(self) -> str:
+        """Draw the final text and return it."""
+        self.flush(final=True)
+        return self.text
+
+    def consume(self, stream: Iterable[Any]) -> str:
+        """
+        Render a whole stream of OpenAI chunks or strings.
+
+        Args:
+            stream: Streaming chunks or text deltas
+
+        Returns:
+            str: The full text (also when the stream fails part-way)
+        """
+        try:
+            for chunk in stream:
+                if self._generation is not None and self._generation.cancelled:
+                    break
+                self.write(delta_text(chunk))
+        finally:
+            self.close()
+        return self.text
+
+
+def render_stream(
+    stream: Iterable[Any], placeholder: Optional[Any] = None, **kwargs
+) -> str:
+    """
+    Render a stream into a placeholder (a new one by default) and return its text.
+
+    Args:
+        stream: Streaming chunks or text deltas
+        placeholder: Streamlit placeholder to draw into
+        **kwargs: Options for StreamRenderer such as ``fps``
+
+    Returns:
+        str: The full text
+    """
+    return StreamRenderer(placeholder, **kwargs).consume(stream)
@@ -0,0 +1,210 @@
+"""Background rolling summaries of chat turns that no longer fit the context budget."""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from src.services.scheduler import BACKGROUND, current_user, scheduled_as
+from src.utils.helper import chat_key
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+
+logger = Logger("summarizer")
+
+SUMMARY_ENABLED = os.environ.get("SUMMARY_ENABLED", "1") == "1"
+
+# Model used for summaries; a small model keeps them cheap
+SUMMARY_MODEL = os.environ.get("SUMMARY_MODEL", "qwen2.5-7b-instruct")
+
+# Aged-out messages are folded in batches of at least this size
+SUMMARY_MIN_MESSAGES = int(os.environ.get("SUMMARY_MIN_MESSAGES", "2"))
+
+# Summaries kept in memory; the least recently used are dropped above this, and
+# restored from the chat file when the chat is loaded again
+SUMMARY_MAX_CHATS = int(os.environ.get("SUMMARY_MAX_CHATS", "256"))
+
+# Longest part of a single message passed to the summarizer (characters)
+SUMMARY_MESSAGE_CHARS = 4000
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant.
+Update the existing summary with the new messages. Keep facts, names, numbers, decisions,
+open questions and the user's preferences; drop pleasantries. Write at most 200 words in
+the language of the conversation. Reply with the updated summary only."""
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarizer")
+_lock = threading.Lock()
+_summaries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_pending: set = set()
+
+
+def _store(key: str, summary: Dict[str, Any]) -> None:
+    """Keep a summary as the most recently used one (call with the lock held)."""
+    _summaries[key] = summary
+    _summaries.move_to_end(key)
+    while len(_summaries) > SUMMARY_MAX_CHATS:
+        _summaries.popitem(last=False)
+
+
+def get_summary(chat_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the rolling summary of a chat.
+
+    Returns:
+        dict or None: "text" and "covered" (number of history messages folded in)
+    """
+    key = chat_key(chat_name)
+    with _lock:
+        summary = _summaries.get(key)
+        if summary is None:
+            return None
+        _summaries.move_to_end(key)
+        return dict(summary)
+
+
+def restore_summary(chat_name: str, summary: Optional[Dict[str, Any]]) -> None:
+    """Load a summary persisted with the chat, unless a newer one is in memory."""
+    if not summary:
+        return
+    key = chat_key(chat_name)
+    with _lock:
+        current = _summaries.get(key)
+        if current is None or current["covered"] < summary.get("covered", 0):
+            _store(key, {"text": summary["text"], "covered": summary["covered"]})
+
+
+def forget_summary(chat_name: str) -> None:
+    """Drop the summary of a deleted chat."""
+    with _lock:
+        _summaries.pop(chat_key(chat_name), None)
+
+
+def summary_message(chat_name: str, history_length: int) -> Optional[Dict[str, str]]:
+    """
+    Return the summary as a system message, or None if there is nothing to inject.
+
+    Args:
+        chat_name: The chat name
+        history_length: Number of user/assistant messages in the chat; a summary
+            covering more than this belongs to cleared history and is dropped
+    """
+    key = chat_key(chat_name)
+    with _lock:
+        summary = _summaries.get(key)
+        if summary and summary["covered"] > history_length:
+            del _summaries[key]
+            summary = None
+    if not summary or not summary["text"]:
+        return None
+    return {
+        "role": "system",
+        "content": f"Summary of the earlier conversation:\n{summary['text']}",
+    }
+
+
+def _format_messages(messages: List[Dict[str, Any]]) -> str:
+    return "\n\n".join(
+        f"{msg['role']}: {msg['content'][:SUMMARY_MESSAGE_CHARS]}" for msg in messages
+    )
+
+
+def run_summary_update(
+    client, chat_name: str, aged_out: List[Dict[str, Any]], model: str = SUMMARY_MODEL
+) -> Optional[Dict[str, Any]]:
+    """
+    Fold newly aged-out messages into the chat's summary.
+
+    Only the messages after the ones already covered are sent, together with the
+    previous summary, so a chat is never re-summarized from scratch.
+
+    Args:
+        client: OpenAI-compatible client
+        chat_name: The chat name
+        aged_out: All user/assistant messages that no longer fit the context budget
+        model: Model used for summarizing
+
+    Returns:
+        dict or None: The updated summary
+    """
+    key = chat_key(chat_name)
+    previous = get_summary(chat_name) or {"text": "", "covered": 0}
+    new_messages = aged_out[previous["covered"] :]
+    if not new_messages:
+        return previous
+
+    started = time.perf_counter()
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {
+                "role": "user",
+                "content": f"Existing summary:\n{previous['text'] or '(none)'}\n\n"
+                f"New messages:\n{_format_messages(new_messages)}",
+            },
+        ],
+        temperature=0.2,
+    )
+    text = (response.choices[0].message.content or "").strip()
+    elapsed = time.perf_counter() - started
+
+    summary = {"text": text, "covered": len(aged_out)}
+    with _lock:
+        current = _summaries.get(key)
+        if current is None or current["covered"] < summary["covered"]:
+            _store(key, summary)
+
+    metrics.observe("summary_seconds", elapsed)
+    logger.info(
+        f"Summary of {chat_name} now covers {len(aged_out)} messages",
+        extra={"new_messages": len(new_messages), "seconds": elapsed},
+    )
+    return summary
+
+
+def _run_in_background(client, chat_name, aged_out, user) -> None:
+    key = chat_key(chat_name)
+    try:
+        # Summaries yield to interactive turns, and count against the chat's user
+        with scheduled_as(user, BACKGROUND):
+            run_summary_update(client, chat_name, aged_out)
+    except Exception as e:
+        logger.error(f"Failed to update summary of {chat_name}: {str(e)}")
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def schedule_summary_update(
+    client, chat_name: str, aged_out: List[Dict[str, Any]]
+) -> bool:
+    """
+    Queue a background summary update if enough new messages have aged out.
+
+    Args:
+        client: OpenAI-compatible client
+        chat_name: The chat name
+        aged_out: All user/assistant messages that no longer fit the context budget
+
+    Returns:
+        bool: Whether an update was queued
+    """
+    if not SUMMARY_ENABLED:
+        return False
+
+    key = chat_key(chat_name)
+    covered = (get_summary(chat_name) or {"covered": 0})["covered"]
+    if len(aged_out) - covered < SUMMARY_MIN_MESSAGES:
+        return False
+
+    with _lock:
+        if key in _pending:
+            return False
+        _pending.add(key)
+
+    # Copy the messages so the worker never reads session state
+    snapshot = [{"role": m["role"], "content": m["content"]} for m in aged_out]
+    _executor.submit(_run_in_background, client, chat_name, snapshot, current_user())
+    return True
@@ -0,0 +1,148 @@
+"""Incremental parser for <think> reasoning blocks in streamed model output."""
+
+from functools import lru_cache
+from typing import List, Tuple
+
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+# Event types emitted by the parser
+THINK_START = "think_start"
+THINK_END = "think_end"
+REASONING = "reasoning"
+ANSWER = "answer"
+
+Event = Tuple[str, str]
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+class ThinkStreamParser:
+    """
+    A two-state machine (answer / reasoning) fed one chunk at a time.
+
+    Tags split across chunks are handled by holding back at most ``len(tag) - 1``
+    characters that could start a tag, so each chunk is scanned once and the
+    work per chunk does not depend on how much text came before it.
+    """
+
+    def __init__(self):
+        self.in_think = False
+        self._pending = ""
+
+    def feed(self, chunk: str) -> List[Event]:
+        """
+        Consume a chunk and return the events it completes.
+
+        Args:
+            chunk: The next piece of streamed text
+
+        Returns:
+            list: (event_type, text) tuples; text is empty for THINK_START/THINK_END
+        """
+        text = self._pending + (chunk or "")
+        self._pending = ""
+        events: List[Event] = []
+        position = 0
+
+        while position < len(text):
+            tag = CLOSE_TAG if self.in_think else OPEN_TAG
+            index = text.find(tag, position)
+            if index == -1:
+                held = _partial_tag_length(text[position:], tag)
+                end = len(text) - held
+                self._emit(events, text[position:end])
+                self._pending = text[end:]
+                break
+
+            self._emit(events, text[position:index])
+            self.in_think = not self.in_think
+            events.append((THINK_START if self.in_think else THINK_END, ""))
+            position = index + len(tag)
+
+        return events
+
+    def close(self) -> List[Event]:
+        """Flush text held back as a possible tag at the end of the stream."""
+        events: List[Event] = []
+        self._emit(events, self._pending)
+        self._pending = ""
+        return events
+
+    def _emit(self, events: List[Event], text: str) -> None:
+        if text:
+            events.append((REASONING if self.in_think else ANSWER, text))
+
+
+@lru_cache(maxsize=512)
+def split_thinking(content: str) -> Tuple[Event, ...]:
+    """
+    Split a complete message into merged reasoning and answer segments.
+
+    Results are cached because stored messages are re-rendered on every rerun.
+
+    Args:
+        content: Full message text
+
+    Returns:
+        tuple: (REASONING or ANSWER, text) segments in order
+    """
+    parser = ThinkStreamParser()
+    segments: List[List[str]] = []
+    for kind, text in parser.feed(content) + parser.close():
+        if kind not in (REASONING, ANSWER):
+            continue
+        if segments and segments[-1][0] == kind:
+            segments[-1][1] += text
+        else:
+            segments.append([kind, text])
+    return tuple((kind, text) for kind, text in segments)
+
+
+def answer_text(content: str) -> str:
+    """Return a message without its reasoning sections."""
+    if not content:
+        return ""
+    if OPEN_TAG not in content:
+        return content
+    return "".join(
+        text for kind, text in split_thinking(content) if kind == ANSWER
+    ).strip()
+
+
+def format_thinking_section(reasoning: str, expanded: bool = False) -> str:
+    """Render reasoning as a collapsible HTML block."""
+    return f"""<details class="thinking-details"{" open" if expanded else ""}>
+                <summary>💭 Thinking Process</summary>
+                <div class="thinking-content">
+                    <div class="thinking-text">{reasoning.strip() or "🤔 Thinking..."}</div>
+                </div>
+            </details>"""
+
+
+def format_segments(segments: List[Event], thinking: bool = False) -> str:
+    """
+    Render reasoning and answer segments as Markdown with HTML thinking blocks.
+
+    Args:
+        segments: (REASONING or ANSWER, text) pairs
+        thinking: Whether the last reasoning block is still streaming (shown expanded)
+
+    Returns:
+        str: Markdown to display with ``unsafe_allow_html=True``
+    """
+    parts = []
+    for i, (kind, text) in enumerate(segments):
+        if kind == REASONING:
+            parts.append(
+                format_thinking_section(text, thinking and i == len(segments) - 1)
+            )
+        elif text.strip():
+            parts.append(text.strip())
+    return "\n\n".join(parts)
@@ -0,0 +1,134 @@
+"""Per-turn timing breakdown shared between the chat page and the engines."""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from src.utils.metrics import metrics
+from src.utils.token_counter import count_tokens
+from src.utils.tracing import record_span, span
+
+# Stage names used across the engines
+PROMPT_ASSEMBLY = "Prompt assembly"
+TOOL_ARGUMENTS = "Tool argument streaming"
+SEARCH_REQUEST = "Search request"
+TIME_TO_FIRST_TOKEN = "Time to first token"
+STREAM_TIME = "Stream time"
+PERSISTENCE = "Persistence"
+TOTAL = "Total turn"
+
+_current_timer: contextvars.ContextVar[Optional["TurnTimer"]] = contextvars.ContextVar(
+    "turn_timer", default=None
+)
+
+
+def delta_text(chunk: Any) -> str:
+    """Return the text carried by an OpenAI streaming chunk, or an empty string."""
+    if isinstance(chunk, str):
+        return chunk
+    try:
+        return chunk.choices[0].delta.content or ""
+    except (AttributeError, IndexError, TypeError):
+        return ""
+
+
+class TurnTimer:
+    """Collect stage durations, time-to-first-token and token throughput for one turn."""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._first_token: Optional[float] = None
+        self._last_token: Optional[float] = None
+        self.tokens = 0
+        self.times: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add a duration to a stage (stages that run twice are summed)."""
+        self.times[name] = self.times.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as a named stage and as a span of the active trace."""
+        started = time.perf_counter()
+        try:
+            with span(name):
+                yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def on_token(self, text: str) -> None:
+        """Count the tokens of streamed text; the first call sets time-to-first-token."""
+        now = time.perf_counter()
+        if self._first_token is None:
+            self._first_token = now
+            self.times[TIME_TO_FIRST_TOKEN] = now - self._start
+        self._last_token = now
+        self.tokens += count_tokens(text)
+
+    def track_stream(self, stream: Iterable[Any]) -> Iterator[Any]:
+        """
+        Pass an OpenAI stream through unchanged while timing it.
+
+        Args:
+            stream: An iterable of streaming chunks
+
+        Yields:
+            The original chunks
+        """
+        started = time.perf_counter()
+        tokens_before = self.tokens
+        try:
+            for chunk in stream:
+                text = delta_text(chunk)
+                if text:
+                    self.on_token(text)
+                yield chunk
+        finally:
+            elapsed = time.perf_counter() - started
+            self.record(STREAM_TIME, elapsed)
+            record_span(STREAM_TIME, elapsed, tokens=self.tokens - tokens_before)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the timing breakdown of the turn so far.
+
+        Returns:
+            dict: "stages" (seconds per stage), "tokens" and "tokens_per_second"
+        """
+        stages = dict(self.times)
+        stages[TOTAL] = time.perf_counter() - self._start
+
+        tokens_per_second = None
+        if self._first_token is not None and self._last_token > self._first_token:
+            tokens_per_second = self.tokens / (self._last_token - self._first_token)
+
+        return {
+            "stages": stages,
+            "tokens": self.tokens,
+            "tokens_per_second": tokens_per_second,
+        }
+
+
+def start_turn_timer() -> TurnTimer:
+    """Start timing a new turn and make it the current timer for this context."""
+    timer = TurnTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+def get_turn_timer() -> TurnTimer:
+    """Return the timer of the current turn (a detached one if no turn is active)."""
+    timer = _current_timer.get()
+    return timer if timer is not None else TurnTimer()
+
+
+def record_turn_metrics(mode: str, summary: Dict[str, Any]) -> None:
+    """Push a finished turn's timing breakdown into the metrics store."""
+    for stage, seconds in summary["stages"].items():
+        metrics.observe("turn_stage_seconds", seconds, stage=stage)
+    metrics.observe("turn_seconds", summary["stages"][TOTAL], mode=mode)
+    if summary["tokens_per_second"]:
+        metrics.observe("tokens_per_second", summary["tokens_per_second"], mode=mode)
+    metrics.increment("turns", mode=mode)
+    metrics.record_event("turn", {"mode": mode, **summary})
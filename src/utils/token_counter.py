@@ -0,0 +1,82 @@
+"""Token counting for context budgets, with tiktoken when available."""
+
+import math
+import os
+import re
+from typing import Any, Dict
+
+from src.utils.logger import Logger
+
+logger = Logger("token_counter")
+
+# Default number of prompt tokens spent on chat history
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "8000"))
+
+# Formatting overhead of one chat message (role and separators)
+MESSAGE_OVERHEAD = 4
+
+# Safety margin applied to the estimator, which errs on the high side
+ESTIMATE_SCALE = float(os.environ.get("TOKEN_ESTIMATE_SCALE", "1.1"))
+
+_WORD_RE = re.compile(r"[぀-ヿ㐀-鿿가-힯]|\w+|[^\w\s]")
+
+
+def _load_encoding():
+    """Return a tiktoken encoding, or None when tiktoken or its data is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.info(f"tiktoken unavailable, using the token estimator: {str(e)}")
+        return None
+
+
+_encoding = _load_encoding()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text without a tokenizer.
+
+    Calibrated against BPE tokenizers: CJK characters and punctuation are about one
+    token each, ASCII words about four characters per token and words with
+    diacritics (e.g. Vietnamese syllables) about 2.5 characters per token.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        int: Estimated number of tokens
+    """
+    total = 0.0
+    for piece in _WORD_RE.findall(text or ""):
+        if len(piece) == 1:
+            total += 1
+        elif piece.isascii():
+            total += math.ceil(len(piece) / 4)
+        else:
+            total += math.ceil(len(piece) / 2.5)
+    return math.ceil(total * ESTIMATE_SCALE)
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of text with tiktoken, or estimate them."""
+    if _encoding is not None:
+        return len(_encoding.encode(text or "", disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """
+    Return the token count of a chat message, computing and storing it on first use.
+
+    Args:
+        message: A message dict; its "tokens" field is filled in if missing
+
+    Returns:
+        int: Tokens of the content plus the per-message overhead
+    """
+    if "tokens" not in message:
+        message["tokens"] = count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+    return message["tokens"]
@@ -0,0 +1,202 @@
+"""Lightweight in-process tracing: one trace ID per chat turn and nested spans."""
+
+import contextvars
+import functools
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.utils.logger import Logger
+from src.utils.metrics import metrics
+
+logger = Logger("tracing")
+slow_turn_logger = Logger("slow_turns")
+
+# Turns slower than this (in seconds) are logged with their full span tree
+SLOW_TURN_THRESHOLD = float(os.environ.get("SLOW_TURN_THRESHOLD", "20"))
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    """A timed operation inside a trace."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.children: List["Span"] = []
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+        if parent is not None:
+            parent.children.append(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach a key/value pair to the span."""
+        self.attributes[key] = value
+
+    def finish(self, duration: Optional[float] = None) -> None:
+        """Close the span, optionally with an externally measured duration."""
+        self.duration = (
+            duration if duration is not None else time.perf_counter() - self._started
+        )
+
+    def to_dict(self, include_children: bool = False) -> Dict[str, Any]:
+        """Serialize the span (and optionally its subtree) for JSON export."""
+        data = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "span_name": self.name,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_children:
+            data["children"] = [child.to_dict(True) for child in self.children]
+        return data
+
+    def walk(self) -> Iterator["Span"]:
+        """Yield this span and all of its descendants."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def current_span() -> Optional[Span]:
+    """Return the active span, or None outside of a trace."""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Return the trace ID of the active turn, or None outside of a trace."""
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+
+def _export(root: Span) -> None:
+    """Write every span of a finished trace as one JSON log line (kept with LOG_LEVEL=DEBUG)."""
+    for item in root.walk():
+        logger.debug(f"span {item.name}", extra=item.to_dict())
+
+    if root.duration is not None and root.duration >= SLOW_TURN_THRESHOLD:
+        tree = root.to_dict(include_children=True)
+        slow_turn_logger.warning(
+            f"Slow turn: {root.duration:.2f}s (threshold {SLOW_TURN_THRESHOLD:.0f}s)",
+            extra=tree,
+        )
+        metrics.record_event("slow_turn", tree)
+
+
+@contextmanager
+def start_trace(name: str = "chat_turn", **attributes) -> Iterator[Span]:
+    """
+    Start a new trace with its own trace ID and make its root span current.
+
+    The spans are exported when the trace ends; slow traces are logged in full.
+
+    Args:
+        name: Name of the root span
+        **attributes: Attributes attached to the root span
+
+    Yields:
+        Span: The root span
+    """
+    root = Span(name, _new_id(), attributes=attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.status = "error"
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.finish()
+        _current_span.reset(token)
+        _export(root)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time the enclosed block as a child of the active span.
+
+    Outside of a trace this is a no-op that yields None.
+
+    Args:
+        name: Name of the span
+        **attributes: Attributes attached to the span
+
+    Yields:
+        Span or None: The new span
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, parent.trace_id, parent, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.status = "error"
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def record_span(name: str, duration: float, **attributes) -> None:
+    """Attach an already measured operation (such as a consumed stream) to the active span."""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    child = Span(name, parent.trace_id, parent, attributes)
+    child.start_time -= duration
+    child.finish(duration)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator that runs the function inside a span named after it.
+
+    Args:
+        name: Span name (default: the function's qualified name)
+    """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+_log_dir = tempfile.TemporaryDirectory(prefix="erpbot-logs-")
+
+
+def pytest_configure(config):
+    """Send the test run's logs to a temporary directory instead of the repo's logs/"""
+    # Read when src.utils.logger is first imported, i.e. while collecting tests
+    os.environ["LOG_FILE"] = os.path.join(_log_dir.name, "app.log")
+
+
+def pytest_unconfigure(config):
+    _log_dir.cleanup()
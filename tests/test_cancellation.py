@@ -0,0 +1,73 @@
+import pytest
+
+from src.utils.cancellation import cancellable, start_generation
+from src.utils.stream_renderer import StreamRenderer
+
+
+class FakeUpstream:
+    """An upstream stream that records whether it was closed"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakePlaceholder:
+    def markdown(self, text, unsafe_allow_html=False):
+        pass
+
+    def empty(self):
+        pass
+
+
+class RerunInterrupt(BaseException):
+    """Stands in for Streamlit's rerun/stop control exceptions"""
+
+
+def test_interrupted_generation_closes_upstream_and_keeps_partial_text():
+    """A run stopped mid-stream closes its streams and keeps the rendered text"""
+    upstream = FakeUpstream()
+    generation = start_generation("session-a")
+
+    with pytest.raises(RerunInterrupt):
+        with generation:
+            cancellable(upstream)
+            renderer = StreamRenderer(FakePlaceholder(), fps=0)
+            renderer.write("partial ")
+            renderer.write("answer")
+            raise RerunInterrupt()
+
+    assert generation.interrupted
+    assert upstream.closed
+    assert generation.partial_text() == "partial answer"
+
+
+def test_new_generation_supersedes_the_previous_one():
+    """Starting a new generation for the same session cancels the old one"""
+    upstream = FakeUpstream()
+    first = start_generation("session-b")
+    first.register(upstream)
+
+    second = start_generation("session-b")
+
+    assert first.cancelled and first.reason == "superseded"
+    assert upstream.closed
+    assert not second.cancelled
+
+
+def test_cancelled_generation_stops_consuming_the_stream():
+    """The renderer stops reading once the generation is cancelled"""
+    generation = start_generation("session-c")
+
+    def stream():
+        yield "one "
+        generation.cancel("stopped")
+        yield "two"
+
+    with generation:
+        text = StreamRenderer(FakePlaceholder(), fps=0).consume(stream())
+
+    assert text == "one "
+    assert not generation.interrupted
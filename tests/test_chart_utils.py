@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.chart_utils import (
+    downsample_series,
+    lttb_downsample,
+    minmax_downsample,
+    paginate_dataframe,
+)
+
+
+def test_lttb_downsample_keeps_endpoints_and_size():
+    """LTTB returns exactly threshold points including first and last"""
+    x = np.arange(10_000)
+    y = np.sin(x / 100.0)
+
+    new_x, new_y = lttb_downsample(x, y, 200)
+
+    assert len(new_x) == 200
+    assert new_x[0] == 0
+    assert new_x[-1] == 9_999
+    assert np.all(np.diff(new_x) > 0)
+
+
+def test_minmax_downsample_preserves_spike():
+    """Min/max bucketing never drops the global extremes"""
+    y = np.zeros(10_000)
+    y[4321] = 100.0
+    y[777] = -50.0
+
+    new_x, new_y = minmax_downsample(np.arange(len(y)), y, 50)
+
+    assert len(new_x) <= 100
+    assert new_y.max() == 100.0
+    assert new_y.min() == -50.0
+
+
+def test_downsample_series_datetime_index():
+    """Datetime-indexed series keep their index type after downsampling"""
+    index = pd.date_range("2025-01-01", periods=5_000, freq="min")
+    series = pd.Series(np.random.default_rng(0).random(5_000), index=index)
+
+    result = downsample_series(series, 300)
+
+    assert len(result) == 300
+    assert isinstance(result.index, pd.DatetimeIndex)
+    assert result.index[0] == index[0]
+    assert result.index[-1] == index[-1]
+
+
+def test_paginate_dataframe_clamps_page():
+    """Pages outside the valid range are clamped"""
+    df = pd.DataFrame({"value": range(53)})
+
+    page_df, total_pages = paginate_dataframe(df, 10, 25)
+
+    assert total_pages == 3
+    assert list(page_df["value"]) == [50, 51, 52]
@@ -0,0 +1,46 @@
+import httpx
+
+from src.services.chat_client import ClientRegistry
+
+
+def test_clients_are_reused_per_provider():
+    """The same pooled client is returned for every call"""
+    registry = ClientRegistry()
+
+    assert registry.http_client("serper") is registry.http_client("serper")
+    assert registry.http_client("serper") is not registry.http_client("jina")
+    assert registry.llm_client("dashscope", "key") is registry.llm_client(
+        "dashscope", "key"
+    )
+
+    registry.close_all()
+
+
+def test_pool_stats_count_requests():
+    """Requests through a pooled client show up in the pool metrics"""
+    registry = ClientRegistry()
+    client = registry.http_client("serper")
+    client._transport = httpx.MockTransport(lambda request: httpx.Response(200))
+
+    for _ in range(3):
+        client.get("https://google.serper.dev/search")
+
+    stats = registry.pool_stats()["serper"]
+    assert stats["requests"] == 3
+    assert stats["reuse_ratio"] == 1.0
+    # A mocked transport has no connection pool to read
+    assert stats["connections_open"] is None
+
+    registry.close_all()
+
+
+def test_pool_stats_report_open_connections():
+    """A fresh pooled client reports its (empty) connection pool"""
+    registry = ClientRegistry()
+    registry.http_client("jina")
+
+    stats = registry.pool_stats()["jina"]
+    assert stats["connections_open"] == 0
+    assert stats["connections_in_use"] == 0
+
+    registry.close_all()
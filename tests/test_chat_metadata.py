@@ -0,0 +1,95 @@
+import json
+import types
+
+from src.utils.chat_metadata import MetadataBatcher, parse_metadata_reply
+
+
+class FakeClient:
+    """Titles every conversation of a batch in one reply"""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = types.SimpleNamespace(
+            completions=types.SimpleNamespace(create=self.create)
+        )
+
+    def create(self, model, messages, **kwargs):
+        self.requests.append(messages[-1]["content"])
+        count = messages[-1]["content"].count("### Conversation")
+        items = [
+            {"id": i, "title": f'"Title {i}"', "summary": f"Summary {i}."}
+            for i in range(1, count + 1)
+        ]
+        content = f"Here you go:\n{json.dumps(items)}"
+        choice = types.SimpleNamespace(message=types.SimpleNamespace(content=content))
+        return types.SimpleNamespace(choices=[choice])
+
+
+def _chat(turns):
+    messages = []
+    for i in range(turns):
+        messages += [
+            {"role": "user", "content": f"question {i}"},
+            {"role": "assistant", "content": f"<think>...</think>answer {i}"},
+        ]
+    return messages
+
+
+def _batcher(tmp_path):
+    # A long wait keeps the background thread from taking the batch first
+    return MetadataBatcher(path=str(tmp_path / "metadata.json"), batch_wait=60)
+
+
+def test_pending_chats_are_titled_in_one_request(tmp_path):
+    """Three chats need a single request; the results are written to the store"""
+    batcher = _batcher(tmp_path)
+    client = FakeClient()
+    for name in ("New Chat_a", "New Chat_b", "New Chat_c"):
+        assert batcher.submit(client, "user", name, _chat(1))
+
+    assert batcher.flush() == 3
+    assert len(client.requests) == 1
+    # Reasoning is not sent to the model
+    assert "<think>" not in client.requests[0]
+
+    stored = json.loads((tmp_path / "metadata.json").read_text())
+    assert stored["b"] == {**stored["b"], "title": "Title 2", "messages": 2}
+    # A new batcher (process) reads the store back
+    assert _batcher(tmp_path).get("Renamed_c")["summary"] == "Summary 3."
+
+
+def test_summary_is_refreshed_only_after_enough_new_messages(tmp_path):
+    batcher = _batcher(tmp_path)
+    client = FakeClient()
+    batcher.submit(client, "user", "New Chat_a", _chat(1))
+    batcher.flush()
+
+    assert not batcher.submit(client, "user", "New Chat_a", _chat(2))
+    assert batcher.submit(client, "user", "New Chat_a", _chat(4))
+    batcher.forget("New Chat_a")
+    assert batcher.flush() == 0
+    assert batcher.get("New Chat_a") is None
+
+
+def test_chats_of_different_users_are_never_batched_together(tmp_path):
+    """Each request only holds one user's conversations"""
+    batcher = _batcher(tmp_path)
+    client = FakeClient()
+    batcher.submit(client, "alice", "New Chat_a", _chat(1))
+    batcher.submit(client, "bob", "New Chat_b", _chat(2))
+    batcher.submit(client, "alice", "New Chat_c", _chat(3))
+
+    assert batcher.flush() == 3
+    assert [request.count("### Conversation") for request in client.requests] == [
+        2,
+        1,
+    ]
+    assert batcher.get("New Chat_b")["messages"] == 4
+
+
+def test_reply_parsing_ignores_surrounding_text_and_bad_json():
+    assert parse_metadata_reply('```json\n[{"id": 1, "title": "A"}, 3]\n```') == [
+        {"id": 1, "title": "A"}
+    ]
+    assert parse_metadata_reply("[{oops}]") == []
+    assert parse_metadata_reply("no array") == []
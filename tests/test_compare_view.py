@@ -0,0 +1,27 @@
+from src.ui_components.compare_view import compare_stats_text
+
+
+def test_stats_text_lists_what_was_measured():
+    """Missing measurements (no token streamed, no model) are left out"""
+    answer = {
+        "mode": "Default",
+        "model": "qwen2.5-7b-instruct",
+        "timings": {
+            "stages": {"Time to first token": 0.42, "Total turn": 3.25},
+            "tokens": 120,
+            "tokens_per_second": 42.4,
+        },
+    }
+    failed = {
+        "mode": "Grounding Truth with Google",
+        "timings": {
+            "stages": {"Total turn": 0.5},
+            "tokens": 0,
+            "tokens_per_second": None,
+        },
+    }
+
+    assert compare_stats_text(answer) == (
+        "⏱️ 3.2s · first token 0.4s · 120 tokens · 42 tokens/s · qwen2.5-7b-instruct"
+    )
+    assert compare_stats_text(failed) == "⏱️ 0.5s"
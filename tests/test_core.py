@@ -20,8 +20,10 @@ def test_chat_with_default_success():
     mock_stream = MockStream([{"choices": [{"delta": {"content": "test response"}}]}])
     mock_client.chat.completions.create.return_value = mock_stream
 
-    # Mock streamlit's write_stream
-    with mock.patch("streamlit.write_stream", return_value="test response"):
+    # Mock the frame-rate-limited stream renderer
+    with mock.patch(
+        "src.core.chat_default.render_stream", return_value="test response"
+    ):
         # Test input
         test_prompt = "Hello"
         test_history = [
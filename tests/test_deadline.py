@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from src.core.chat_deep_research import reasoning_effort
+from src.utils.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    current_deadline,
+    start_deadline,
+)
+from src.utils.metrics import metrics
+
+
+def test_stage_timeouts_are_capped_by_the_remaining_budget():
+    """A stage gets its own timeout or what is left of the turn, whichever is less"""
+    deadline = Deadline(10)
+
+    assert deadline.timeout(60) == pytest.approx(10, abs=0.5)
+    assert deadline.timeout(2) == 2
+    assert deadline.timeout_kwargs()["timeout"] == pytest.approx(10, abs=0.5)
+    assert deadline.allows(5) and not deadline.allows(30)
+
+
+def test_spent_budget_raises_instead_of_starting_a_stage():
+    """With less than a second left no request is started"""
+    deadline = Deadline(0.5)
+
+    assert deadline.expired
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(30)
+
+
+def test_reserve_keeps_time_for_later_stages():
+    """A reserved deadline ends earlier and records degradations on its parent"""
+    deadline = Deadline(20)
+    search = deadline.reserve(15)
+
+    assert search.timeout(30) == pytest.approx(5, abs=0.5)
+    search.degrade("search", "timed_out")
+
+    assert deadline.degradations == [{"stage": "search", "action": "timed_out"}]
+    assert metrics.counters()["turn_degradations{action=timed_out,stage=search}"] >= 1
+
+
+def test_deadline_is_only_set_inside_a_turn():
+    """Outside a turn stages keep their own timeouts; the turn's outcome is counted"""
+    assert current_deadline().timeout(30) == 30
+    assert current_deadline().timeout_kwargs() == {}
+
+    before = metrics.counters().get("turn_deadlines{result=missed}", 0)
+    with start_deadline(0.05) as deadline:
+        assert current_deadline() is deadline
+        time.sleep(0.1)
+    assert current_deadline().remaining() is None
+    assert metrics.counters()["turn_deadlines{result=missed}"] == before + 1
+
+
+def test_deep_research_effort_follows_the_time_left():
+    """Background jobs research in depth; short turns lower the reasoning effort"""
+    assert reasoning_effort(None) == "high"
+    assert reasoning_effort(900) == "high"
+    assert reasoning_effort(300) == "medium"
+    assert reasoning_effort(60) == "low"
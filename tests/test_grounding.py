@@ -0,0 +1,74 @@
+import json
+import unittest.mock as mock
+
+import httpx
+
+import src.core.chat_grd_w_gg as grounding
+import src.services.sse_client as sse_client
+from src.core.chat_grd_w_gg import build_gemini_contents, google_grounding_search
+
+
+def test_history_is_converted_to_alternating_gemini_turns():
+    """System prompts become the system instruction; reasoning is dropped"""
+    history = [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "Who won?"},
+        {"role": "assistant", "content": "<think>hmm</think>Team A"},
+        {"role": "user", "content": "By how much?"},
+    ]
+
+    contents, system_instruction = build_gemini_contents("By how much?", history)
+
+    assert system_instruction == {"parts": [{"text": "Be brief."}]}
+    assert [c["role"] for c in contents] == ["user", "model", "user"]
+    assert contents[1]["parts"][0]["text"] == "Team A"
+    assert contents[-1]["parts"][0]["text"] == "By how much?"
+
+
+def test_history_outside_the_budget_is_dropped():
+    """Only the newest turns that fit the token budget are sent"""
+    history = [{"role": "user", "content": "old " * 5000}] + [
+        {"role": "assistant", "content": "answer"},
+        {"role": "user", "content": "latest"},
+    ]
+
+    contents, _ = build_gemini_contents("latest", history)
+
+    assert [c["parts"][0]["text"] for c in contents] == ["answer", "latest"]
+
+
+def test_answer_is_streamed_and_grounding_metadata_kept():
+    """Text parts are rendered as they arrive; metadata comes with the last chunk"""
+    metadata = {
+        "groundingChunks": [{"web": {"uri": "https://a.example", "title": "A"}}]
+    }
+    events = [
+        {"candidates": [{"content": {"parts": [{"text": "Hanoi is "}]}}]},
+        {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": "sunny."}]},
+                    "groundingMetadata": metadata,
+                }
+            ]
+        },
+    ]
+    body = "".join(f"data: {json.dumps(event)}\r\n\r\n" for event in events)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, text=body)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    with mock.patch.object(sse_client, "get_http_client", return_value=client):
+        with mock.patch.object(grounding, "render_grounding_sources") as sources:
+            text = google_grounding_search(
+                None, "Weather?", [{"role": "user", "content": "Weather?"}], "key"
+            )
+
+    assert text == "Hanoi is sunny."
+    assert ":streamGenerateContent" in str(requests[0].url)
+    assert "key" not in requests[0].url.params
+    assert requests[0].headers["x-goog-api-key"] == "key"
+    sources.assert_called_once_with(metadata)
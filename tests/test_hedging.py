@@ -0,0 +1,127 @@
+import contextvars
+import threading
+import time
+
+from src.services.hedging import HedgeBudget, HedgedStream
+
+
+class FakeEndpoint:
+    def __init__(self, name):
+        self.name = name
+        self.failures = []
+
+    def record_success(self, latency):
+        pass
+
+    def record_failure(self, error):
+        self.failures.append(error)
+
+
+class SlowStream:
+    """Yields its chunks after a delay and records whether it was closed"""
+
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        time.sleep(self.delay)
+        for chunk in self.chunks:
+            if self.closed.is_set():
+                return
+            yield chunk
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeSlot:
+    def __init__(self):
+        self.released = threading.Event()
+
+    def release(self):
+        self.released.set()
+
+
+def _hedged(streams, delay, budget=None, acquire_slot=None, open_stream=None):
+    targets = [(FakeEndpoint(name), "model") for name in streams]
+    return HedgedStream(
+        open_stream or (lambda endpoint, model: streams[endpoint.name]),
+        targets,
+        delay,
+        lambda error: True,
+        budget or HedgeBudget(max_rate=1.0),
+        acquire_slot,
+    )
+
+
+def test_slow_primary_loses_to_the_hedge():
+    """A backup request wins the race and the slow request is closed"""
+    primary = SlowStream(["slow"], delay=0.5)
+    backup = SlowStream(["fast-1", "fast-2"])
+    stream = _hedged({"primary": primary, "backup": backup}, delay=0.05)
+
+    assert list(stream) == ["fast-1", "fast-2"]
+    assert stream.hedged
+    assert primary.closed.wait(1)
+
+
+def test_fast_primary_is_not_hedged():
+    """No backup request is sent when the first token arrives in time"""
+    backup = SlowStream(["unused"])
+    stream = _hedged({"primary": SlowStream(["a", "b"]), "backup": backup}, delay=1)
+
+    assert list(stream) == ["a", "b"]
+    assert not stream.hedged
+    assert backup.closed.is_set() is False
+
+
+def test_budget_caps_the_hedge_rate():
+    """At most max_rate of recent requests are hedged"""
+    budget = HedgeBudget(max_rate=0.25, window=8)
+    for _ in range(3):
+        budget.record(False)
+
+    assert budget.allow()
+    budget.record(True)
+    assert not budget.allow()
+
+
+def test_requests_run_in_the_callers_context():
+    """Each attempt sees the caller's context variables, e.g. its generation"""
+    turn = contextvars.ContextVar("turn", default=None)
+    seen = []
+    streams = {"primary": SlowStream(["slow"], delay=0.5), "backup": SlowStream(["b"])}
+
+    def open_stream(endpoint, model):
+        seen.append(turn.get())
+        return streams[endpoint.name]
+
+    turn.set("turn-1")
+    stream = _hedged(streams, delay=0.05, open_stream=open_stream)
+
+    assert list(stream) == ["b"]
+    assert seen == ["turn-1", "turn-1"]
+
+
+def test_hedge_takes_its_own_slot():
+    """A hedge is sent only with a free slot, which is released when it ends"""
+    primary = SlowStream(["slow"], delay=0.2)
+    stream = _hedged(
+        {"primary": primary, "backup": SlowStream(["unused"])},
+        delay=0.05,
+        acquire_slot=lambda endpoint: None,
+    )
+    assert list(stream) == ["slow"]
+    assert not stream.hedged
+
+    slot = FakeSlot()
+    stream = _hedged(
+        {"primary": SlowStream(["slow"], delay=0.5), "backup": SlowStream(["fast"])},
+        delay=0.05,
+        acquire_slot=lambda endpoint: slot,
+    )
+    assert list(stream) == ["fast"]
+    assert stream.hedged
+    assert slot.released.is_set()
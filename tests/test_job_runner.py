@@ -0,0 +1,166 @@
+import json
+import threading
+
+import pytest
+
+import src.services.job_runner as job_runner_module
+import src.utils.history_manager as history_manager
+from src.services.job_runner import (
+    CANCELLED,
+    DONE,
+    FAILED,
+    Job,
+    JobLimitError,
+    JobRunner,
+)
+
+
+@pytest.fixture(autouse=True)
+def jobs_path(tmp_path, monkeypatch):
+    """Keep job records in a temporary store"""
+    path = tmp_path / "jobs"
+    monkeypatch.setattr(job_runner_module, "JOBS_PATH", str(path))
+    monkeypatch.setattr(history_manager, "LEGACY_HISTORY_PATH", str(tmp_path))
+    return path
+
+
+def _wait(job, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if job.finished:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_streams_into_the_store(jobs_path):
+    """Text and progress are kept on the job and written to disk"""
+    runner = JobRunner(max_concurrent=2, max_per_user=1)
+
+    def work(job, words):
+        for word in words:
+            job.append_text(word)
+        job.set_progress(visited_urls=["https://a.example"])
+        return job.text
+
+    job = runner.submit("user", "chat", "Deep-Research", "q", work, ["a ", "b"])
+    _wait(job)
+
+    assert job.status == DONE
+    assert job.text == "a b"
+    stored = json.loads((jobs_path / f"{job.id}.json").read_text())
+    assert stored["text"] == "a b"
+    assert stored["progress"]["visited_urls"] == ["https://a.example"]
+    assert runner.jobs_for_chat("chat") == [job]
+
+
+def test_per_user_limit_and_cancel():
+    """A second job for the same user is refused until the first one ends"""
+    runner = JobRunner(max_concurrent=2, max_per_user=1)
+    started = threading.Event()
+
+    def work(job):
+        job.append_text("partial")
+        started.set()
+        while not job.cancelled:
+            threading.Event().wait(0.01)
+        return job.text
+
+    job = runner.submit("user", "chat", "Deep-Research", "q", work)
+    started.wait(5)
+
+    with pytest.raises(JobLimitError):
+        runner.submit("user", "chat", "Deep-Research", "q2", work)
+    # Other users are not affected
+    other = runner.submit("someone-else", "other-chat", "Deep-Research", "q", work)
+
+    assert runner.cancel_chat_jobs("chat") == 1
+    runner.cancel_chat_jobs("other-chat")
+    _wait(job)
+    _wait(other)
+    assert job.status == CANCELLED
+    assert job.text == "partial"
+
+
+def test_unfinished_jobs_of_a_previous_process_are_failed(jobs_path):
+    """After a restart, a job that was running is reported with its partial text"""
+    jobs_path.mkdir()
+    record = {
+        "id": "abc",
+        "user": "user",
+        "chat_key": "chat",
+        "mode": "Deep-Research",
+        "prompt": "q",
+        "status": "running",
+        "text": "half an answer",
+    }
+    (jobs_path / "abc.json").write_text(json.dumps(record))
+
+    runner = JobRunner()
+    (job,) = runner.jobs_for_chat("chat")
+
+    assert job.status == FAILED and job.text == "half an answer"
+    runner.mark_delivered(job)
+    assert not (jobs_path / "abc.json").exists()
+    assert runner.jobs_for_chat("chat") == []
+
+
+def test_job_reports_finished_only_after_it_is_saved(jobs_path, monkeypatch):
+    """A page polling the job never sees it finished before its final record is on disk"""
+    writes = []
+    write = Job._write
+
+    def recording_write(job, record):
+        writes.append((record["status"], job.finished))
+        write(job, record)
+
+    monkeypatch.setattr(Job, "_write", recording_write)
+    runner = JobRunner()
+    job = runner.submit("user", "chat", "Deep-Research", "q", lambda job: "answer")
+    _wait(job)
+
+    assert (DONE, False) in writes
+    assert all(not finished for _, finished in writes)
+    stored = json.loads((jobs_path / f"{job.id}.json").read_text())
+    assert stored["status"] == DONE
+
+
+def test_save_after_delivery_does_not_recreate_the_job(jobs_path):
+    """A late save from the work thread must not bring back a delivered job's file"""
+    runner = JobRunner()
+    job = runner.submit("user", "chat", "Deep-Research", "q", lambda job: "answer")
+    _wait(job)
+    assert (jobs_path / f"{job.id}.json").exists()
+
+    runner.mark_delivered(job)
+    job.append_text(" more")
+    job.save(force=True)
+
+    assert not (jobs_path / f"{job.id}.json").exists()
+
+
+def test_finished_job_is_saved_to_its_chat(tmp_path):
+    """The answer reaches the chat file even if no page is open to deliver it"""
+    history_manager.save_legacy_chat(
+        "Renamed chat_chat", [{"role": "user", "content": "q"}], {}, {}
+    )
+    runner = JobRunner()
+    job = runner.submit("user", "chat", "Deep-Research", "q", lambda job: "answer")
+    _wait(job)
+
+    history = history_manager.load_legacy_chat("Renamed chat_chat")["history"]
+    assert history[-1]["content"] == "answer"
+    assert history[-1]["job_id"] == job.id
+    assert not history[-1]["stopped"]
+
+
+def test_expired_jobs_are_pruned(jobs_path, monkeypatch):
+    """Finished jobs nobody picked up are dropped after JOB_RETENTION"""
+    runner = JobRunner()
+    job = runner.submit("user", "chat", "Deep-Research", "q", lambda job: "answer")
+    _wait(job)
+    assert runner.jobs_for_chat("chat") == [job]
+
+    monkeypatch.setattr(job_runner_module, "JOB_RETENTION", -1)
+
+    assert runner.jobs_for_chat("chat") == []
+    assert not (jobs_path / f"{job.id}.json").exists()
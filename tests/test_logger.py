@@ -0,0 +1,36 @@
+import logging
+
+from src.utils.logger import (
+    LOG_SAMPLE_PER_SECOND,
+    BatchingRotatingFileHandler,
+    CustomJsonFormatter,
+    Logger,
+)
+
+
+def _record(message):
+    return logging.LogRecord(
+        "erpbot-test", logging.INFO, __file__, 1, message, None, None
+    )
+
+
+def test_batching_handler_writes_batch_and_rotates(tmp_path):
+    """A batch is written in one go and the file rotates by size"""
+    log_file = tmp_path / "app.log"
+    handler = BatchingRotatingFileHandler(log_file, maxBytes=2_000, backupCount=2)
+    handler.setFormatter(CustomJsonFormatter())
+
+    handler.emit_batch([_record(f"line {i}") for i in range(10)])
+    assert len(log_file.read_text().splitlines()) == 10
+
+    handler.emit_batch([_record("x" * 500) for _ in range(5)])
+    handler.close()
+
+    assert (tmp_path / "app.log.1").exists()
+
+
+def test_sampled_records_are_rate_limited():
+    """Records sharing a sample key are capped per second"""
+    allowed = sum(Logger._allow_sample("test-chunk") for _ in range(1_000))
+
+    assert allowed <= LOG_SAMPLE_PER_SECOND + 1
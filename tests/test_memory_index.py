@@ -0,0 +1,81 @@
+import src.utils.memory_index as memory_index
+from src.utils.memory_index import (
+    BM25Index,
+    ChatMemory,
+    forget_chat,
+    is_indexed,
+    retrieve_memories,
+    update_chat_memory,
+)
+
+
+def _chat():
+    return [
+        {"role": "user", "content": "My cat is called Miso and she is three"},
+        {"role": "assistant", "content": "Miso is a lovely name for a cat!"},
+        {"role": "user", "content": "What is the capital of France?"},
+        {"role": "assistant", "content": "Paris."},
+        {"role": "user", "content": "Write a haiku about autumn"},
+        {"role": "assistant", "content": "Leaves fall quietly..."},
+        {"role": "user", "content": "How old is my cat Miso again?"},
+    ]
+
+
+def test_bm25_ranks_matching_documents_first():
+    """Documents sharing rare terms with the query score highest"""
+    index = BM25Index()
+    index.add("a", "python streamlit caching tutorial")
+    index.add("b", "weather forecast for hanoi")
+    index.add("c", "giá vàng hôm nay tại hà nội")
+
+    assert index.search("streamlit caching")[0][0] == "a"
+    assert index.search("giá vàng")[0][0] == "c"
+    assert index.search("unrelated words") == []
+
+
+def test_turns_are_indexed_incrementally():
+    """Only complete new turns are added on each update"""
+    memory = ChatMemory()
+    messages = _chat()
+
+    memory.update(messages)
+    assert sorted(memory.turns) == [0, 2, 4]
+    assert memory.indexed == 6
+
+    messages.append({"role": "assistant", "content": "Miso is three."})
+    memory.update(messages)
+    assert sorted(memory.turns) == [0, 2, 4, 6]
+
+
+def test_retrieval_skips_turns_still_in_the_window():
+    """Only turns before the verbatim window are recalled"""
+    chat = "Memory chat_44444444"
+    messages = _chat()
+    update_chat_memory(chat, messages)
+
+    recalled = retrieve_memories(messages[-1]["content"], chat, 4, 1000, min_score=0)
+    assert recalled[0]["turn"][0]["content"].startswith("My cat is called Miso")
+
+    assert retrieve_memories(messages[-1]["content"], chat, 0, 1000, min_score=0) == []
+
+
+def test_retrieval_respects_token_budget():
+    """Turns that do not fit the budget are left out"""
+    chat = "Memory chat_55555555"
+    messages = _chat()
+    update_chat_memory(chat, messages)
+
+    assert retrieve_memories(messages[-1]["content"], chat, 6, 5, min_score=0) == []
+
+
+def test_indexes_are_bounded_and_forgotten(monkeypatch):
+    """The least recently used index is dropped, and a deleted chat's at once"""
+    monkeypatch.setattr(memory_index, "MEMORY_MAX_CHATS", 2)
+    for name in ("Bounded_aaaa", "Bounded_bbbb", "Bounded_cccc"):
+        update_chat_memory(name, _chat())
+
+    assert not is_indexed("Bounded_aaaa")
+    assert is_indexed("Bounded_bbbb")
+
+    forget_chat("Bounded_cccc")
+    assert not is_indexed("Bounded_cccc")
@@ -0,0 +1,58 @@
+import sys
+
+import src.utils.memory_profiler as memory_profiler
+from src.utils.memory_profiler import (
+    deep_sizeof,
+    forget_session,
+    get_session_reports,
+    record_session_memory,
+    session_label,
+    session_memory_report,
+)
+
+
+def test_deep_sizeof_counts_nested_content():
+    """Nested containers are measured recursively"""
+    history = [{"role": "user", "content": "x" * 10_000} for _ in range(10)]
+
+    assert deep_sizeof(history) > 100_000
+    assert deep_sizeof(history) > sys.getsizeof(history)
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    """An object referenced twice is only counted once"""
+    payload = "y" * 50_000
+
+    assert deep_sizeof([payload, payload]) < 2 * sys.getsizeof(payload)
+
+
+def test_session_memory_report_orders_keys_by_size():
+    """The largest session keys are listed first"""
+    state = {
+        "session_id": "abc",
+        "raw_search_response": "z" * 100_000,
+        "selection": "Default",
+    }
+
+    report = session_memory_report(state)
+
+    assert report["session_id"] == "abc"
+    assert next(iter(report["keys"])) == "raw_search_response"
+    assert report["total_bytes"] >= 100_000
+
+
+def test_reports_are_dropped_when_forgotten_or_stale(monkeypatch):
+    """Ended sessions and sessions no longer measured do not stay in the registry"""
+    record_session_memory({"session_id": "ended"}, force=True)
+    record_session_memory({"session_id": "idle"}, force=True)
+    forget_session("ended")
+    assert "ended" not in [report["session_id"] for report in get_session_reports()]
+
+    monkeypatch.setattr(memory_profiler, "MEMORY_REPORT_MAX_AGE", -1)
+    assert get_session_reports() == []
+
+
+def test_session_label_hides_the_session_id():
+    """The label is stable but does not contain the id"""
+    assert session_label("abc-123") == session_label("abc-123")
+    assert "abc-123" not in session_label("abc-123")
@@ -0,0 +1,45 @@
+from src.utils.metrics import MetricsStore
+
+
+def test_percentiles_of_a_series():
+    """Percentiles use the nearest rank of the sorted observations"""
+    store = MetricsStore()
+    for value in range(1, 101):
+        store.observe("latency", float(value), provider="a")
+
+    assert store.percentile("latency", 0, provider="a") == 1.0
+    assert store.percentile("latency", 50, provider="a") == 51.0
+    assert store.percentile("latency", 90, provider="a") == 90.0
+    assert store.percentile("latency", 100, provider="a") == 100.0
+    assert store.percentile("latency", 50, provider="b") is None
+
+
+def test_series_are_bounded_and_keyed_by_labels():
+    """Old samples are dropped and labels select separate series"""
+    store = MetricsStore(max_samples=3)
+    for value in range(5):
+        store.observe("tokens_per_second", value, mode="Default")
+    store.observe("tokens_per_second", 99, mode="ReAct")
+
+    assert [v for _, v in store.series("tokens_per_second", mode="Default")] == [
+        2,
+        3,
+        4,
+    ]
+    assert store.series_names() == [
+        "tokens_per_second{mode=Default}",
+        "tokens_per_second{mode=ReAct}",
+    ]
+
+
+def test_counters_and_events():
+    """Counters add up and events keep their name and data"""
+    store = MetricsStore(max_events=2)
+    store.increment("turns", mode="Default")
+    store.increment("turns", 2, mode="Default")
+    for i in range(3):
+        store.record_event("turn", {"i": i})
+
+    assert store.counters() == {"turns{mode=Default}": 3}
+    assert [event["i"] for event in store.events("turn")] == [1, 2]
+    assert store.events("other") == []
@@ -0,0 +1,111 @@
+import httpx
+import openai
+import pytest
+
+from src.services import model_router
+from src.services.model_router import (
+    DEFAULT_MODEL,
+    FAST_MODEL,
+    Endpoint,
+    ModelRouter,
+    RoutedClient,
+)
+
+
+class FakeCompletions:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error is not None:
+            raise self.error
+        if kwargs.get("stream"):
+            return iter(["chunk-1", "chunk-2"])
+        return "completion"
+
+
+class FakeClient:
+    def __init__(self, error=None):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = FakeCompletions(error)
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "http://test"))
+
+
+def _routed(monkeypatch, clients):
+    """A routed client over one endpoint per fake client, in the given order."""
+    endpoints = [Endpoint(name, base_url=f"http://{name}") for name in clients]
+    monkeypatch.setattr(
+        model_router,
+        "get_llm_client",
+        lambda provider, api_key, base_url: clients[provider],
+    )
+    router = ModelRouter(endpoints)
+    return router, RoutedClient(router, {})
+
+
+def test_short_chit_chat_goes_to_the_fast_model():
+    """Greetings use the small model; complex or long prompts use the large one"""
+    router = ModelRouter([Endpoint("main")])
+
+    assert router.choose_model([{"role": "user", "content": "hi there!"}]) == FAST_MODEL
+    assert (
+        router.choose_model([{"role": "user", "content": "Explain how DNS works"}])
+        == DEFAULT_MODEL
+    )
+    assert (
+        router.choose_model([{"role": "user", "content": "word " * 200}])
+        == DEFAULT_MODEL
+    )
+    assert (
+        router.choose_model([{"role": "user", "content": "hi"}], "qwen2.5-32b-instruct")
+        == "qwen2.5-32b-instruct"
+    )
+
+
+def test_failing_endpoint_fails_over_and_cools_down(monkeypatch):
+    """A connection error moves the request to the next endpoint"""
+    clients = {
+        "primary": FakeClient(error=_connection_error()),
+        "backup": FakeClient(),
+    }
+    router, client = _routed(monkeypatch, clients)
+
+    result = client.chat.completions.create(model=DEFAULT_MODEL, messages=[])
+
+    assert result == "completion"
+    primary, backup = router.endpoints
+    assert primary.failures == 1 and not primary.available()
+    assert backup.requests == 1
+    # The cooled-down endpoint is now tried last
+    assert router.candidates(DEFAULT_MODEL)[0] is backup
+
+
+def test_streams_report_time_to_first_chunk(monkeypatch):
+    """Streamed responses are passed through and update the latency average"""
+    router, client = _routed(monkeypatch, {"only": FakeClient()})
+
+    stream = client.chat.completions.create(model=DEFAULT_MODEL, stream=True)
+
+    assert list(stream) == ["chunk-1", "chunk-2"]
+    assert router.endpoints[0].latency is not None
+
+
+def test_bad_requests_are_not_retried_elsewhere(monkeypatch):
+    """Errors caused by the request itself are raised immediately"""
+    bad_request = openai.BadRequestError(
+        "bad",
+        response=httpx.Response(400, request=httpx.Request("POST", "http://test")),
+        body=None,
+    )
+    clients = {"primary": FakeClient(error=bad_request), "backup": FakeClient()}
+    router, client = _routed(monkeypatch, clients)
+
+    with pytest.raises(openai.BadRequestError):
+        client.chat.completions.create(model=DEFAULT_MODEL, messages=[])
+
+    assert clients["backup"].chat.completions.calls == []
@@ -0,0 +1,36 @@
+from src.core.registry import (
+    DEFAULT_ENGINE,
+    SEARCH_RESULTS,
+    ChatEngine,
+    _engines,
+    get_engine,
+    list_engines,
+    register_engine,
+)
+
+
+def test_unknown_mode_falls_back_to_default():
+    """Unknown or missing modes resolve to the default engine"""
+    assert get_engine("No-Such-Mode").name == DEFAULT_ENGINE
+    assert get_engine(None).name == DEFAULT_ENGINE
+
+
+def test_builtin_engines_and_capabilities():
+    """All built-in modes are registered with their capabilities"""
+    names = [engine.name for engine in list_engines()]
+
+    assert names[0] == DEFAULT_ENGINE
+    assert "Search-Agent" in names
+    assert get_engine("Search-Agent").has(SEARCH_RESULTS)
+    assert not get_engine(DEFAULT_ENGINE).has(SEARCH_RESULTS)
+
+
+def test_engine_is_loaded_on_first_use():
+    """Registering an engine does not import its module"""
+    engine = register_engine(ChatEngine("Test-Engine", "🧪", "Test", "re", "sub"))
+    try:
+        assert not engine.loaded
+        assert engine.stream("a", "o", "chat") == "chot"
+        assert engine.loaded
+    finally:
+        _engines.pop("Test-Engine")
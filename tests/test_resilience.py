@@ -0,0 +1,128 @@
+import time
+import unittest.mock as mock
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+import src.services.resilience as resilience
+from src.services.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    adaptive_timeout,
+    backoff_delay,
+    get_breaker,
+    retry_after,
+    send_with_retries,
+)
+from src.utils.deadline import Deadline
+from src.utils.metrics import metrics
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("GET", "http://test")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def _send(statuses, calls):
+    """Answer with the given statuses in turn, recording each request"""
+    client = httpx.Client(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(statuses[len(calls) - 1])
+        )
+    )
+
+    def send(timeout):
+        calls.append(timeout)
+        return client.get("http://test/search", timeout=timeout)
+
+    return send
+
+
+def test_backoff_is_jittered_and_honours_retry_after():
+    """Delays grow exponentially with full jitter; Retry-After sets the minimum"""
+    assert all(0 <= backoff_delay(3) <= 4 for _ in range(50))
+    assert backoff_delay(0, server_delay=5) >= 5
+
+    assert retry_after(_status_error(429, {"Retry-After": "7"})) == 7
+    in_ten = formatdate(time.time() + 10, usegmt=True)
+    assert retry_after(_status_error(503, {"Retry-After": in_ten})) == pytest.approx(
+        10, abs=2
+    )
+    assert retry_after(_status_error(503)) is None
+
+
+def test_server_errors_are_retried_and_client_errors_are_not():
+    """A 503 is sent again; a 400 fails at once"""
+    calls = []
+    with mock.patch.object(resilience.time, "sleep") as sleep:
+        response = send_with_retries(
+            "retry-test", _send([503, 429, 200], calls), Deadline(None)
+        )
+    assert response.status_code == 200
+    assert len(calls) == 3 and sleep.call_count == 2
+
+    calls = []
+    with pytest.raises(httpx.HTTPStatusError):
+        send_with_retries("retry-test", _send([400], calls), Deadline(None))
+    assert len(calls) == 1
+
+
+def test_retries_stop_at_the_deadline():
+    """A retry that would not fit in the turn is not attempted"""
+    calls = []
+    deadline = Deadline(1.2)
+    with mock.patch.object(resilience.random, "uniform", return_value=0.3):
+        with pytest.raises(httpx.HTTPStatusError):
+            send_with_retries("deadline-test", _send([503, 200], calls), deadline)
+    assert len(calls) == 1
+    assert deadline.degradations == [
+        {"stage": "deadline-test", "action": "not_retried"}
+    ]
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    """Consecutive failures open it; one trial after the cooldown closes it"""
+    breaker = CircuitBreaker("breaker-test", failure_threshold=2, cooldown=0.05)
+    breaker.record_failure(httpx.ConnectError("down"))
+    assert breaker.state == CLOSED
+    breaker.record_failure(httpx.ConnectError("down"))
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    time.sleep(0.06)
+    breaker.before_request()
+    assert breaker.state == HALF_OPEN
+    # Only one trial request at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record(_status_error(404))
+    assert breaker.state == CLOSED
+
+
+def test_open_breaker_skips_the_request():
+    """While open, nothing is sent to the provider"""
+    breaker = get_breaker("open-test")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(httpx.ConnectError("down"))
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        send_with_retries("open-test", _send([200], calls), Deadline(None))
+    assert calls == []
+
+
+def test_timeouts_adapt_to_observed_latency():
+    """The timeout follows the latency percentile once there are enough samples"""
+    assert adaptive_timeout("latency-test", 30) == 30
+    for _ in range(25):
+        metrics.observe("upstream_seconds", 3.0, provider="latency-test")
+
+    assert adaptive_timeout("latency-test", 30) == 6.0
+    assert adaptive_timeout("latency-test", 5) == 5
@@ -0,0 +1,164 @@
+import types
+
+import pytest
+
+import src.utils.response_cache as response_cache_module
+from src.utils.cancellation import start_generation
+from src.utils.response_cache import (
+    CompletionWatcher,
+    ResponseCache,
+    cache_response,
+    embed_text,
+    get_cached_response,
+    replay_stream,
+)
+
+
+def _question(text, history=()):
+    return list(history) + [{"role": "user", "content": text}]
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    """Normalized messages with the same parameters hit the cache"""
+    cache = ResponseCache()
+    cache.put(_question("Tỷ giá hôm nay?"), "24.000 VND", model="qwen")
+
+    assert cache.get(_question("  tỷ giá   HÔM NAY "), model="qwen") == "24.000 VND"
+    assert cache.get(_question("Tỷ giá hôm nay?"), model="other") is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_near_duplicate_hit_requires_same_context():
+    """Rephrased questions hit only within the same conversation"""
+    cache = ResponseCache(similarity=0.8, near_duplicates=True)
+    cache.put(_question("what is the exchange rate of usd today"), "24k", model="q")
+
+    assert (
+        cache.get(_question("what is the usd exchange rate today"), model="q") == "24k"
+    )
+    assert cache.get(_question("how do I bake bread"), model="q") is None
+
+    history = [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+    ]
+    assert (
+        cache.get(_question("what is the usd exchange rate today", history), model="q")
+        is None
+    )
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        (
+            "Can you move our one-on-one from Monday afternoon to Friday morning?",
+            "Can you move our one-on-one from Tuesday afternoon to Friday morning?",
+        ),
+        (
+            "Summarize the revenue numbers in the 2023 annual report",
+            "Summarize the revenue numbers in the 2024 annual report",
+        ),
+        (
+            "Sort this list of employees by salary in ascending order",
+            "Sort this list of employees by salary in descending order",
+        ),
+        (
+            "Is it safe to take ibuprofen with this medication?",
+            "Is it unsafe to take ibuprofen with this medication?",
+        ),
+    ],
+)
+def test_one_word_difference_is_not_a_near_duplicate(cached, asked):
+    """Questions differing in a number or content word never share an answer"""
+    # Every pair is similar enough for the vectors alone to match
+    cache = ResponseCache(similarity=0.9, near_duplicates=True)
+    cache.put(_question(cached), "ANSWER ABOUT THE FIRST QUESTION", model="q")
+
+    assert cache.get(_question(asked), model="q") is None
+
+
+def test_near_duplicates_are_off_by_default():
+    """Without opting in, only the exact question is served"""
+    cache = ResponseCache(similarity=0.5)
+    cache.put(_question("what is the exchange rate of usd today"), "24k", model="q")
+
+    assert (
+        cache.get(_question("what is the usd exchange rate today"), model="q") is None
+    )
+    assert cache.get(_question("What is the exchange rate of USD today?"), model="q")
+
+
+def test_repeated_question_in_a_fresh_chat_hits(monkeypatch):
+    """The first message of a new chat is served if it was answered before"""
+    monkeypatch.setattr(response_cache_module, "response_cache", ResponseCache())
+    monkeypatch.setattr(response_cache_module, "RESPONSE_CACHE_ENABLED", True)
+    earlier_chat = _question("what is the exchange rate of usd today")
+    cache_response(earlier_chat, "24k", model="q")
+
+    fresh_chat = _question("What is the exchange rate of USD today?")
+    assert get_cached_response(fresh_chat, model="q") == "24k"
+    assert get_cached_response(fresh_chat, model="other") is None
+
+
+def test_ttl_and_lru_eviction():
+    """Expired entries are not served and the oldest entry is evicted"""
+    cache = ResponseCache(max_entries=2, ttl=-1)
+    cache.put(_question("a"), "1")
+    assert cache.get(_question("a")) is None
+
+    cache = ResponseCache(max_entries=2)
+    cache.put(_question("a"), "1")
+    cache.put(_question("b"), "2")
+    cache.get(_question("a"))
+    cache.put(_question("c"), "3")
+
+    assert cache.get(_question("a")) == "1"
+    assert cache.get(_question("b")) is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_replay_stream_reproduces_text():
+    """A replayed response joins back to the original text"""
+    text = "Line one.\n\n- item  two\n" * 80
+
+    chunks = list(replay_stream(text, delay=0))
+
+    assert "".join(chunks) == text
+    assert len(chunks) <= 100
+
+
+def test_embedding_is_normalized():
+    """Vectors are unit length so dot products are cosine similarities"""
+    assert abs(float(embed_text("xin chào") @ embed_text("xin chào")) - 1.0) < 1e-5
+
+
+def _chunks(*finish_reasons):
+    return [
+        types.SimpleNamespace(
+            choices=[
+                types.SimpleNamespace(
+                    delta=types.SimpleNamespace(content="x"), finish_reason=reason
+                )
+            ]
+        )
+        for reason in finish_reasons
+    ]
+
+
+def test_only_streams_that_finish_normally_are_complete():
+    """A truncated stream or one of a cancelled turn is not worth caching"""
+    finished = CompletionWatcher(_chunks(None, "stop"))
+    assert len(list(finished)) == 2
+    assert finished.completed
+
+    for stream in (_chunks(None, "length"), _chunks(None, None)):
+        watcher = CompletionWatcher(stream)
+        list(watcher)
+        assert not watcher.completed
+
+    with start_generation("cache-session") as generation:
+        watcher = CompletionWatcher(_chunks(None, "stop"))
+        list(watcher)
+        generation.cancel("stopped")
+        assert not watcher.completed
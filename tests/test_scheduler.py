@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from src.services.scheduler import (
+    BACKGROUND,
+    INTERACTIVE,
+    ProviderQueue,
+    RateLimiter,
+    ScheduledStream,
+    Scheduler,
+    SchedulerOverloaded,
+    scheduled_as,
+)
+
+
+def _queue(concurrency=1, max_queue=8):
+    return ProviderQueue("test", concurrency, per_minute=60_000, max_queue=max_queue)
+
+
+def _wait_in_queue(queue, user, priority, served):
+    """Start a request that records its user once served, after it is queued"""
+    queued = queue.snapshot()["queued"]
+
+    def run():
+        queue.acquire(user, priority, timeout=5)
+        served.append(user)
+        queue.release(user)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while queue.snapshot()["queued"] == queued:
+        time.sleep(0.005)
+    return thread
+
+
+def test_requests_wait_for_a_free_slot():
+    """No more requests are in flight than the provider's cap"""
+    queue = _queue(concurrency=1)
+    queue.acquire("a", INTERACTIVE, timeout=1)
+
+    served = []
+    thread = _wait_in_queue(queue, "b", INTERACTIVE, served)
+    assert served == []
+
+    queue.release("a")
+    thread.join(1)
+    assert served == ["b"]
+    assert queue.snapshot()["in_flight"] == 0
+
+
+def test_interactive_and_light_users_are_served_first():
+    """Waiters are ordered by priority, then by the user's requests in flight"""
+    queue = _queue(concurrency=2)
+    queue.acquire("heavy", INTERACTIVE, timeout=1)
+    queue.acquire("heavy", INTERACTIVE, timeout=1)
+
+    served = []
+    threads = [
+        _wait_in_queue(queue, "job", BACKGROUND, served),
+        _wait_in_queue(queue, "heavy", INTERACTIVE, served),
+        _wait_in_queue(queue, "light", INTERACTIVE, served),
+    ]
+    queue.release("heavy")
+    for thread in threads:
+        thread.join(1)
+
+    assert served == ["light", "heavy", "job"]
+    queue.release("heavy")
+
+
+def test_load_is_shed_when_the_queue_is_long():
+    """Background work is turned away first; waits are bounded"""
+    queue = _queue(concurrency=1, max_queue=2)
+    queue.acquire("a", INTERACTIVE, timeout=1)
+    served = []
+    thread = _wait_in_queue(queue, "b", INTERACTIVE, served)
+
+    with pytest.raises(SchedulerOverloaded, match="busy"):
+        queue.acquire("job", BACKGROUND, timeout=1)
+    with pytest.raises(SchedulerOverloaded, match="waited"):
+        queue.acquire("c", INTERACTIVE, timeout=0.05)
+    assert queue.snapshot()["shed"] == 2
+
+    queue.release("a")
+    thread.join(1)
+    assert served == ["b"]
+
+
+def test_rate_limit_spaces_out_requests():
+    """After a burst the bucket refills at the configured rate"""
+    limiter = RateLimiter(per_minute=60)
+    for _ in range(10):
+        assert limiter.wait_time() == 0
+        limiter.take()
+
+    assert limiter.wait_time() == pytest.approx(1, abs=0.05)
+
+
+def test_streams_hold_their_slot_until_they_end():
+    """Slots are counted against the caller and released by the stream"""
+    scheduler = Scheduler(enabled=True)
+    with scheduled_as("session-1", BACKGROUND):
+        slot = scheduler.acquire("test")
+    stream = ScheduledStream(iter(["a", "b"]), slot)
+
+    [stats] = scheduler.stats()
+    assert stats["in_flight"] == 1 and stats["users_in_flight"] == 1
+    assert list(stream) == ["a", "b"]
+    stream.close()
+    assert scheduler.stats()[0]["in_flight"] == 0
+
+
+def test_optional_requests_never_wait_or_overtake():
+    """try_acquire takes a free slot at once and gives up when others need it"""
+    queue = _queue(concurrency=1)
+    assert queue.try_acquire("hedger")
+    assert not queue.try_acquire("hedger")
+
+    served = []
+    thread = _wait_in_queue(queue, "waiting", INTERACTIVE, served)
+    queue.release("hedger")
+    thread.join(5)
+    assert served == ["waiting"]
+    assert queue.try_acquire("hedger")
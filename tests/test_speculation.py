@@ -0,0 +1,103 @@
+import types
+
+import pytest
+
+import src.utils.speculation as speculation
+from src.utils.speculation import (
+    TokenBudget,
+    get_followups,
+    parse_followups,
+    start_speculation,
+    take_speculative_answer,
+)
+
+
+class FakeClient:
+    """Suggests fixed follow-ups and answers each one by echoing it"""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = types.SimpleNamespace(
+            completions=types.SimpleNamespace(create=self.create)
+        )
+
+    def create(self, model, messages, **kwargs):
+        self.requests.append(messages)
+        if messages[0]["content"].startswith("Suggest"):
+            text = "1. What is A?\n2. What is B?\n- What is A?"
+        else:
+            text = f"Answer to {messages[-1]['content']}"
+        choice = types.SimpleNamespace(
+            message=types.SimpleNamespace(content=text), finish_reason="stop"
+        )
+        return types.SimpleNamespace(choices=[choice])
+
+
+@pytest.fixture(autouse=True)
+def fresh_budget(monkeypatch):
+    monkeypatch.setattr(speculation, "budget", TokenBudget(100_000))
+
+
+def _build_messages(history):
+    return [{"role": "system", "content": "engine prompt"}] + history
+
+
+def _speculate(client, chat="Chat_abc"):
+    messages = [
+        {"role": "user", "content": "Tell me about letters"},
+        {"role": "assistant", "content": "<think>hmm</think>Letters are symbols."},
+    ]
+    return start_speculation(
+        client, chat, 2, "Default", "model", messages, _build_messages
+    )
+
+
+def test_parse_followups_strips_numbering_and_duplicates():
+    """List markers, quotes and repeated questions are removed"""
+    text = '1. "First?"\n- Second?\n\n2) First?\n* Third?\n4. Fourth?'
+
+    assert parse_followups(text, limit=3) == ["First?", "Second?", "Third?"]
+
+
+def test_clicked_followup_is_answered_from_the_prefetch():
+    """The prefetched answer is used once; the engine input ends with the question"""
+    client = FakeClient()
+
+    assert _speculate(client) == ["What is A?", "What is B?"]
+    # The chat key survives a rename of the chat
+    assert get_followups("Renamed_abc", 2) == ["What is A?", "What is B?"]
+    assert get_followups("Renamed_abc", 4) == []
+
+    assert take_speculative_answer("Chat_abc", "What is B?", 2, "Default") == (
+        "Answer to What is B?"
+    )
+    prefetch = client.requests[-1]
+    assert prefetch[0]["content"] == "engine prompt"
+    # Reasoning is not sent back to the model
+    assert prefetch[2]["content"] == "Letters are symbols."
+
+    # The speculation is consumed by the turn
+    assert get_followups("Chat_abc", 2) == []
+    assert take_speculative_answer("Chat_abc", "What is A?", 2, "Default") is None
+
+
+def test_other_turns_do_not_use_the_prefetch():
+    """A typed question, another mode or a later position answers live"""
+    client = FakeClient()
+
+    _speculate(client)
+    assert take_speculative_answer("Chat_abc", "Something else", 2, "Default") is None
+    _speculate(client)
+    assert take_speculative_answer("Chat_abc", "What is A?", 2, "ReAct-Agent") is None
+    _speculate(client)
+    assert take_speculative_answer("Chat_abc", "What is A?", 4, "Default") is None
+
+
+def test_prefetch_stops_when_the_budget_is_spent(monkeypatch):
+    """Suggestions are still offered, but nothing is prefetched without budget"""
+    monkeypatch.setattr(speculation, "budget", TokenBudget(10))
+    client = FakeClient()
+
+    assert _speculate(client) == ["What is A?", "What is B?"]
+    assert take_speculative_answer("Chat_abc", "What is A?", 2, "Default") is None
+    assert len(client.requests) == 1
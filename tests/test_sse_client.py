@@ -0,0 +1,124 @@
+import unittest.mock as mock
+
+import httpx
+import pytest
+
+import src.services.sse_client as sse_client
+from src.services.sse_client import SSEError, SSEParser, iter_sse_json, stream_sse
+from src.utils.deadline import Deadline
+
+
+def _parse(chunks):
+    parser = SSEParser()
+    events = []
+    for chunk in chunks:
+        events += parser.feed(chunk)
+    return events
+
+
+def test_events_split_at_every_byte_are_parsed_the_same():
+    """Lines, CRLF pairs and UTF-8 characters may be split across chunks"""
+    raw = "id: 1\r\ndata: xin chào\r\n\r\n: heartbeat\r\ndata: {}\r\n\r\n".encode()
+
+    whole = _parse([raw])
+    bytewise = _parse([raw[i : i + 1] for i in range(len(raw))])
+
+    assert [e.data for e in whole] == ["xin chào", "{}"]
+    assert [(e.data, e.id) for e in bytewise] == [(e.data, e.id) for e in whole]
+
+
+def test_multi_line_data_and_event_fields():
+    """Data lines are joined with newlines; named events keep their type"""
+    events = _parse([b"event: status\ndata: line one\ndata:line two\n\n"])
+
+    assert len(events) == 1
+    assert events[0].event == "status"
+    assert events[0].data == "line one\nline two"
+
+
+def test_oversized_event_is_rejected():
+    """A stream that never ends a line cannot grow without bound"""
+    parser = SSEParser(max_event_bytes=16)
+
+    with pytest.raises(SSEError):
+        parser.feed(b"data: " + b"x" * 64)
+
+
+def test_malformed_json_is_skipped_and_done_stops():
+    """Bad payloads are skipped with a warning; [DONE] ends the stream"""
+    events = _parse([b'data: {"a": 1}\n\ndata: {oops\n\ndata: [DONE]\n\ndata: 2\n\n'])
+
+    assert list(iter_sse_json(events, "test")) == [{"a": 1}]
+
+
+class DroppingStream(httpx.SyncByteStream):
+    """Sends some bytes, then fails like a dropped connection"""
+
+    def __init__(self, body):
+        self.body = body
+
+    def __iter__(self):
+        yield self.body
+        raise httpx.ReadError("connection dropped")
+
+
+def test_resumable_stream_reconnects_with_last_event_id():
+    """After a drop the stream resumes from the last complete event"""
+    seen_ids = []
+
+    def handler(request):
+        seen_ids.append(request.headers.get("Last-Event-ID"))
+        if len(seen_ids) == 1:
+            # The second event is cut off mid-way
+            return httpx.Response(
+                200, stream=DroppingStream(b"id: 1\ndata: one\n\nid: 2\ndata: tw")
+            )
+        return httpx.Response(200, text="id: 2\ndata: two\n\n")
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    with mock.patch.object(sse_client, "get_http_client", return_value=client):
+        with mock.patch.object(sse_client.time, "sleep"):
+            events = list(stream_sse("test", "http://test/stream", resumable=True))
+
+    assert [e.data for e in events] == ["one", "two"]
+    assert seen_ids == [None, "1"]
+
+
+def test_stream_is_not_resumed_past_the_turn_deadline():
+    """A dropped stream is given up when the reconnect delay would overrun the turn"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, stream=DroppingStream(b"id: 1\ndata: one\n\n"))
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    with mock.patch.object(sse_client, "get_http_client", return_value=client):
+        with pytest.raises(httpx.ReadError):
+            list(
+                stream_sse(
+                    "test",
+                    "http://test/stream",
+                    resumable=True,
+                    deadline=Deadline(1.5),
+                )
+            )
+
+    assert len(calls) == 1
+
+
+def test_failed_stream_is_retried_before_the_first_event():
+    """A 503 before anything was delivered is retried with backoff"""
+    statuses = [503, 200]
+
+    def handler(request):
+        status = statuses.pop(0)
+        return httpx.Response(status, text="data: ok\n\n" if status == 200 else "")
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    with mock.patch.object(sse_client, "get_http_client", return_value=client):
+        with mock.patch.object(sse_client.time, "sleep") as sleep:
+            events = list(stream_sse("retry-stream", "http://test/stream"))
+
+    assert [e.data for e in events] == ["ok"]
+    assert sleep.call_count == 1
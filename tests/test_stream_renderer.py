@@ -0,0 +1,61 @@
+from src.utils.stream_renderer import StreamRenderer
+
+
+class FakePlaceholder:
+    """Records what would be sent to the browser"""
+
+    def __init__(self):
+        self.frames = []
+
+    def markdown(self, text, unsafe_allow_html=False):
+        self.frames.append(text)
+
+    def empty(self):
+        self.frames.append(None)
+
+
+def test_frames_are_rate_limited_with_final_flush():
+    """Many deltas produce few redraws, and the last one has no cursor"""
+    placeholder = FakePlaceholder()
+    renderer = StreamRenderer(placeholder, fps=1)
+
+    text = renderer.consume(f"token{i} " for i in range(1000))
+
+    assert text == "".join(f"token{i} " for i in range(1000))
+    assert len(placeholder.frames) == 2
+    assert placeholder.frames[0].endswith("▌")
+    assert placeholder.frames[-1] == text
+
+
+def test_unlimited_rate_redraws_every_delta():
+    """With fps=0 every delta is drawn"""
+    placeholder = FakePlaceholder()
+    renderer = StreamRenderer(placeholder, fps=0)
+
+    renderer.consume(["a", "b", "", "c"])
+
+    assert placeholder.frames == ["a▌", "ab▌", "abc▌", "abc"]
+
+
+def test_clear_resets_the_text():
+    """Cleared text is not part of the final output"""
+    placeholder = FakePlaceholder()
+    renderer = StreamRenderer(placeholder, fps=0)
+    renderer.write("draft")
+    renderer.clear()
+    renderer.write("final")
+
+    assert renderer.close() == "final"
+
+
+def test_reasoning_is_drawn_as_a_thinking_block():
+    """Think tags split across deltas become a collapsible block; text stays raw"""
+    placeholder = FakePlaceholder()
+    renderer = StreamRenderer(placeholder, fps=0)
+
+    text = renderer.consume(["<thi", "nk>plan", "</think>", "Answer"])
+
+    assert text == "<think>plan</think>Answer"
+    assert "thinking-details" in placeholder.frames[-1]
+    assert placeholder.frames[-1].endswith("Answer")
+    assert "<think>" not in placeholder.frames[-1]
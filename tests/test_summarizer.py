@@ -0,0 +1,92 @@
+import threading
+import unittest.mock as mock
+
+import src.services.scheduler as scheduler
+import src.utils.summarizer as summarizer
+from src.utils.summarizer import (
+    forget_summary,
+    get_summary,
+    restore_summary,
+    run_summary_update,
+    schedule_summary_update,
+    summary_message,
+)
+
+
+def _client(text):
+    client = mock.MagicMock()
+    client.chat.completions.create.return_value.choices[0].message.content = text
+    return client
+
+
+def _turns(count):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"}
+        for i in range(count)
+    ]
+
+
+def test_summary_is_updated_incrementally():
+    """Only messages not yet covered are sent, together with the old summary"""
+    chat = "Budget chat_11111111"
+    run_summary_update(_client("first summary"), chat, _turns(4))
+    assert get_summary(chat) == {"text": "first summary", "covered": 4}
+
+    client = _client("second summary")
+    run_summary_update(client, chat, _turns(6))
+
+    prompt = client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "first summary" in prompt
+    assert "message 4" in prompt and "message 5" in prompt
+    assert "message 3" not in prompt
+    assert get_summary(chat)["covered"] == 6
+
+
+def test_summary_survives_rename_and_is_injected():
+    """Summaries are keyed by the chat UUID and injected as a system message"""
+    restore_summary("Old name_22222222", {"text": "user likes tea", "covered": 2})
+
+    message = summary_message("New name_22222222", history_length=10)
+
+    assert message["role"] == "system"
+    assert "user likes tea" in message["content"]
+
+
+def test_summary_of_cleared_history_is_dropped():
+    """A summary covering more messages than the chat has is discarded"""
+    restore_summary("Cleared_33333333", {"text": "stale", "covered": 8})
+
+    assert summary_message("Cleared_33333333", history_length=0) is None
+    assert get_summary("Cleared_33333333") is None
+
+
+def test_summaries_are_bounded_and_forgotten(monkeypatch):
+    """The least recently used summary is dropped, and a deleted chat's at once"""
+    monkeypatch.setattr(summarizer, "SUMMARY_MAX_CHATS", 2)
+    for name in ("Chat_aaaa", "Chat_bbbb", "Chat_cccc"):
+        restore_summary(name, {"text": name, "covered": 2})
+
+    assert get_summary("Chat_aaaa") is None
+    assert get_summary("Chat_bbbb")["text"] == "Chat_bbbb"
+
+    forget_summary("Chat_cccc")
+    assert get_summary("Chat_cccc") is None
+
+
+def test_background_update_is_scheduled_as_background_work():
+    """The summary request counts against the chat's user at background priority"""
+    callers = []
+    done = threading.Event()
+    client = _client("summary")
+
+    def create(**kwargs):
+        callers.append(scheduler._caller.get())
+        done.set()
+        return mock.DEFAULT
+
+    client.chat.completions.create.side_effect = create
+    with scheduler.scheduled_as("user-1"):
+        assert schedule_summary_update(client, "Chat_44444444", _turns(4))
+    assert done.wait(5)
+
+    assert callers == [("user-1", scheduler.BACKGROUND)]
@@ -0,0 +1,82 @@
+from src.utils.think_parser import (
+    ANSWER,
+    REASONING,
+    THINK_END,
+    THINK_START,
+    ThinkStreamParser,
+    answer_text,
+    split_thinking,
+)
+
+
+def _run(chunks):
+    parser = ThinkStreamParser()
+    events = []
+    for chunk in chunks:
+        events += parser.feed(chunk)
+    return events + parser.close()
+
+
+def _text_of(events, kind):
+    return "".join(text for event, text in events if event == kind)
+
+
+def test_tags_inside_one_chunk():
+    """Text around the tags is kept, not dropped"""
+    events = _run(["Intro <think>plan</think> Answer"])
+
+    assert events == [
+        (ANSWER, "Intro "),
+        (THINK_START, ""),
+        (REASONING, "plan"),
+        (THINK_END, ""),
+        (ANSWER, " Answer"),
+    ]
+
+
+def test_tags_split_across_chunks():
+    """Tags arriving in pieces are still recognized"""
+    chunks = [
+        "Intro <",
+        "th",
+        "ink>step one",
+        " step two</th",
+        "ink",
+        ">Answer ",
+        "done",
+    ]
+
+    events = _run(chunks)
+
+    assert _text_of(events, REASONING) == "step one step two"
+    assert _text_of(events, ANSWER) == "Intro Answer done"
+    assert [e for e, _ in events].count(THINK_START) == 1
+    assert [e for e, _ in events].count(THINK_END) == 1
+
+
+def test_every_split_position_gives_the_same_result():
+    """Chunking never changes the parsed output"""
+    text = "a<think>b</think>c<think>d"
+    for i in range(len(text) + 1):
+        events = _run([text[:i], text[i:]])
+        assert _text_of(events, ANSWER) == "ac"
+        assert _text_of(events, REASONING) == "bd"
+
+
+def test_partial_tag_at_end_is_flushed_as_text():
+    """A dangling '<thi' at the end of the stream is ordinary text"""
+    assert _text_of(_run(["x < y <thi"]), ANSWER) == "x < y <thi"
+
+
+def test_split_thinking_and_answer_text():
+    """Complete messages are split into merged segments"""
+    content = "Pre <think>why</think>Post"
+
+    assert split_thinking(content) == (
+        (ANSWER, "Pre "),
+        (REASONING, "why"),
+        (ANSWER, "Post"),
+    )
+    assert answer_text(content) == "Pre Post"
+    assert answer_text("<think>unfinished") == ""
+    assert answer_text("plain") == "plain"
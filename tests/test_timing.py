@@ -0,0 +1,68 @@
+import time
+
+import src.utils.timing as timing
+from src.utils.metrics import metrics
+from src.utils.timing import (
+    STREAM_TIME,
+    TIME_TO_FIRST_TOKEN,
+    TOTAL,
+    TurnTimer,
+    get_turn_timer,
+    record_turn_metrics,
+    start_turn_timer,
+)
+from src.utils.token_counter import count_tokens
+
+
+def test_stages_are_timed_and_summed():
+    """A stage that runs twice reports the sum of both runs"""
+    timer = TurnTimer()
+    for _ in range(2):
+        with timer.stage("Search request"):
+            time.sleep(0.01)
+
+    stages = timer.summary()["stages"]
+
+    assert stages["Search request"] >= 0.02
+    assert stages[TOTAL] >= stages["Search request"]
+
+
+def test_time_to_first_token_and_token_count(monkeypatch):
+    """TTFT is measured to the first text chunk and tokens are counted, not chunks"""
+    # Turn start, stream start, first and second token, stream end, summary
+    clock = iter([0.0, 1.0, 1.5, 2.0, 2.5, 3.0])
+    monkeypatch.setattr(timing.time, "perf_counter", lambda: next(clock))
+    timer = TurnTimer()
+    chunks = ["", "Xin chào, ", "đây là một câu trả lời khá dài."]
+
+    assert list(timer.track_stream(chunks)) == chunks
+
+    summary = timer.summary()
+    tokens = count_tokens(chunks[1]) + count_tokens(chunks[2])
+    assert summary["stages"][TIME_TO_FIRST_TOKEN] == 1.5
+    assert summary["stages"][STREAM_TIME] == 1.5
+    assert summary["tokens"] == tokens > len(chunks)
+    assert summary["tokens_per_second"] == tokens / 0.5
+    assert summary["stages"][TOTAL] == 3.0
+
+
+def test_turn_timer_is_per_context():
+    """The current turn's timer is returned, and a detached one outside a turn"""
+    timer = start_turn_timer()
+
+    assert get_turn_timer() is timer
+
+
+def test_record_turn_metrics():
+    """A turn's stages and throughput are pushed into the metrics store"""
+    summary = {
+        "stages": {TOTAL: 2.0, TIME_TO_FIRST_TOKEN: 0.5},
+        "tokens": 40,
+        "tokens_per_second": 20.0,
+    }
+
+    record_turn_metrics("timing-test", summary)
+
+    assert metrics.series("turn_seconds", mode="timing-test")[-1][1] == 2.0
+    assert metrics.series("tokens_per_second", mode="timing-test")[-1][1] == 20.0
+    assert metrics.counters()["turns{mode=timing-test}"] == 1
@@ -0,0 +1,55 @@
+from src.utils.history_manager import get_history_input
+from src.utils.token_counter import (
+    MESSAGE_OVERHEAD,
+    count_tokens,
+    estimate_tokens,
+    message_tokens,
+)
+
+
+def test_estimator_scales_with_text_length():
+    """Longer text is estimated at more tokens, punctuation included"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hello") >= 1
+    assert estimate_tokens("tỷ giá hôm nay " * 100) > estimate_tokens("tỷ giá hôm nay")
+    assert estimate_tokens("你好世界") >= 4
+
+
+def test_message_tokens_are_cached_on_the_message():
+    """The count is computed once and stored with the message"""
+    message = {"role": "user", "content": "hello world"}
+
+    tokens = message_tokens(message)
+
+    assert tokens == count_tokens("hello world") + MESSAGE_OVERHEAD
+    assert message["tokens"] == tokens
+    message["content"] = "changed"
+    assert message_tokens(message) == tokens
+
+
+def test_history_is_packed_newest_first_within_budget():
+    """Old messages are dropped once the token budget is spent"""
+    history = [
+        {"role": "user", "content": "big " * 2000, "tokens": 2000},
+        {"role": "assistant", "content": "a", "tokens": 100},
+        {"role": "system", "content": "ignored", "tokens": 1},
+        {"role": "user", "content": "b", "tokens": 100},
+        {"role": "assistant", "content": "c", "tokens": 100, "timings": {}},
+    ]
+
+    result = get_history_input(history, max_tokens=350)
+
+    assert result == [
+        {"role": "assistant", "content": "a"},
+        {"role": "user", "content": "b"},
+        {"role": "assistant", "content": "c"},
+    ]
+
+
+def test_newest_message_is_kept_even_if_over_budget():
+    """The latest message is always sent"""
+    history = [{"role": "user", "content": "x", "tokens": 5000}]
+
+    assert get_history_input(history, max_tokens=100) == [
+        {"role": "user", "content": "x"}
+    ]
@@ -0,0 +1,39 @@
+from src.utils.tracing import current_trace_id, span, start_trace, traced
+
+
+def test_spans_nest_under_one_trace():
+    """Nested spans share the trace ID of the turn and form a tree"""
+
+    @traced("search")
+    def search():
+        return current_trace_id()
+
+    with start_trace("chat_turn") as root:
+        with span("prompt"):
+            pass
+        inner_trace_id = search()
+
+    assert inner_trace_id == root.trace_id
+    assert [child.name for child in root.children] == ["prompt", "search"]
+    assert all(child.duration is not None for child in root.walk())
+    assert current_trace_id() is None
+
+
+def test_span_records_errors():
+    """A failing span is marked as an error and the exception propagates"""
+    try:
+        with start_trace("chat_turn") as root:
+            with span("search"):
+                raise ValueError("boom")
+    except ValueError:
+        pass
+
+    assert root.status == "error"
+    assert root.children[0].status == "error"
+    assert "boom" in root.children[0].error
+
+
+def test_span_outside_trace_is_noop():
+    """Spans outside of a turn do nothing"""
+    with span("orphan") as orphan:
+        assert orphan is None